@@ -14,6 +14,11 @@ class GraphCallback(BaseCallbackHandler):
 
 class State(MessagesState):
     next: str
+    # per-invocation loop counters, kept in the state so concurrent chats dont share them
+    context_limit: int
+    gen_limit: int
+    # set by the context and gen nodes when they come back with nothing
+    node_failed: bool
 
 class Router(TypedDict):
     # THIS SHOULD BE DYNAMIC
@@ -38,6 +38,7 @@ class IntegrationAgent:
         self.query_prompt = f'''Your job is to extract data from a data source. 
             The type of the connector is important. The type is told to you in the user message.
             Use the right tool based on the type of the connector
+            If you need several endpoints from the same rest connector, fetch them together with the batch tool.
             Try to get all the data relevant to the body given to you.
             Do not include desciptions of endpoints, only give back what the tool calls tell you.
             When you are done, try and collect all the data you got from your tool calls and put it in your final answer, 
@@ -1,22 +1,25 @@
 from application.agents.extras import State, Router, GraphCallback
-from application.agents.tools.query_dbutils import create_pinecone_tool
+from application.agents.tools.query_dbutils import create_pinecone_tool, create_multi_namespace_tool
 from application.dbutils import DbUtils
 from application.environment import Environment
 from application.api.models.permission import Permission
 
 from langchain_core.messages import HumanMessage
+from langchain_core.runnables import RunnableConfig
 from langgraph.prebuilt import create_react_agent
 from langgraph.graph import START, END, StateGraph
 from langgraph.types import Command
-from typing import Literal, Optional
+from typing import Any, AsyncIterator, Literal, Optional, cast
 from langchain_mistralai import ChatMistralAI
 
 class SupervisorAgent:
         
-    def __init__(self, env: Environment, dbutils: DbUtils):
-        self.context_limit = 0
-        self.gen_limit = 0
+    def __init__(self, env: Environment, dbutils: DbUtils, fixed_pipeline: bool = False):
+        # fixed pipeline skips the supervisor llm and always runs context -> gen -> finish,
+        # the llm only gets asked where to go when a node comes back empty
+        self.fixed_pipeline = fixed_pipeline
         self.pinecone_tool = create_pinecone_tool(dbutils)
+        self.multi_namespace_tool = create_multi_namespace_tool(dbutils)
         self.members = ["gen", "context"]
         self.options = self.members + ["FINISH"]
         self.genclient = ChatMistralAI(
@@ -47,12 +50,13 @@ class SupervisorAgent:
         
         self.context_agent = create_react_agent(
             self.genclient, 
-            tools=[self.pinecone_tool],
+            tools=[self.multi_namespace_tool, self.pinecone_tool],
             prompt=f"Your sole purpose is to fetch context from a pinecone database." 
                     "The user permissions defined in the query are the namespaces you are allowed to access."
                     "Only use namespaces that are in the original query."
                     "If the user does not have any permissions, do not try to make up answers or hit random namespaces. Tell them they do not have any permissions"
-                    "Use your tool with these namespaces to retrieve context"
+                    "Use your tools with these namespaces to retrieve context"
+                    "When there is more than one namespace, query them all in a single query_dbutils_many call instead of one call per namespace."
                     "Always keep track of the namespaces used. Always carry over the namspaces used, even if the namespace was used once."
                     "Format that metadata into facts."
                     "Add the namespaces used into the facts."
@@ -73,33 +77,39 @@ class SupervisorAgent:
         
         self.graph = builder.compile()        
     
-    def context(self, state: State) -> Command[Literal["supervisor"]]:
-        result = self.context_agent.invoke(state)
+    # every node hands its config on, below python 3.11 langgraph does not carry it over for async nodes
+    # and the agents' llm calls would stream no tokens
+    async def context(self, state: State, config: RunnableConfig) -> Command[Literal["supervisor"]]:
+        result = await self.context_agent.ainvoke(state, config)
         print(result["messages"][-1].pretty_print())
 
+        content = result["messages"][-1].content
         return Command(
             update={
             "messages": [
-                HumanMessage(content=result["messages"][-1].content, name="context")
-            ]
+                HumanMessage(content=content, name="context")
+            ],
+            "node_failed": not content
             },
         goto="supervisor"
         )
 
-    def gen(self, state: State) -> Command[Literal["supervisor"]]:
-        result = self.gen_agent.invoke(state)
+    async def gen(self, state: State, config: RunnableConfig) -> Command[Literal["supervisor"]]:
+        result = await self.gen_agent.ainvoke(state, config)
         print(result["messages"][-1].pretty_print())        
 
+        content = result["messages"][-1].content
         return Command(
             update={
             "messages": [
-                HumanMessage(content=result["messages"][-1].content, name="gen")
-            ]
+                HumanMessage(content=content, name="gen")
+            ],
+            "node_failed": not content
             },
         goto="supervisor"
         )
 
-    def supervisor(self, state: State) -> Command[Literal["context", "gen", "__end__"]]:
+    async def supervisor(self, state: State, config: RunnableConfig) -> Command[Literal["context", "gen", "__end__"]]:
         # some boilerplate
         # we format this in a way that ChatMistralAI can understand, look at its langchain page to see
         messages = [
@@ -108,56 +118,116 @@ class SupervisorAgent:
             "content": self.system_prompt,
         }, 
         ] + state["messages"]
+        # the counters live in the state, so each invocation of the graph gets its own
+        context_limit = state.get("context_limit", 0)
+        gen_limit = state.get("gen_limit", 0)
+
         # if we have reached the context limit, force a finish state
-        if self.context_limit == 3 or self.gen_limit == 3:
+        if context_limit == 3 or gen_limit == 3:
             # cant finish till we call each node at least once
             # TODO rewrite this!!!!
             # Im putting a ticket for this, its eternally annoying me
-            if self.gen_limit < 1:
-                self.gen_limit += 1
-                return Command(goto="gen", update={"next": "gen"})
-            if self.context_limit < 1:
-                self.context_limit += 1
-                return Command(goto="context", update={"next": "context"})
+            if gen_limit < 1:
+                return Command(goto="gen", update={"next": "gen", "gen_limit": gen_limit + 1})
+            if context_limit < 1:
+                return Command(goto="context", update={"next": "context", "context_limit": context_limit + 1})
             return Command(goto=END, update={"next": END})
 
-        # here, we pass the state and our first prompt to the genclient (which will decide what to do next)
-        # we pass it the router, which tells the agent what options it has, and give it the messages, 
-        # which includes its prompt and the global state 
-        response = self.genclient.with_structured_output(Router).invoke(messages)
-        # decides where to go next, we are done if genclient told us to stop
-        goto = response["next"]
-        if goto == "FINISH":
-            # we cant finish until we have called each node at least once
-            if self.context_limit > 0 and self.gen_limit > 0:
-                goto = END
-            else:
-                goto = "gen" if self.gen_limit < self.context_limit else "context"
+        if self.fixed_pipeline and not state.get("node_failed", False):
+            goto = self.fixed_route(context_limit, gen_limit)
+        else:
+            # here, we pass the state and our first prompt to the genclient (which will decide what to do next)
+            # we pass it the router, which tells the agent what options it has, and give it the messages, 
+            # which includes its prompt and the global state 
+            response = cast(Router, await self.genclient.with_structured_output(Router).ainvoke(messages, config))
+            # decides where to go next, we are done if genclient told us to stop
+            goto = response["next"]
+            if goto == "FINISH":
+                # we cant finish until we have called each node at least once
+                if context_limit > 0 and gen_limit > 0:
+                    goto = END
+                else:
+                    goto = "gen" if gen_limit < context_limit else "context"
         
+        update: dict[str, Any] = {"next": goto}
         # check if we are hitting the context node too many times
         if goto == "context":
-            self.context_limit += 1
+            update["context_limit"] = context_limit + 1
         
         if goto == "gen":
-            self.gen_limit += 1
+            update["gen_limit"] = gen_limit + 1
         # Command is used to move to different nodes
-        return Command(goto=goto, update={"next": goto})
+        return Command(goto=goto, update=update)
 
-    def take_input(self, user_message: str, user_permissions: list[Permission]) -> Optional[str]:
-        previous_step = None
-        print(str([perm.permission_name for perm in user_permissions]))
-        for step in self.graph.stream({
+    def fixed_route(self, context_limit: int, gen_limit: int) -> str:
+        # no llm call, the graph always wants context first, then an answer, then to finish
+        if context_limit < 1:
+            return "context"
+        if gen_limit < 1:
+            return "gen"
+        return END
+
+    def build_input(self, user_message: str, user_permissions: list[Permission]) -> dict:
+        return {
             "messages" : [(
                 "user", "Here is the user query: " + user_message + ". Here are the users permissions: " + str([perm.permission_name for perm in user_permissions])
-        )]
-        }, subgraphs=True):
+        )],
+            "context_limit": 0,
+            "gen_limit": 0,
+            "node_failed": False
+        }
+
+    async def take_input(self, user_message: str, user_permissions: list[Permission]) -> Optional[str]:
+        # the whole graph runs on the event loop, so a single worker can hold many chats in flight
+        previous_step = None
+        print(str([perm.permission_name for perm in user_permissions]))
+        async for step in self.graph.astream(self.build_input(user_message, user_permissions), subgraphs=True):
             if "gen" in step[1]:
                 messages = step[1]["gen"]["messages"]
                 previous_step = messages[0].content
 
             if "supervisor" in step[1]:
                 if END in step[1]["supervisor"]["next"]:
-                    self.context_limit = 0
-                    self.gen_limit = 0
                     print(previous_step)
                     return previous_step
+
+    async def stream_input(self, user_message: str, user_permissions: list[Permission]) -> AsyncIterator[tuple[str, Optional[str]]]:
+        """
+        Same as take_input, but yields ("token", text) for every token the gen node produces,
+        then ("answer", final answer) once the supervisor finishes.
+        The supervisor can run gen more than once, ("reset", None) comes before the tokens of every later run
+        so the tokens shown so far can be dropped, the answer is always the last run's.
+        """
+        previous_step = None
+        gen_run = None
+        async for event in self.graph.astream(
+            self.build_input(user_message, user_permissions),
+            stream_mode=["messages", "updates"],
+            subgraphs=True
+        ):
+            # with subgraphs and more than one stream mode every event is (namespace, mode, data)
+            namespace, mode, data = cast(tuple[tuple[str, ...], str, Any], event)
+            if mode == "messages":
+                # tokens come from the react agent inside the gen node, so its namespace starts with gen:
+                chunk, _ = data
+                if namespace and namespace[0].startswith("gen:") and chunk.content:
+                    # the task id in the namespace changes with every gen run
+                    if gen_run is not None and namespace[0] != gen_run:
+                        yield "reset", None
+                    gen_run = namespace[0]
+                    yield "token", chunk.content
+                continue
+
+            # only the top level graph updates matter here, the subgraphs report their own agent steps
+            if namespace:
+                continue
+
+            if "gen" in data:
+                previous_step = data["gen"]["messages"][0].content
+
+            if "supervisor" in data and END in data["supervisor"]["next"]:
+                yield "answer", previous_step
+                return
+
+        # graph ran out without the supervisor finishing, same as take_input giving back None
+        yield "answer", None
@@ -1,4 +1,5 @@
 from langchain_core.tools import tool
+from typing import List
 
 def create_connector_tool(connector_builder):
     
@@ -12,14 +13,25 @@ def create_connector_tool(connector_builder):
         res = connector.get(endpoint, params)
         return res
 
+    @tool
+    def query_rest_connector_batch(connector_name: str, requests: List[dict]):
+        """
+        This tool hits several endpoints of one rest connector at the same time.
+        Each item in requests is {"endpoint": ..., "params": ...}.
+        It gives you back one response per request, in the same order. A failed request gives back {"error": ...}.
+        """
+        connector = connector_builder.get_connector(connector_name)
+        return connector.fetch_many([(request["endpoint"], request.get("params")) for request in requests])
+
     @tool
     def query_postgres_connector(connector_name: str, query: str):
         """This tool takes your SQL query and executes it, returning the response.
            The connector_name parameter is just the name of the connector you want to connect to.
+           Large results are cut off, so filter, limit or aggregate in the query itself.
         """
         # get connector by name
         connector = connector_builder.get_connector(connector_name)
         res = connector.execute_sql_query(query)
         return res
 
-    return [query_postgres_connector, query_rest_connector]
+    return [query_postgres_connector, query_rest_connector, query_rest_connector_batch]
@@ -21,3 +21,24 @@ def create_pinecone_tool(dbutils):
         )
         return(results)
     return query_dbutils
+
+def create_multi_namespace_tool(dbutils):
+    """
+    Factory for the multi namespace version of query_dbutils.
+    """
+    @tool
+    def query_dbutils_many(user_query: str, namespaces: List[str]) -> List[Dict[str, Any]]:
+        """
+        Queries the vector database with semantic search across several namespaces at once.
+        Pass every namespace you are allowed to use. Each result says which namespace it came from.
+        """
+        # embedded once, the same vector is used for every namespace
+        query_embedding = dbutils.create_query_embedding(user_query)
+        results = dbutils.search_many(
+            index_name="quickstart",
+            namespaces=namespaces,
+            embedding=query_embedding,
+            result_amount=5
+        )
+        return results
+    return query_dbutils_many
@@ -10,19 +10,6 @@ def create_upserter_tool(dbutils):
         The namespace parameter is the name of the connector in the user query
         The return value is how many vectors we upserted.
         """
-        embeddings = []
-        vectors = []
-
-        for i in range(0, len(data), 10):
-            chunk = data[i:i + 10]
-            embeddings += dbutils.create_embedding(chunk)
-       
-        for d, e in zip(data, embeddings):
-            vectors.append({
-                "id": d['id'],
-                "values": e['values'],
-                "metadata": {'text': d['text']}
-            }) 
-        result = dbutils.upsert_embeddings("quickstart", namespace, vectors)
-        return result
+        # rows whose text is already stored under the same id are skipped, re-ingesting a connector stays cheap
+        return dbutils.embed_and_upsert("quickstart", namespace, data)
     return upsert_dbutils
@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+from typing import Any, Dict, Optional
+
+class IngestRequest(BaseModel):
+    # a paged endpoint of a rest connector, or a select for a postgres one
+    endpoint: Optional[str] = None
+    params: Optional[Dict[str, Any]] = None
+    query: Optional[str] = None
+    max_rows: Optional[int] = None
+    # the column used as the vector id, for rest connectors the pagination id_field is the default
+    id_field: Optional[str] = None
+    # defaults to the connector name
+    namespace: Optional[str] = None
+    index_name: str = "quickstart"
@@ -1,6 +1,9 @@
+import json
 from fastapi import Depends, APIRouter
 from typing import Annotated
 from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from datetime import datetime
 from typing import Any
 
@@ -93,21 +96,54 @@ def create_chat(convo_id: int, chat: Chat, sqlclient: SQLDep) -> Chat:
     return chat
 
 @chatRouter.post("/conversation/{convo_id}/chat/response")
-def create_response(convo_id: int, chat: Chat, sqlclient: SQLDep, supervisor_agent: SupervisorAgentDep) -> Chat:
-    conversation = sqlclient.get_by_id(Conversation, convo_id)
+async def create_response(convo_id: int, chat: Chat, sqlclient: SQLDep, supervisor_agent: SupervisorAgentDep) -> Chat:
+    # the sql calls block, they go to the threadpool so the event loop keeps serving other chats
+    conversation = await run_in_threadpool(sqlclient.get_by_id, Conversation, convo_id)
     conversation.last_modified_date = datetime.utcnow()
     
-    user = sqlclient.get_by_id(User, conversation.user_id, eager_relationships=[User.permissions])
+    user = await run_in_threadpool(sqlclient.get_by_id, User, conversation.user_id, eager_relationships=[User.permissions])
     
-    answer = supervisor_agent.take_input(chat.body, user.permissions)
+    # awaited on the event loop instead of holding a threadpool worker for the whole llm round trip
+    answer = await supervisor_agent.take_input(chat.body, user.permissions)
     final_result = "Response:" + str(answer)
 
     response = Chat(body=final_result, conversation_id=convo_id)
     
-    sqlclient.add_object(response)
+    await run_in_threadpool(sqlclient.add_object, response)
     
     return response
 
+@chatRouter.post("/conversation/{convo_id}/chat/response/stream")
+async def stream_response(convo_id: int, chat: Chat, sqlclient: SQLDep, supervisor_agent: SupervisorAgentDep) -> StreamingResponse:
+    """
+    Server sent events version of create_response.
+    Sends a token event for every token the gen node produces, and a done event with the saved Chat at the end.
+    A reset event means gen started over, the tokens sent before it are not part of the answer.
+    """
+    conversation = await run_in_threadpool(sqlclient.get_by_id, Conversation, convo_id)
+    if not conversation:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    conversation.last_modified_date = datetime.utcnow()
+
+    user = await run_in_threadpool(sqlclient.get_by_id, User, conversation.user_id, eager_relationships=[User.permissions])
+
+    async def event_stream():
+        answer = None
+        async for kind, content in supervisor_agent.stream_input(chat.body, user.permissions):
+            if kind == "token":
+                yield f"event: token\ndata: {json.dumps(content)}\n\n"
+            elif kind == "reset":
+                yield "event: reset\ndata: null\n\n"
+            else:
+                answer = content
+
+        # the chat is only persisted once the whole answer is in
+        response = Chat(body="Response:" + str(answer), conversation_id=convo_id)
+        await run_in_threadpool(sqlclient.add_object, response)
+        yield f"event: done\ndata: {response.model_dump_json()}\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
 @chatRouter.delete("/conversation/{convo_id}/chat/{chat_id}")
 def delete_chat(chat_id: int, sqlclient: SQLDep):
     chat = sqlclient.get_by_id(Chat, chat_id)
@@ -1,17 +1,21 @@
 from fastapi import APIRouter, Depends, HTTPException
 from typing import Annotated
 
-from application.api.dependencies import get_sql_client, get_environment, get_connector_manager
+from application.api.dependencies import get_sql_client, get_environment, get_connector_manager, get_dbutils
 from application.api.sqlclient import SQLClient
 from application.environment import Environment
 from application.api.models.connector import Connector
+from application.api.models.ingest_request import IngestRequest
 from application.connectors.connector_builder import ConnectorBuilder
+from application.dbutils import DbUtils
+from application.seeds.iterable_parser import IterableParser
 
 connectorRouter = APIRouter()
 
 SQLDep = Annotated[SQLClient, Depends(get_sql_client)] 
 EnvDep = Annotated[Environment, Depends(get_environment)]
 ConnectorDep = Annotated[ConnectorBuilder, Depends(get_connector_manager)]
+DbUtilsDep = Annotated[DbUtils, Depends(get_dbutils)]
 
 @connectorRouter.get("/connector/all")
 def get_all_connectors(sqlclient: SQLDep) -> list[Connector]:
@@ -36,4 +40,46 @@ def get_connector_status(name: str, connector_manager: ConnectorDep):
 
     if not connector:
         raise HTTPException(status_code=404, detail="Connector not Found")
-    return connector.active
+    return connector.status()
+
+@connectorRouter.get("/connector/{name}/cache")
+def get_connector_cache_stats(name: str, connector_manager: ConnectorDep):
+    connector = connector_manager.get_connector(name)
+
+    if not connector or getattr(connector, "cache", None) is None:
+        raise HTTPException(status_code=404, detail="No response cache for this connector")
+    return connector.cache_stats()
+
+# streams every page of a paged endpoint, or the rows of a select, into the vector store, no llm in the loop
+@connectorRouter.post("/connector/{name}/ingest")
+def ingest_connector_endpoint(name: str, ingest_request: IngestRequest, connector_manager: ConnectorDep, dbutils: DbUtilsDep):
+    connector = connector_manager.get_connector(name)
+
+    if not connector:
+        raise HTTPException(status_code=404, detail="Connector not Found")
+
+    if ingest_request.query is not None:
+        if not hasattr(connector, "iter_rows"):
+            raise HTTPException(status_code=400, detail="Connector can not stream sql queries")
+        records = connector.iter_rows(ingest_request.query, ingest_request.max_rows)
+        source = f"{name}:{ingest_request.query}"
+        id_field = ingest_request.id_field
+    elif ingest_request.endpoint is not None:
+        if getattr(connector, "pagination", None) is None:
+            raise HTTPException(status_code=400, detail="Connector has no pagination set up")
+        records = connector.iter_items(ingest_request.endpoint, ingest_request.params)
+        source = f"{name}{ingest_request.endpoint}"
+        id_field = ingest_request.id_field or connector.pagination.id_field
+    else:
+        raise HTTPException(status_code=400, detail="An endpoint or a query is needed")
+
+    parser = IterableParser(
+        records,
+        source,
+        ingest_request.index_name,
+        ingest_request.namespace or name,
+        dbutils,
+        id_field=id_field
+    )
+    upserted = parser.run()
+    return {"rows": parser.rows_read, "embedded": parser.rows_embedded, "upserted": upserted}
@@ -0,0 +1,125 @@
+import asyncio
+import threading
+import httpx
+from application.api.models.connector import Connector
+from application.connectors.rest_connector import RestConnector
+
+class AsyncRestConnector(RestConnector):
+    """
+    A rest connector on httpx.AsyncClient with HTTP/2, so many requests share one connection.
+    The client lives on an event loop in its own thread, started on first use, which lets the sync tools
+    and the async agents both call it. fetch_many sends a whole batch at once, max_concurrency
+    (from c_params) caps how many of them are in flight.
+    """
+
+    def __init__(self, config: Connector):
+        super().__init__(config)
+        self.http2 = config.c_params.get("http2", True)
+        self.loop = None
+        self.thread = None
+        self.client = None
+        self.semaphore = None
+        self.loop_lock = threading.Lock()
+
+    def create_session(self):
+        # no requests session, the httpx client is made on the connector's own loop
+        return None
+
+    def ensure_loop(self):
+        with self.loop_lock:
+            if self.loop is not None:
+                return self.loop
+            loop = asyncio.new_event_loop()
+            self.thread = threading.Thread(target=loop.run_forever, name=f"{self.name}-http", daemon=True)
+            self.thread.start()
+            asyncio.run_coroutine_threadsafe(self.open_client(), loop).result()
+            self.loop = loop
+            return loop
+
+    async def open_client(self):
+        limits = httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+        self.client = httpx.AsyncClient(http2=self.http2, limits=limits, timeout=self.timeout)
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    def run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.ensure_loop()).result()
+
+    async def arequest(self, method, endpoint, params=None, data=None):
+        url = f"{self.base_url}{endpoint}"
+        cache_key, cached = self.cache_lookup(method, url, params)
+        if self.cache is not None and cached is not None and cached.fresh(self.cache.clock()):
+            return self.cache.hit(cached)
+
+        response = await self.asend(method, url, params, data, self.request_headers(cached))
+        return self.read_response(response, cache_key, cached)
+
+    async def asend(self, method, url, params=None, data=None, headers=None):
+        headers = self.headers if headers is None else headers
+        client, semaphore = self.client, self.semaphore
+        if client is None or semaphore is None:
+            raise Exception(f"No open client for connector: {self.name}")
+
+        for attempt in range(self.retries):
+            wait = self.admit()
+            if wait:
+                await asyncio.sleep(wait)
+            try:
+                # the limit only covers the request itself, not the backoff sleep
+                async with semaphore:
+                    response = await client.request(
+                        method,
+                        url,
+                        params=params,
+                        json=data,
+                        headers=headers
+                    )
+                # a 304 answers a conditional request, it is not a failure
+                if response.status_code != 304:
+                    response.raise_for_status()
+                self.record_outcome(True)
+                return response
+            except httpx.HTTPError as e:
+                retryable = self.retryable(e)
+                self.record_outcome(not retryable)
+                if not retryable:
+                    raise Exception(f"Request failed, not retrying. {e}")
+                if attempt == self.retries - 1:
+                    raise Exception(f"Request failed after {self.retries} attempts. {e}")
+                await asyncio.sleep(self.backoff(attempt, e))
+        raise Exception(f"Request not sent, retries is {self.retries}.")
+
+    async def afetch_one(self, endpoint, params=None):
+        # one failed endpoint should not lose the rest of the batch
+        try:
+            return await self.arequest("GET", endpoint, params=params)
+        except Exception as e:
+            return {"error": str(e)}
+
+    async def afetch_many(self, requests_to_make):
+        return await asyncio.gather(*(self.afetch_one(*request) for request in requests_to_make))
+
+    # same interface as the sync connector, run on the connector's loop
+    def request_handler(self, method, endpoint, params=None, data=None):
+        return self.run(self.arequest(method, endpoint, params=params, data=data))
+
+    def fetch_many(self, requests_to_make):
+        return self.run(self.afetch_many(requests_to_make))
+
+    async def afetch_page(self, url, params=None):
+        response = await self.asend("GET", url, params)
+        return response.json(), response.headers
+
+    def fetch_page(self, url, params=None):
+        return self.run(self.afetch_page(url, params))
+
+    def shutdown(self):
+        with self.loop_lock:
+            loop, self.loop = self.loop, None
+        if loop is not None:
+            if self.client is not None:
+                asyncio.run_coroutine_threadsafe(self.client.aclose(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+            if self.thread is not None:
+                self.thread.join(timeout=5)
+            loop.close()
+        self.active = False
@@ -0,0 +1,142 @@
+import json
+import time
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional
+
+from application.dbutils import DbUtils
+
+# debezium ops, r is a row read by the initial snapshot
+UPSERT_OPS = {"c", "r", "u"}
+DELETE_OPS = {"d"}
+
+def unwrap(message:Any) -> Any:
+    # with schemas enabled the data sits under payload
+    if isinstance(message, dict) and "payload" in message and "schema" in message:
+        return message["payload"]
+    return message
+
+def decode(raw:Optional[bytes]) -> Any:
+    if raw is None:
+        return None
+    try:
+        return unwrap(json.loads(raw.decode("utf-8")))
+    except ValueError:
+        return None
+
+
+class RowChange(object):
+    """One changed row of a debezium event, keyed by its table and primary key."""
+
+    def __init__(self, table:str, op:str, key:Dict[str, Any], row:Dict[str, Any]):
+        self.table = table
+        self.op = op
+        self.key = key
+        self.row = row
+
+    @property
+    def id(self) -> str:
+        # the same row always lands on the same vector
+        return f"{self.table}:" + "-".join(str(value) for value in self.key.values())
+
+    @property
+    def deleted(self) -> bool:
+        return self.op in DELETE_OPS
+
+    def text(self) -> str:
+        values = ", ".join(
+            f"{column}: {json.dumps(value) if isinstance(value, (dict, list)) else value}"
+            for column, value in self.row.items()
+        )
+        return f"{self.table}: {values}"
+
+
+def parse_change(event:Any, key:Any=None, key_columns:Optional[Dict[str, List[str]]]=None) -> Optional[RowChange]:
+    """
+    A RowChange from a debezium event and its kafka message key, None for anything that is not a row change
+    (truncates, heartbeats, tombstones). The primary key comes from the message key, then the table's
+    key_columns, then an id column.
+    """
+    payload = unwrap(event)
+    if not isinstance(payload, dict):
+        return None
+    op = payload.get("op")
+    if op not in UPSERT_OPS and op not in DELETE_OPS:
+        return None
+    table = (payload.get("source") or {}).get("table")
+    row = payload.get("before") if op in DELETE_OPS else payload.get("after")
+    if not table or not isinstance(row, dict):
+        return None
+
+    key = unwrap(key)
+    if not isinstance(key, dict) or not key:
+        columns = (key_columns or {}).get(table, ["id"])
+        if not all(column in row for column in columns):
+            return None
+        key = {column: row[column] for column in columns}
+    return RowChange(table, op, key, row)
+
+
+class CDCIngestor(object):
+    """
+    Writes row changes straight to the vector store, no llm in the loop. Creates and updates are embedded and
+    upserted (unchanged text is skipped by its content hash), deletes drop the row's vector.
+    """
+
+    def __init__(self, dbutils:DbUtils, index_name:str, namespace:str):
+        self.dbutils = dbutils
+        self.index_name = index_name
+        self.namespace = namespace
+
+    def apply(self, changes:Iterable[RowChange]) -> Dict[str, int]:
+        upserts = []
+        deletes = []
+        for change in changes:
+            if change.deleted:
+                deletes.append(change.id)
+            else:
+                upserts.append({"id": change.id, "text": change.text()})
+
+        upserted = self.dbutils.embed_and_upsert(self.index_name, self.namespace, upserts) if upserts else 0
+        if deletes:
+            self.dbutils.delete_vectors(self.index_name, self.namespace, deletes)
+        return {"upserted": upserted, "deleted": len(deletes)}
+
+
+class ChangeBatcher(object):
+    """
+    Collects change events for up to max_events events or max_wait seconds after the first one, whichever
+    comes first, and hands them over as one batch. Changes to the same row are coalesced, the last one wins
+    as it is the row's state once the batch is applied.
+    """
+
+    def __init__(self, max_events:int=500, max_wait:float=0.2, clock:Callable[[], float]=time.monotonic):
+        self.max_events = max_events
+        self.max_wait = max_wait
+        self.clock = clock
+        self.pending = {}
+        self.events = 0
+        self.started = None
+        self.coalesced = 0
+
+    def add(self, key:Hashable, item:Any) -> None:
+        if self.started is None:
+            self.started = self.clock()
+        if key in self.pending:
+            self.coalesced += 1
+        self.pending[key] = item
+        self.events += 1
+
+    def time_left(self) -> Optional[float]:
+        """Seconds until the batch is due, None while it is empty."""
+        if self.started is None:
+            return None
+        return max(0.0, self.max_wait - (self.clock() - self.started))
+
+    def ready(self) -> bool:
+        return self.events >= self.max_events or self.time_left() == 0
+
+    def drain(self) -> List[Any]:
+        batch = list(self.pending.values())
+        self.pending = {}
+        self.events = 0
+        self.started = None
+        return batch
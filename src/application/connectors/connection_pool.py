@@ -0,0 +1,114 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator
+
+import psycopg2
+from psycopg2.pool import ThreadedConnectionPool
+
+class PostgresPool(object):
+    """
+    Bounded pool of psycopg2 connections shared by everything a postgres connector runs.
+
+    At most max_size connections are out at once, a caller past that waits up to timeout seconds.
+    A connection idle for over health_check_interval seconds is checked with a select 1 before it is
+    handed out, a dead one is dropped and replaced, so one broken connection does not take the connector down.
+    """
+
+    def __init__(self, connection_params:Dict[str, Any], min_size:int=1, max_size:int=5, timeout:float=10,
+                 health_check_interval:float=30, clock:Callable[[], float]=time.monotonic,
+                 pool_factory:Callable[..., Any]=ThreadedConnectionPool):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.clock = clock
+        # ThreadedConnectionPool raises once it runs out, the semaphore makes callers queue instead
+        self.slots = threading.BoundedSemaphore(max_size)
+        self.pool = pool_factory(min_size, max_size, **connection_params)
+        self.last_used = {}
+        self.lock = threading.Lock()
+        self.in_use = 0
+        self.reconnects = 0
+
+    def healthy(self, connection) -> bool:
+        if connection.closed:
+            return False
+        with self.lock:
+            last_used = self.last_used.get(id(connection))
+        if last_used is not None and self.clock() - last_used < self.health_check_interval:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("select 1")
+            connection.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def checkout(self):
+        if not self.slots.acquire(timeout=self.timeout):
+            raise Exception(f"No postgres connection free after {self.timeout}s.")
+        try:
+            connection = self.pool.getconn()
+            # after a restart every idle connection can be dead, keep going until a good one (or a new one) comes out
+            tries = 1
+            while not self.healthy(connection):
+                self.discard(connection)
+                with self.lock:
+                    self.reconnects += 1
+                # the pool holds at most max_size, once they are all dropped the next one is new
+                if tries > self.max_size:
+                    raise Exception(f"No healthy postgres connection after {tries} tries.")
+                connection = self.pool.getconn()
+                tries += 1
+        except Exception:
+            self.slots.release()
+            raise
+        with self.lock:
+            self.in_use += 1
+        return connection
+
+    def discard(self, connection) -> None:
+        with self.lock:
+            self.last_used.pop(id(connection), None)
+        self.pool.putconn(connection, close=True)
+
+    def checkin(self, connection, broken:bool=False) -> None:
+        try:
+            if broken or connection.closed:
+                self.discard(connection)
+            else:
+                with self.lock:
+                    self.last_used[id(connection)] = self.clock()
+                self.pool.putconn(connection)
+        finally:
+            with self.lock:
+                self.in_use -= 1
+            self.slots.release()
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """A connection for one unit of work, committed on the way out and rolled back on an error."""
+        connection = self.checkout()
+        broken = False
+        try:
+            yield connection
+            connection.commit()
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            # the connection itself went, it is not going back in the pool
+            broken = True
+            raise
+        except BaseException:
+            # also a stream closed part way, its transaction is not left open on the pooled connection
+            if not connection.closed:
+                connection.rollback()
+            raise
+        finally:
+            self.checkin(connection, broken)
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {"max_size": self.max_size, "in_use": self.in_use, "reconnects": self.reconnects}
+
+    def close(self) -> None:
+        self.pool.closeall()
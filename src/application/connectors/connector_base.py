@@ -11,6 +11,10 @@ class ConnectorBase():
     def startup(self, integration_agent):
         self.active = True
 
+    # what /connector/{name}/status reports, children can add their own state
+    def status(self):
+        return {"active": self.active}
+
     # shutdown logic in children should replace this (If you have any)
     def shutdown(self):
         pass
@@ -3,6 +3,7 @@ from colorama import Fore, Style
 
 from application.connectors.connector_base import ConnectorBase
 from application.connectors.rest_connector import RestConnector
+from application.connectors.async_rest_connector import AsyncRestConnector
 from application.connectors.postgres_connector import PostgresConnector
 from application.api.sqlclient import SQLClient
 from application.api.models.connector import Connector
@@ -16,6 +17,7 @@ class ConnectorBuilder():
         self.connectors = {}
         self.connector_types = {
             "rest": RestConnector,
+            "rest_async": AsyncRestConnector,
             "postgres": PostgresConnector
         }
         self.sqlclient = sqlclient
@@ -0,0 +1,87 @@
+import re
+from urllib.parse import urljoin
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+LINK_PATTERN = re.compile(r'<([^>]*)>([^<]*)')
+
+def lookup(body:Any, path:Optional[str]) -> Any:
+    """Follows a dotted path like "meta.next_cursor" into a json body."""
+    if not path:
+        return body
+    for key in path.split("."):
+        if not isinstance(body, dict):
+            return None
+        body = body.get(key)
+    return body
+
+def next_link(header:Optional[str]) -> Optional[str]:
+    # Link: <https://api/items?page=2>; rel="next", <https://api/items?page=9>; rel="last"
+    for url, attributes in LINK_PATTERN.findall(header or ""):
+        if re.search(r'rel="?[^";,]*\bnext\b', attributes):
+            return url
+    return None
+
+
+class Pagination(object):
+    """
+    How a connector's endpoints page, set in c_params["pagination"]:
+
+    style: cursor, offset or link.
+    items: dotted path to the list of items in a page body, the body itself when left out.
+    cursor: cursor_param (sent back, "cursor") and next_cursor (dotted path in the body, "next_cursor").
+    offset: offset_param ("offset"), limit_param ("limit") and page_size (100). The last page is a short one.
+    link: follows the rel="next" url of the Link header.
+    max_pages caps a runaway api (1000).
+    id_field: the item field used as the vector id when pages are ingested, the item's position otherwise.
+    """
+
+    STYLES = ("cursor", "offset", "link")
+
+    def __init__(self, settings:Dict[str, Any]):
+        self.style = settings.get("style")
+        if self.style not in self.STYLES:
+            raise ValueError(f"Unknown pagination style: {self.style}")
+        self.items_path = settings.get("items")
+        self.cursor_param = settings.get("cursor_param", "cursor")
+        self.next_cursor_path = settings.get("next_cursor", "next_cursor")
+        self.offset_param = settings.get("offset_param", "offset")
+        self.limit_param = settings.get("limit_param", "limit")
+        self.page_size = settings.get("page_size", 100)
+        self.max_pages = settings.get("max_pages", 1000)
+        self.id_field = settings.get("id_field")
+
+    def items(self, body:Any) -> List[Any]:
+        items = lookup(body, self.items_path)
+        if items is None:
+            return []
+        return items if isinstance(items, list) else [items]
+
+    def pages(self, fetch_page:Callable[[str, Optional[Dict]], Tuple[Any, Any]], url:str,
+              params:Optional[Dict]=None) -> Iterator[List[Any]]:
+        """Yields the items of one page at a time, the next page is only fetched once this one is used."""
+        params = dict(params or {})
+        if self.style == "offset":
+            params[self.limit_param] = self.page_size
+            params.setdefault(self.offset_param, 0)
+
+        for _ in range(self.max_pages):
+            body, headers = fetch_page(url, params or None)
+            items = self.items(body)
+            yield items
+
+            if self.style == "cursor":
+                cursor = lookup(body, self.next_cursor_path)
+                if not cursor or not items:
+                    return
+                params = {**params, self.cursor_param: cursor}
+            elif self.style == "offset":
+                if len(items) < self.page_size:
+                    return
+                params = {**params, self.offset_param: int(params[self.offset_param]) + len(items)}
+            else:
+                link = next_link(headers.get("Link"))
+                if not link:
+                    return
+                # the next link carries its own query string
+                url = urljoin(url, link)
+                params = {}
@@ -1,12 +1,39 @@
 from psycopg2.extras import DictCursor
 from confluent_kafka import Consumer
-import psycopg2
+from colorama import Fore, Style
 import json
+import re
 import requests
 import threading
+import uuid
 
 from application.api.models.connector import Connector
 from application.connectors.connector_base import ConnectorBase
+from application.connectors.connection_pool import PostgresPool
+from application.connectors.cdc import CDCIngestor, ChangeBatcher, parse_change, decode
+
+# statements that can change what load_metadata returns
+DDL_PATTERN = re.compile(r"^\s*(create|alter|drop|rename|comment)\b", re.IGNORECASE)
+
+SCHEMA_QUERY = """
+    select c.table_name, c.column_name, c.data_type
+    from information_schema.columns c
+    join information_schema.tables t on t.table_schema = c.table_schema and t.table_name = c.table_name
+    where c.table_schema = 'public'
+    order by c.table_name, c.ordinal_position
+"""
+
+def event_columns(event):
+    """The table and column names a debezium change event carries, None when it has neither."""
+    if not isinstance(event, dict):
+        return None
+    # with schemas enabled the change sits under payload
+    payload = event.get("payload", event) or {}
+    table = (payload.get("source") or {}).get("table")
+    row = payload.get("after") or payload.get("before")
+    if not table or not isinstance(row, dict):
+        return None
+    return table, set(row.keys())
 
 class PostgresConnector(ConnectorBase):
     def __init__(self, config: Connector):
@@ -36,19 +63,122 @@ class PostgresConnector(ConnectorBase):
             }
         }
 
+        # optional, sizes for the connection pool made on startup
+        self.pool_settings = {
+            "min_size": config.c_params.get("pool_min", 1),
+            "max_size": config.c_params.get("pool_max", 5),
+            "timeout": config.c_params.get("pool_timeout", 10),
+            "health_check_interval": config.c_params.get("health_check_interval", 30)
+        }
+        self.pool = None
+
+        # optional, bounds on what one query can pull back
+        self.fetch_size = config.c_params.get("fetch_size", 1000)
+        self.max_rows = config.c_params.get("max_rows", 10000)
+        # milliseconds, 0 turns it off
+        self.statement_timeout = config.c_params.get("statement_timeout", 30000)
+
+        # "agent" re-runs the integration agent on a change, "direct" writes the changed row's vector itself
+        self.ingest_mode = config.e_params.get("ingest_mode", "agent")
+        self.index_name = config.e_params.get("index_name", "quickstart")
+        # primary key columns for tables whose events come without a message key, {table: [columns]}
+        self.key_columns = config.e_params.get("key_columns", {})
+        self.cdc = None
+        # change events are handed on in batches of up to batch_size, or batch_wait_ms after the first one
+        self.batch_size = config.e_params.get("batch_size", 500)
+        self.batch_wait_ms = config.e_params.get("batch_wait_ms", 200)
+
+        # {table: {column: type}} for the public schema, kept until ddl changes it
+        self.schema_cache = None
+        self.schema_version = 0
+        self.schema_lock = threading.Lock()
+
         self.monitor_thread = None
         self.stop_monitoring = False
 
+    def open_pool(self):
+        if self.pool is None:
+            raise Exception(f"No connection pool for connector: {self.name}")
+        return self.pool
+
+    # each query borrows its own connection, so chat queries and cdc metadata loads do not queue on one
     def execute_sql_query(self, query):
-        cursor = self.connection.cursor(cursor_factory=DictCursor)
-        cursor.execute(query)
-        self.connection.commit()
+        with self.open_pool().connection() as connection:
+            with connection.cursor(cursor_factory=DictCursor) as cursor:
+                self.set_statement_timeout(cursor)
+                cursor.execute(query)
+                # an unbounded select * should not end up whole in the llm context
+                rows = cursor.fetchmany(self.max_rows) if cursor.description else None
+        # the pool commits on the way out, a ddl that was rolled back leaves the schema as it was
+        if DDL_PATTERN.match(query):
+            self.invalidate_metadata()
+        return rows
 
-        if cursor.description:
-            return cursor.fetchall()
+    def set_statement_timeout(self, cursor):
+        # local to the transaction, the pooled connection goes back with its default
+        if self.statement_timeout:
+            cursor.execute("set local statement_timeout = %s", (int(self.statement_timeout),))
+
+    def stream_query(self, query, batch_size=None, max_rows=None):
+        """
+        Runs a select on a named server side cursor and yields its rows in batches of plain dicts,
+        so the result never has to fit in memory. Stops after max_rows rows (the connector's max_rows by default).
+        """
+        batch_size = batch_size or self.fetch_size
+        max_rows = self.max_rows if max_rows is None else max_rows
+
+        with self.open_pool().connection() as connection:
+            with connection.cursor(cursor_factory=DictCursor) as cursor:
+                self.set_statement_timeout(cursor)
+            # named, so postgres keeps the result and hands it over fetch_size rows at a time
+            with connection.cursor(name=f"stream_{uuid.uuid4().hex}", cursor_factory=DictCursor) as cursor:
+                cursor.itersize = batch_size
+                cursor.execute(query)
+                sent = 0
+                while not max_rows or sent < max_rows:
+                    size = min(batch_size, max_rows - sent) if max_rows else batch_size
+                    rows = cursor.fetchmany(size)
+                    if not rows:
+                        return
+                    sent += len(rows)
+                    yield [dict(row) for row in rows]
+
+    def iter_rows(self, query, max_rows=None):
+        for batch in self.stream_query(query, max_rows=max_rows):
+            yield from batch
 
     def load_metadata(self):
-        return self.execute_sql_query("select * from information_schema.tables where table_schema='public'")
+        """Tables of the public schema with their column names and types, from the cache after the first call."""
+        with self.schema_lock:
+            if self.schema_cache is not None:
+                return self.schema_cache
+            version = self.schema_version
+
+        schema = {}
+        for row in self.execute_sql_query(SCHEMA_QUERY) or []:
+            schema.setdefault(row["table_name"], {})[row["column_name"]] = row["data_type"]
+
+        with self.schema_lock:
+            # ddl that landed while this was loading makes it stale already
+            if version == self.schema_version:
+                self.schema_cache = schema
+        return schema
+
+    def invalidate_metadata(self):
+        with self.schema_lock:
+            self.schema_cache = None
+            self.schema_version += 1
+
+    def check_event_schema(self, event):
+        # postgres does not stream ddl, a change event with columns the cache does not know about is the sign of one
+        columns = event_columns(event)
+        if columns is None:
+            return
+        table, names = columns
+        with self.schema_lock:
+            stale = self.schema_cache is not None and set(self.schema_cache.get(table, {})) != names
+        if stale:
+            self.invalidate_metadata()
 
     def debezium_connector(self):
         config_json = json.dumps(self.event_config)
@@ -127,55 +257,78 @@ class PostgresConnector(ConnectorBase):
         # Subscribe consumer to all matching topics
         consumer.subscribe(matching_topics)
         
+        batcher = ChangeBatcher(self.batch_size, self.batch_wait_ms / 1000)
+
         while not self.stop_monitoring:
-            msg = consumer.poll(1.0)
-                
-            if msg is None:
-                continue
-                    
+            time_left = batcher.time_left()
+            messages = consumer.consume(
+                num_messages=self.batch_size - batcher.events,
+                timeout=1.0 if time_left is None else time_left
+            )
+            self.collect_changes(messages, batcher)
+
+            if batcher.ready():
+                self.flush_changes(batcher.drain(), integration_agent)
+
+        if batcher.events:
+            self.flush_changes(batcher.drain(), integration_agent)
+        consumer.close()
+
+    def collect_changes(self, messages, batcher):
+        for msg in messages:
             if msg.error() or msg.value() is None:
                 continue
-            
-            # Useful for potentially debugging
-            # Maybe we should implement verification check for event???
-            # event = json.loads(msg.value().decode('utf-8'))
-                    
-            # Get the payload which contains the actual data
-            # payload = event.get('payload', {})
-
-            # Get timestamps
-            # source_ts_ms = payload.get('source', {}).get('ts_ms')
-                    
-            # Get table information
-            # source_schema = payload.get('source', {}).get('schema')
-            # source_table = payload.get('source', {}).get('table')
-                
-            # Timestamp
-            # source_datetime = datetime.fromtimestamp(source_ts_ms/1000).strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
-                    
-            # Operation type
-            # operation = payload.get('op')
-                    
-            # print(f"\n--- Database Change Detected for {self.name} ---")
-            # print(f"Schema: {source_schema}")
-            # print(f"Table: {source_table}")
-            # print(f"Operation: {operation}")
-            # print(f"Occurred at: {source_datetime}")
-            
-            # Process data if integration_agent is provided
-            
-            if integration_agent:
-                # Re-run the same ingestion process that runs on startup
-                integration_agent.graph.invoke({
-                    "messages": [
-                        {"role": "user", "content": "This is the name of the connector: " + self.event_config["name"] + ", " + "this is the type of connector: " + self.type_c + ", " + "This is the schema: " + str(self.load_metadata())},
-                    ],
-                    "data_store": self.event_config["name"]
-                })
-        consumer.close()
+
+            try:
+                event = json.loads(msg.value().decode('utf-8'))
+            except ValueError:
+                event = None
+            self.check_event_schema(event)
+
+            change = parse_change(event, decode(msg.key()), self.key_columns)
+            if change is not None:
+                batcher.add(change.id, change)
+            elif self.cdc is None:
+                # the agent re-reads the source anyway, any event is worth a run
+                batcher.add(("event", batcher.events), None)
+
+    def flush_changes(self, batch, integration_agent=None):
+        if self.cdc is not None:
+            return self.apply_changes([change for change in batch if change is not None])
+
+        if integration_agent and batch:
+            # one run for the whole batch, re-run the same ingestion process that runs on startup
+            integration_agent.graph.invoke({
+                "messages": [
+                    {"role": "user", "content": "This is the name of the connector: " + self.event_config["name"] + ", " + "this is the type of connector: " + self.type_c + ", " + "This is the schema: " + str(self.load_metadata())},
+                ],
+                "data_store": self.event_config["name"]
+            })
+
+    def apply_changes(self, changes):
+        if not changes or self.cdc is None:
+            return None
+        try:
+            return self.cdc.apply(changes)
+        except Exception as e:
+            # one bad batch should not stop the monitor thread
+            print(Fore.RED + "ERROR" + Style.RESET_ALL + f":    [{self.name}] {len(changes)} changes not ingested: {e}")
+            return None
+
+    def status(self):
+        return {**super().status(), "pool": self.pool.stats() if self.pool is not None else None}
 
     def startup(self, integration_agent):
-        self.connection = psycopg2.connect(**self.connection_params)
+        self.pool = PostgresPool(self.connection_params, **self.pool_settings)
+        if self.ingest_mode == "direct" and integration_agent is not None:
+            self.cdc = CDCIngestor(integration_agent.dbutils, self.index_name, self.name)
         self.debezium_connector()
         self.start_monitoring(integration_agent)
         self.active = True
+
+    def shutdown(self):
+        self.stop_monitoring_events()
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+        self.active = False
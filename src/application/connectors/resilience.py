@@ -0,0 +1,125 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+class RateLimiter(object):
+    """
+    Token bucket for the requests one connector sends: rate tokens a second, at most burst of them saved up.
+    A request that would have to wait longer than max_wait for its token fails instead of holding a thread.
+    """
+
+    def __init__(self, rate:float, burst:Optional[float]=None, max_wait:float=5, clock:Callable[[], float]=time.monotonic):
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1, rate))
+        self.max_wait = max_wait
+        self.clock = clock
+        self.tokens = self.burst
+        self.updated = clock()
+        self.throttled = 0
+        self.rejected = 0
+        self.lock = threading.Lock()
+
+    def refill(self, now:float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self) -> float:
+        """Takes a token and returns the seconds to wait before using it, raises when that is over max_wait."""
+        with self.lock:
+            self.refill(self.clock())
+            # tokens can go below zero, later callers queue up behind the ones already waiting
+            wait = max(0.0, (1 - self.tokens) / self.rate)
+            if wait > self.max_wait:
+                self.rejected += 1
+                raise Exception(f"Rate limit reached, a slot would take {wait:.1f}s.")
+            self.tokens -= 1
+            if wait > 0:
+                self.throttled += 1
+            return wait
+
+    def status(self) -> Dict[str, Any]:
+        with self.lock:
+            self.refill(self.clock())
+            return {
+                "rate": self.rate,
+                "burst": self.burst,
+                "tokens": round(self.tokens, 3),
+                "throttled": self.throttled,
+                "rejected": self.rejected
+            }
+
+
+class CircuitBreaker(object):
+    """
+    Stops calling an upstream that keeps failing.
+
+    closed: requests go through, failure_threshold failures in a row open the circuit.
+    open: requests fail straight away for reset_timeout seconds.
+    half_open: a single trial request goes through, its success closes the circuit and a failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold:int=5, reset_timeout:float=30, clock:Callable[[], float]=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self.rejected = 0
+        self.lock = threading.Lock()
+
+    def before_request(self) -> None:
+        with self.lock:
+            if self.state == self.OPEN and self.retry_in() == 0:
+                self.state = self.HALF_OPEN
+                self.trial_running = False
+
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.HALF_OPEN and not self.trial_running:
+                self.trial_running = True
+                return
+            self.rejected += 1
+            if self.state == self.HALF_OPEN:
+                raise Exception("Circuit half open, waiting on the trial request.")
+            raise Exception(f"Circuit open, not calling upstream for another {self.retry_in():.0f}s.")
+
+    # the trial never reached upstream, let the next request try instead
+    def release(self) -> None:
+        with self.lock:
+            self.trial_running = False
+
+    def record_success(self) -> None:
+        with self.lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def record_failure(self) -> None:
+        with self.lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+                self.trial_running = False
+
+    def retry_in(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.reset_timeout - (self.clock() - self.opened_at))
+
+    def status(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "state": self.state,
+                "failures": self.failures,
+                "failure_threshold": self.failure_threshold,
+                "retry_in": round(self.retry_in(), 3) if self.state == self.OPEN else 0.0,
+                "rejected": self.rejected
+            }
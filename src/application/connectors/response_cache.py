@@ -0,0 +1,108 @@
+import copy
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from application.lru_cache import LRUCache
+
+class CachedResponse(object):
+    def __init__(self, body:Any, etag:Optional[str], last_modified:Optional[str], expires_at:float):
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires_at = expires_at
+
+    def fresh(self, now:float) -> bool:
+        return now < self.expires_at
+
+
+class ResponseCache(object):
+    """
+    Opt in cache for connector GETs, keyed on method, url and params.
+
+    Freshness comes from Cache-Control (max-age, no-cache, no-store) and falls back to ttl seconds.
+    Stale entries are kept while they have an ETag or Last-Modified, the next request for them is made
+    conditional and a 304 serves the cached body again.
+    At most max_size entries, the least recently used go first.
+    """
+
+    def __init__(self, max_size:int=256, ttl:float=60, clock:Callable[[], float]=time.monotonic):
+        self.ttl = ttl
+        self.clock = clock
+        # no ttl on the lru itself, stale entries are still worth revalidating
+        self.entries = LRUCache(max_size)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+    def key(self, method:str, url:str, params:Any) -> Hashable:
+        # params can be any json the agent came up with, so they are keyed by their canonical json
+        return (method, url, json.dumps(params, sort_keys=True, default=str))
+
+    def lookup(self, key:Hashable) -> Optional[CachedResponse]:
+        return self.entries.get(key)
+
+    def freshness(self, headers:Any) -> Optional[float]:
+        """Seconds a response stays fresh, None when it must not be stored."""
+        directives = {}
+        for directive in (headers.get("Cache-Control") or "").split(","):
+            name, _, value = directive.strip().partition("=")
+            directives[name.lower()] = value.strip('"')
+
+        if "no-store" in directives:
+            return None
+        if "no-cache" in directives:
+            return 0
+        if directives.get("max-age", "").isdigit():
+            return int(directives["max-age"])
+        return self.ttl
+
+    def conditional_headers(self, entry:CachedResponse) -> Dict[str, str]:
+        headers = {}
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    # the caller gets its own copy, so changing a response never changes the cache
+    def hit(self, entry:CachedResponse) -> Any:
+        with self.lock:
+            self.hits += 1
+        return copy.deepcopy(entry.body)
+
+    def not_modified(self, key:Hashable, entry:CachedResponse, headers:Any) -> Any:
+        with self.lock:
+            self.revalidated += 1
+        seconds = self.freshness(headers)
+        entry.expires_at = self.clock() + (seconds or 0)
+        self.entries.put(key, entry)
+        return copy.deepcopy(entry.body)
+
+    def store(self, key:Hashable, headers:Any, body:Any) -> None:
+        with self.lock:
+            self.misses += 1
+        seconds = self.freshness(headers)
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        if seconds is None or (seconds == 0 and not etag and not last_modified):
+            # nothing to serve it from later
+            self.entries.pop(key)
+            return
+        self.entries.put(key, CachedResponse(copy.deepcopy(body), etag, last_modified, self.clock() + seconds))
+
+    def stats(self) -> Dict[str, Any]:
+        entries = self.entries.stats()
+        with self.lock:
+            lookups = self.hits + self.revalidated + self.misses
+            return {
+                "size": entries["size"],
+                "max_size": entries["max_size"],
+                "hits": self.hits,
+                "revalidated": self.revalidated,
+                "misses": self.misses,
+                "evictions": entries["evictions"],
+                "hit_rate": (self.hits + self.revalidated) / lookups if lookups else 0.0
+            }
@@ -1,8 +1,18 @@
 import requests
 import json
+import time
+import random
+from requests.adapters import HTTPAdapter
 from requests.exceptions import RequestException
+from concurrent.futures import ThreadPoolExecutor
 from application.api.models.connector import Connector
 from application.connectors.connector_base import ConnectorBase
+from application.connectors.response_cache import ResponseCache
+from application.connectors.pagination import Pagination
+from application.connectors.resilience import RateLimiter, CircuitBreaker
+
+# responses worth another go, anything else in the 4xx range will fail the same way again
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
 
 class RestConnector(ConnectorBase):
     def __init__(self, config: Connector):
@@ -12,7 +22,35 @@ class RestConnector(ConnectorBase):
         self.headers = config.c_params["headers"]
         self.timeout = config.c_params["timeout"]
         self.retries = config.c_params["retries"]
+        # optional, seconds for the backoff between retries
+        self.backoff_base = config.c_params.get("backoff_base", 0.5)
+        self.backoff_max = config.c_params.get("backoff_max", 30)
         self.schema = ""
+
+        self.pool_size = config.c_params.get("pool_size", 10)
+        # how many requests of one fetch_many batch are in flight at once
+        self.max_concurrency = config.c_params.get("max_concurrency", 8)
+        self.session = self.create_session()
+
+        # opt in, GET responses are kept per connector
+        self.cache = None
+        if str(config.c_params.get("cache")) == "True":
+            self.cache = ResponseCache(config.c_params.get("cache_size", 256), config.c_params.get("cache_ttl", 60))
+
+        # optional, c_params["rate_limit"] = {"rate", "burst", "max_wait"}
+        self.rate_limiter = None
+        if "rate_limit" in config.c_params:
+            self.rate_limiter = RateLimiter(**config.c_params["rate_limit"])
+
+        # optional, c_params["circuit_breaker"] = {"failure_threshold", "reset_timeout"}
+        self.circuit_breaker = None
+        if "circuit_breaker" in config.c_params:
+            self.circuit_breaker = CircuitBreaker(**config.c_params["circuit_breaker"])
+
+        # optional, how paged endpoints are walked by paginate()
+        self.pagination = None
+        if "pagination" in config.c_params:
+            self.pagination = Pagination(config.c_params["pagination"])
         
         if config.c_params["has_schema"] == "True":
             self.schema = self.load_schema()
@@ -21,21 +59,66 @@ class RestConnector(ConnectorBase):
             self.api_key = config.c_params["api_key"]
             self.headers["Authorization"] = f"Bearer {self.api_key}"
     
+    # one keep-alive session per connector, so tool calls reuse connections instead of a new handshake each
+    def create_session(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
     def load_schema(self):
         schema = f"application/seeds/connectors/spec_{self.name}.json"
         with open(schema, "r") as file:
             return json.load(file)
 
+    def cache_lookup(self, method, url, params):
+        if self.cache is None or method != "GET":
+            return None, None
+        key = self.cache.key(method, url, params)
+        return key, self.cache.lookup(key)
+
+    def request_headers(self, cached):
+        # a stale entry with validators makes the request conditional
+        if cached is None or self.cache is None:
+            return self.headers
+        return {**self.headers, **self.cache.conditional_headers(cached)}
+
+    def read_response(self, response, cache_key, cached):
+        if self.cache is None:
+            return response.json()
+        if cached is not None and response.status_code == 304:
+            return self.cache.not_modified(cache_key, cached, response.headers)
+        body = response.json()
+        if cache_key is not None:
+            self.cache.store(cache_key, response.headers, body)
+        return body
+
+    def cache_stats(self):
+        return self.cache.stats() if self.cache is not None else None
+
     # dirty method for making http req, use the below nicer methods as tools instead.
     def request_handler(self, method, endpoint, params=None, data=None):
         url = f"{self.base_url}{endpoint}"
-        headers = self.headers
+        cache_key, cached = self.cache_lookup(method, url, params)
+        if self.cache is not None and cached is not None and cached.fresh(self.cache.clock()):
+            return self.cache.hit(cached)
+
+        response = self.send(method, url, params, data, self.request_headers(cached))
+        return self.read_response(response, cache_key, cached)
+
+    # the raw response, with our retries and backoff
+    def send(self, method, url, params=None, data=None, headers=None):
+        headers = self.headers if headers is None else headers
 
         # loop on our retries
         for attempt in range(self.retries):
+            wait = self.admit()
+            if wait:
+                time.sleep(wait)
             # for once i need try catch
             try:
-                response = requests.request(
+                response = self.session.request(
                     method,
                     url,
                     params=params,
@@ -43,16 +126,72 @@ class RestConnector(ConnectorBase):
                     headers=headers,
                     timeout=self.timeout
                 )
-                response.raise_for_status()
-                return response.json()
+                # a 304 answers a conditional request, it is not a failure
+                if response.status_code != 304:
+                    response.raise_for_status()
+                self.record_outcome(True)
+                return response
             except RequestException as e:
+                retryable = self.retryable(e)
+                # a 4xx still means upstream is up and answering
+                self.record_outcome(not retryable)
+                if not retryable:
+                    raise Exception(f"Request failed, not retrying. {e}")
                 if attempt == self.retries - 1:
                     raise Exception(f"Request failed after {self.retries} attempts. {e}")
-                continue
+                time.sleep(self.backoff(attempt, e))
+        raise Exception(f"Request not sent, retries is {self.retries}.")
+
+    # fails fast on an open circuit, otherwise the seconds to wait for a rate limit slot
+    def admit(self):
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.before_request()
+        if self.rate_limiter is None:
+            return 0
+        try:
+            return self.rate_limiter.reserve()
+        except Exception:
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.release()
+            raise
+
+    def record_outcome(self, success):
+        if self.circuit_breaker is None:
+            return
+        if success:
+            self.circuit_breaker.record_success()
+        else:
+            self.circuit_breaker.record_failure()
+
+    def status(self):
+        return {
+            **super().status(),
+            "circuit_breaker": self.circuit_breaker.status() if self.circuit_breaker is not None else None,
+            "rate_limit": self.rate_limiter.status() if self.rate_limiter is not None else None
+        }
     
+    def backoff(self, attempt, error):
+        # exponential backoff with full jitter, so retrying callers do not all come back at once
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, min(self.backoff_max, int(retry_after)))
+        return delay
+
+    def retryable(self, error):
+        response = getattr(error, "response", None)
+        if response is not None:
+            return response.status_code in RETRYABLE_STATUS
+        return True
+
     def load_metadata(self):
         return self.schema
 
+    def shutdown(self):
+        self.session.close()
+        self.active = False
+
     # proper methods for use by the agent
     def get(self, endpoint, params=None):
         return self.request_handler("GET", endpoint, params=params)
@@ -65,3 +204,30 @@ class RestConnector(ConnectorBase):
     
     def delete(self, endpoint):
         return self.request_handler("DELETE", endpoint)
+
+    # pages skip the response cache, they are streamed through once
+    def fetch_page(self, url, params=None):
+        response = self.send("GET", url, params)
+        return response.json(), response.headers
+
+    def paginate(self, endpoint, params=None):
+        """Every page of a paged endpoint as a list of items, fetched one page at a time as they are used."""
+        if self.pagination is None:
+            raise Exception(f"No pagination set up for connector: {self.name}")
+        return self.pagination.pages(self.fetch_page, f"{self.base_url}{endpoint}", params)
+
+    def iter_items(self, endpoint, params=None):
+        for page in self.paginate(endpoint, params):
+            yield from page
+
+    def fetch_one(self, endpoint, params=None):
+        # one failed endpoint should not lose the rest of the batch
+        try:
+            return self.get(endpoint, params)
+        except Exception as e:
+            return {"error": str(e)}
+
+    # GET a list of (endpoint, params) at once, results come back in the same order
+    def fetch_many(self, requests_to_make):
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_concurrency, len(requests_to_make)))) as executor:
+            return list(executor.map(lambda request: self.fetch_one(*request), requests_to_make))
@@ -1,35 +1,39 @@
-from pinecone import Pinecone, ServerlessSpec, Index, QueryResponse, IndexModel, NotFoundException
+from pinecone import Pinecone
 from application.environment import Environment
+from application.lru_cache import LRUCache
+from application.vector_stores.vector_store_base import VectorStoreBase
+from application.vector_stores.pinecone_vector_store import PineconeVectorStore
+from concurrent.futures import ThreadPoolExecutor
 from itertools import *
-from typing import Any, Dict, List
+import heapq
+import hashlib
+from typing import Any, Dict, Iterable, List, Optional
 
 class DbUtils(object):
 
-    def __init__(self, env:Environment, generator_batch_size:int, upsert_batch_size:int, embedding_model:str):
+    def __init__(self, env:Environment, generator_batch_size:int, upsert_batch_size:int, embedding_model:str,
+                 query_cache_size:int=1024, query_cache_ttl:Optional[float]=3600, search_workers:int=8,
+                 vector_store:Optional[VectorStoreBase]=None):
         self.env = env
+        # the pinecone client is still used for inference, the vectors live wherever the store puts them
         self.client = self.get_client(env)
+        self.vector_store = vector_store if vector_store is not None else PineconeVectorStore(self.client)
         self.generator_batch_size = generator_batch_size
         self.upsert_batch_size = upsert_batch_size
         self.embedding_model = embedding_model
+        # repeated questions (and the same question across namespaces) skip the inference call
+        self.query_cache = LRUCache(query_cache_size, query_cache_ttl)
+        self.search_workers = search_workers
     
     def get_client(self, env:Environment) -> Pinecone:
         pc_client = Pinecone(api_key=env.PINECONE_API_KEY)
         return pc_client
 
-    def get_index(self, index_name:str) -> Index:
-        return self.client.Index(index_name)
+    def get_index(self, index_name:str) -> Any:
+        return self.vector_store.get_index(index_name)
 
     def create_index(self, index_name:str, dimension:int) -> None:
-        # hardcoded value are to stay within the free tier
-        self.client.create_index(
-            name=index_name,
-            dimension=dimension,
-            metric="cosine",
-            spec=ServerlessSpec(
-            cloud="aws",
-            region="us-east-1"
-            )
-        )
+        self.vector_store.create_index(index_name, dimension)
     
     # we expect an attribute in each row called text
     # inputs must match the length the embedding model supports
@@ -44,10 +48,21 @@ class DbUtils(object):
         
         return embeddings
 
-    def create_query_embedding(self, query:str) -> list[dict]:
+    def normalize_query(self, query:str) -> str:
+        return " ".join(query.split())
+
+    def create_query_embedding(self, query:str) -> list[float]:
+        normalized = self.normalize_query(query)
+        key = (self.embedding_model, normalized)
+        cached = self.query_cache.get(key)
+        if cached is not None:
+            if self.env.DEBUG_MODE:
+                print("Embedding cache hit")
+            return list(cached)
+
         embedding = self.client.inference.embed(
             model=self.embedding_model,
-            inputs=[query],
+            inputs=[normalized],
             parameters={
                 "input_type": "query"
             }
@@ -55,19 +70,74 @@ class DbUtils(object):
         if self.env.DEBUG_MODE:
             print("Embedding created")
         
-        return embedding.data[0].values
+        values = embedding.data[0].values
+        self.query_cache.put(key, tuple(values))
+        return list(values)
     
-    def upsert_chunker(self, iterable:list[dict], batch_size:int):
+    def upsert_chunker(self, iterable:Iterable[Any], batch_size:int):
         it = iter(iterable)
         chunk = tuple(islice(it, batch_size))
         while chunk:
             yield chunk
             chunk = tuple(islice(it, batch_size))
     
+    def content_hash(self, text:str) -> str:
+        # the model is part of the hash, so switching models re-embeds everything
+        return hashlib.sha256(f"{self.embedding_model}\n{text}".encode("utf-8")).hexdigest()
+
+    def with_content_hash(self, vector:Any) -> Any:
+        # every vector written with its text carries the hash of it, that is what the next diff compares against
+        if not isinstance(vector, dict):
+            return vector
+        metadata = vector.get("metadata") or {}
+        if "text" not in metadata or "content_hash" in metadata:
+            return vector
+        return {**vector, "metadata": {**metadata, "content_hash": self.content_hash(metadata["text"])}}
+
+    def existing_hashes(self, index_name:str, namespace:str, ids:list[str]) -> Dict[str, str]:
+        index = self.get_index(index_name)
+        hashes = {}
+        for ids_chunk in self.upsert_chunker(ids, self.upsert_batch_size):
+            response = index.fetch(ids=list(ids_chunk), namespace=namespace)
+            for vector_id, vector in response.vectors.items():
+                metadata = vector.metadata or {}
+                if "content_hash" in metadata:
+                    hashes[vector_id] = metadata["content_hash"]
+        return hashes
+
+    # rows are {id, text}, only the ones that are new or whose text changed come back
+    def changed_rows(self, index_name:str, namespace:str, data:list[dict]) -> list[dict]:
+        if not data:
+            return []
+        stored = self.existing_hashes(index_name, namespace, list(dict.fromkeys(str(d['id']) for d in data)))
+        changed = [d for d in data if stored.get(str(d['id'])) != self.content_hash(d['text'])]
+
+        if self.env.DEBUG_MODE:
+            print(f"Skipping {len(data) - len(changed)} unchanged rows")
+
+        return changed
+
+    def embed_and_upsert(self, index_name:str, namespace:str, data:list[dict]) -> int:
+        """Embed and upsert rows of {id, text}. Rows already stored with the same text are not embedded again."""
+        vectors = []
+        for chunk in self.upsert_chunker(self.changed_rows(index_name, namespace, data), self.generator_batch_size):
+            embeddings = self.create_embedding(list(chunk))
+            for d, e in zip(chunk, embeddings):
+                vectors.append({
+                    "id": str(d['id']),
+                    "values": e['values'],
+                    "metadata": {'text': d['text']}
+                })
+
+        if not vectors:
+            return 0
+        return self.upsert_embeddings(index_name, namespace, vectors)
+
     def upsert_embeddings(self, index_name:str, namespace:str, embeddings:list[dict]) -> int:
 
         total_upserted = 0
         index = self.get_index(index_name);
+        embeddings = [self.with_content_hash(vector) for vector in embeddings]
 
         for ids_vectors_chunk in self.upsert_chunker(embeddings, self.upsert_batch_size):
             response = index.upsert(
@@ -82,6 +152,11 @@ class DbUtils(object):
 
         return total_upserted
 
+    def delete_vectors(self, index_name:str, namespace:str, ids:list[str]) -> None:
+        index = self.get_index(index_name)
+        for ids_chunk in self.upsert_chunker(ids, self.upsert_batch_size):
+            index.delete(ids=list(ids_chunk), namespace=namespace)
+
     def search(self, index_name:str, namespace:str, embedding: list[float], result_amount:int) -> list[Dict]:
         # pass in .data of the embedding here
         index = self.get_index(index_name)
@@ -92,17 +167,48 @@ class DbUtils(object):
             include_values=False,
             include_metadata=True
         )
-        return results.matches
+        return [self.without_content_hash(match) for match in results.matches]
+
+    def without_content_hash(self, match:Any) -> Any:
+        # the hash is only for diffing upserts, it is 64 characters of noise in the llm context
+        metadata = match.get("metadata")
+        if not metadata or "content_hash" not in metadata:
+            return match
+        # a copy, the local store hands out the metadata it keeps
+        metadata = {key: value for key, value in metadata.items() if key != "content_hash"}
+        if isinstance(match, dict):
+            return {**match, "metadata": metadata}
+        match.metadata = metadata
+        return match
+
+    def search_many(self, index_name:str, namespaces:list[str], embedding: list[float], result_amount:int) -> list[Dict]:
+        # one query per namespace, all in flight at once, then a global top k across them
+        if not namespaces:
+            return []
+
+        with ThreadPoolExecutor(max_workers=min(len(namespaces), self.search_workers)) as executor:
+            per_namespace = list(executor.map(
+                lambda namespace: self.search(index_name, namespace, embedding, result_amount),
+                namespaces
+            ))
+
+        merged = []
+        for namespace, matches in zip(namespaces, per_namespace):
+            for match in matches:
+                merged.append({
+                    "id": match["id"],
+                    "score": match["score"],
+                    "metadata": match.get("metadata"),
+                    "namespace": namespace
+                })
+
+        return heapq.nlargest(result_amount, merged, key=lambda match: match["score"])
     
     def index_exists(self, index_name:str) -> bool:
-        try:
-            self.client.describe_index(index_name)
-            return True
-        except NotFoundException:
-            return False
+        return self.vector_store.index_exists(index_name)
     
-    def describe_index(self, index_name:str) -> IndexModel:
-        return self.client.describe_index(index_name)
+    def describe_index(self, index_name:str) -> Any:
+        return self.vector_store.describe_index(index_name)
     
     def get_namespaces(self, index_name:str) -> List:
         index = self.get_index(index_name)
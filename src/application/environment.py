@@ -6,6 +6,14 @@ class Environment(object):
         load_dotenv()
         self.PINECONE_API_KEY = os.getenv('PINECONE_API_KEY')
         self.DEBUG_MODE = os.getenv('DEBUG_MODE') == "True"
+        self.FIXED_PIPELINE = os.getenv('FIXED_PIPELINE') == "True"
+        # pinecone or local
+        self.VECTOR_STORE = os.getenv('VECTOR_STORE', 'pinecone')
+        # where the local vector store keeps its segments, empty keeps everything in memory
+        self.VECTOR_STORE_PATH = os.getenv('VECTOR_STORE_PATH', '')
+        # approximate search for big namespaces of the local vector store, nprobe trades recall for speed
+        self.VECTOR_STORE_ANN = os.getenv('VECTOR_STORE_ANN') == "True"
+        self.VECTOR_STORE_NPROBE = int(os.getenv('VECTOR_STORE_NPROBE', '8'))
         self.SQL_LITE_DB_STRING = os.getenv('SQL_LITE_DB_STRING')
         self.DEEPSEEK_API_KEY = os.getenv('DEEPSEEK_API_KEY')
         self.LOCAL_HOST_BACKEND_IP = os.getenv('LOCAL_HOST_BACKEND_IP')
@@ -0,0 +1,71 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+class LRUCache(object):
+    """
+    A bounded, thread safe least recently used cache.
+    Entries optionally expire after ttl seconds. Keeps hit and miss counters.
+    """
+
+    def __init__(self, max_size:int, ttl:Optional[float]=None, clock:Callable[[], float]=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key:Hashable, default:Any=None) -> Any:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= self.clock():
+                del self.entries[key]
+                self.misses += 1
+                return default
+
+            # most recently used goes to the end
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key:Hashable, value:Any) -> None:
+        expires_at = self.clock() + self.ttl if self.ttl is not None else None
+        with self.lock:
+            self.entries[key] = (value, expires_at)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key:Hashable, default:Any=None) -> Any:
+        with self.lock:
+            entry = self.entries.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
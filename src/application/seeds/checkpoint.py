@@ -0,0 +1,93 @@
+import os
+import json
+import hashlib
+from itertools import islice
+from typing import Callable, Dict, Iterator, List, Optional
+
+class SeedCheckpoint(object):
+    """
+    How far one seed of (index, namespace, file) got.
+
+    Batches finish out of order on the worker pool, the checkpoint only moves past a batch once every
+    batch before it is upserted too, so "rows" is always a prefix of the file that is safely stored.
+    Next to it sits a digest chained over the hash of every row in that prefix, a resumed run checks the
+    file still starts with the same rows before skipping them.
+    Without a directory nothing is written and resume starts from the top.
+    """
+
+    def __init__(self, directory:Optional[str], index_name:str, namespace:str, file_path:str):
+        self.index_name = index_name
+        self.namespace = namespace
+        self.file_path = os.path.abspath(file_path)
+        self.path = None
+        if directory is not None:
+            key = hashlib.sha256(f"{index_name}\n{namespace}\n{self.file_path}".encode("utf-8")).hexdigest()[:24]
+            self.path = os.path.join(directory, f"seed-{key}.json")
+
+        self.rows = 0
+        self.hasher = hashlib.sha256()
+        # row hashes of every batch handed out but not yet part of the prefix
+        self.batches: Dict[int, List[bytes]] = {}
+        self.finished = set()
+        self.next_batch = 0
+
+    def row_hash(self, row:Dict) -> bytes:
+        return hashlib.sha256(f"{row['id']}\0{row['text']}".encode("utf-8")).digest()
+
+    def load(self) -> Optional[Dict]:
+        if self.path is None or not os.path.exists(self.path):
+            return None
+        with open(self.path, "r") as file:
+            return json.load(file)
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # written to a temp file then swapped in, so a crash never leaves half a checkpoint
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w") as file:
+            json.dump({
+                "index": self.index_name,
+                "namespace": self.namespace,
+                "file": self.file_path,
+                "rows": self.rows,
+                "digest": self.hasher.hexdigest()
+            }, file)
+        os.replace(temp_path, self.path)
+
+    def resume(self, make_rows:Callable[[], Iterator[Dict]]) -> Iterator[Dict]:
+        """The rows left to seed, past the ones a previous run already upserted."""
+        saved = self.load()
+        rows = make_rows()
+        if not saved or saved["rows"] == 0:
+            return rows
+
+        hasher = hashlib.sha256()
+        skipped = 0
+        for row in islice(rows, saved["rows"]):
+            hasher.update(self.row_hash(row))
+            skipped += 1
+        if skipped == saved["rows"] and hasher.hexdigest() == saved["digest"]:
+            self.rows = skipped
+            self.hasher = hasher
+            return rows
+
+        # the file changed under the checkpoint, seed all of it again
+        return make_rows()
+
+    def add(self, sequence:int, batch:List[Dict]) -> None:
+        self.batches[sequence] = [self.row_hash(row) for row in batch]
+
+    def finish(self, sequence:int) -> None:
+        self.finished.add(sequence)
+        advanced = False
+        while self.next_batch in self.finished:
+            self.finished.discard(self.next_batch)
+            for row_hash in self.batches.pop(self.next_batch):
+                self.hasher.update(row_hash)
+                self.rows += 1
+            self.next_batch += 1
+            advanced = True
+        if advanced:
+            self.save()
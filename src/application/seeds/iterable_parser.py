@@ -0,0 +1,28 @@
+from application.seeds.seed_parser import BaseSeedParser
+from application.dbutils import DbUtils
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+
+class IterableParser(BaseSeedParser):
+    """
+    Seeds records from any iterable through the same pipeline as the files, e.g. the pages of a rest connector.
+    source names the stream for checkpoints. With id_field, dict records keep their own id instead of
+    their position, so re-ingesting a shifted api only re-embeds what changed.
+    """
+
+    def __init__(self, records:Iterable[Any], source:str, index_name:str, namespace:str, dbutils:DbUtils,
+                 id_field:Optional[str]=None, **kwargs):
+        super().__init__(source, index_name, namespace, dbutils, **kwargs)
+        self.records = records
+        self.id_field = id_field
+
+    def load_data(self) -> Iterator[Any]:
+        return iter(self.records)
+
+    def parse_data(self, rows:Iterator[Any]) -> Iterator[Dict]:
+        for key, item in enumerate(rows):
+            has_id = self.id_field is not None and isinstance(item, dict) and item.get(self.id_field) is not None
+            yield {
+                'id': str(item[self.id_field]) if has_id else str(key),
+                'text': self.row_text(item)
+            }
@@ -0,0 +1,80 @@
+from application.seeds.seed_parser import BaseSeedParser
+from typing import Any, Iterator, TextIO
+import json
+
+JSON_WHITESPACE = " \t\r\n"
+# what can follow a top level value, and what a number cut short by the chunk could still go on with
+VALUE_END = JSON_WHITESPACE + ",]"
+NUMBER_PARTS = "0123456789+-.eE"
+
+def read_json_values(file:TextIO, chunk_size:int=65536) -> Iterator[Any]:
+    """
+    Yields the records of a json file without loading all of it.
+    Handles a top level array ([{...}, {...}]) as well as ndjson / concatenated values ({...}\\n{...}).
+    Only one record and one chunk of the file are held at a time.
+    """
+    decoder = json.JSONDecoder()
+    buffer = file.read(chunk_size)
+    eof = buffer == ""
+    position = 0
+    started = False
+    in_array = False
+
+    while True:
+        skip = JSON_WHITESPACE + ("," if in_array else "")
+        while position < len(buffer) and buffer[position] in skip:
+            position += 1
+
+        if position == len(buffer):
+            if eof:
+                return
+            buffer = file.read(chunk_size)
+            eof = buffer == ""
+            position = 0
+            continue
+
+        if not started:
+            started = True
+            if buffer[position] == "[":
+                in_array = True
+                position += 1
+                continue
+        if in_array and buffer[position] == "]":
+            return
+
+        try:
+            value, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            # the record runs past the end of this chunk, read more and try again
+            more = file.read(chunk_size)
+            eof = more == ""
+            buffer = buffer[position:] + more
+            position = 0
+            continue
+
+        # a number cut by the chunk decodes short ([-2. gives -2), only trust a scalar once a delimiter or the end of the file follows
+        if not isinstance(value, (dict, list, str)):
+            following = end
+            while following < len(buffer) and buffer[following] in NUMBER_PARTS:
+                following += 1
+            if following == len(buffer) and not eof:
+                more = file.read(chunk_size)
+                eof = more == ""
+                if more:
+                    buffer = buffer[position:] + more
+                    position = 0
+                    continue
+            if end < len(buffer) and buffer[end] not in VALUE_END:
+                raise json.JSONDecodeError("Expecting ',' delimiter", buffer, end)
+
+        yield value
+        position = end
+
+
+class JSONParser(BaseSeedParser):
+
+    def load_data(self) -> Iterator[Any]:
+        with open(self.file_path, encoding='utf-8') as jsonfile:
+            yield from read_json_values(jsonfile)
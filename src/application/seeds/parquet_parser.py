@@ -0,0 +1,80 @@
+from application.dbutils import DbUtils
+from application.seeds.seed_parser import BaseSeedParser
+from typing import Any, Dict, Iterator, Optional
+import base64
+import json
+import os
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+ARROW_FORMATS = {"arrow", "feather", "ipc"}
+
+class ParquetParser(BaseSeedParser):
+    """
+    Seeds Parquet and Arrow (ipc / feather) files one record batch at a time.
+    The text of a whole batch is built with arrow's vectorized string kernels instead of a join per row,
+    and record batches are read at generator_batch_size so each one lines up with an embedding call.
+    file_format picks the reader (parquet, arrow, feather or ipc), by default it comes from the file extension.
+    """
+
+    def __init__(self, file_path:str, index_name:str, namespace:str, dbutils:DbUtils,
+                 file_format:Optional[str]=None, **kwargs):
+        super().__init__(file_path, index_name, namespace, dbutils, **kwargs)
+        self.file_format = (file_format or os.path.splitext(file_path)[1].lstrip(".")).lower()
+
+    def load_data(self) -> Iterator[pa.RecordBatch]:
+        batch_size = self.dbutils.generator_batch_size
+        if self.file_format in ARROW_FORMATS:
+            with pa.memory_map(self.file_path, "r") as source:
+                try:
+                    reader = ipc.open_file(source)
+                    batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+                except pa.ArrowInvalid:
+                    # not the file format, so an arrow stream
+                    source.seek(0)
+                    batches = ipc.open_stream(source)
+                for batch in batches:
+                    # arrow files keep whatever batch size they were written with
+                    for offset in range(0, batch.num_rows, batch_size):
+                        yield batch.slice(offset, batch_size)
+            return
+
+        yield from pq.ParquetFile(self.file_path).iter_batches(batch_size=batch_size)
+
+    def value_text(self, value:Any) -> str:
+        if isinstance(value, bytes):
+            # bytes that are not utf-8 go in as base64 rather than failing the seed
+            try:
+                return value.decode("utf-8")
+            except UnicodeDecodeError:
+                return base64.b64encode(value).decode("ascii")
+        return json.dumps(value, default=str)
+
+    def column_text(self, column:pa.Array) -> pa.Array:
+        try:
+            text = pc.cast(column, pa.string())
+        except (pa.ArrowNotImplementedError, pa.ArrowInvalid):
+            # lists and structs have no string cast, keep them as json like the other parsers do,
+            # binary columns that are not all utf-8 end up here too
+            text = pa.array([None if value is None else self.value_text(value) for value in column.to_pylist()], pa.string())
+        return pc.fill_null(text, "")
+
+    # a concat of all the column values, the whole batch in one kernel call
+    def batch_text(self, batch:pa.RecordBatch) -> pa.Array:
+        columns = [self.column_text(column) for column in batch.columns]
+        if not columns:
+            return pa.array([""] * batch.num_rows, pa.string())
+        # same kernel as pc.binary_join_element_wise, which the pyarrow stubs do not list
+        return pc.call_function("binary_join_element_wise", [*columns, ", "])
+
+    def parse_data(self, rows:Iterator[pa.RecordBatch]) -> Iterator[Dict]:
+        offset = 0
+        for batch in rows:
+            for key, text in enumerate(self.batch_text(batch).to_pylist(), start=offset):
+                yield {
+                    'id': str(key),
+                    'text': text
+                }
+            offset += batch.num_rows
@@ -1,21 +1,134 @@
 from application.dbutils import DbUtils
+from application.seeds.checkpoint import SeedCheckpoint
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from itertools import islice
+import threading
+from typing import Any, Dict, Iterable, Iterator, Optional
+import json
 
 # ABSTRACT
+# Seeding is a generator pipeline: load_data -> parse_data -> to_vector -> save_vectors.
+# Subclasses only need load_data, yielding one record at a time, so a file never has to fit in memory.
+# run() batches the parsed rows and embeds + upserts every batch on a worker pool.
+# concurrency is how many batches are embedded at once, max_pending caps how many batches can be
+# read ahead of the workers (2 x concurrency by default).
+# With a checkpoint_dir, progress is saved as batches land, and resume=True skips what a failed run already upserted.
 class BaseSeedParser(object):
-    def __init__(self, file_path:str, index_name:str, namespace:str, dbutils:DbUtils):
+    def __init__(self, file_path:str, index_name:str, namespace:str, dbutils:DbUtils,
+                 concurrency:int=4, max_pending:Optional[int]=None, checkpoint_dir:Optional[str]=None,
+                 resume:bool=False):
         self.file_path = file_path
         self.index_name = index_name
         self.dbutils = dbutils
         self.namespace = namespace
+        self.concurrency = concurrency
+        self.max_pending = max_pending or 2 * concurrency
+        self.checkpoint_dir = checkpoint_dir
+        self.resume = resume
+        self.dimensions = 0
+        # throughput counters, the embed and upsert ones are bumped from the worker threads
+        self.rows_read = 0
+        self.rows_embedded = 0
+        self.vectors_upserted = 0
+        self.stats_lock = threading.Lock()
 
-    def load_data(self):
-        return
+    # if the index we are pushing to exists, use its dimensionality
+    def prepare_index(self):
+        if self.dbutils.index_exists(self.index_name):
+            self.dimensions = self.dbutils.describe_index(self.index_name).dimension
+        else:
+            self.dimensions = 1024
+            self.dbutils.create_index(self.index_name, self.dimensions)
 
-    def parse_data(self):
-        return
+    def load_data(self) -> Iterator[Any]:
+        return iter(())
 
-    def to_vector(self):
-        return
+    def row_text(self, item:Any) -> str:
+        # a concat of all the fields values, nested values are kept as json
+        if not isinstance(item, dict):
+            return item if isinstance(item, str) else json.dumps(item)
+        return ', '.join(
+            json.dumps(value) if isinstance(value, (dict, list)) else str(value)
+            for value in item.values()
+        )
 
-    def save_vectors(self):
-        return
+    def parse_data(self, rows:Iterator[Any]) -> Iterator[Dict]:
+        for key, item in enumerate(rows):
+            yield {
+                'id': str(key),
+                'text': self.row_text(item)
+            }
+
+    def rows(self) -> Iterator[Dict]:
+        return self.parse_data(self.load_data())
+
+    def batches(self, rows:Iterable[Dict]) -> Iterator[list[Dict]]:
+        rows = iter(rows)
+        batch = list(islice(rows, self.dbutils.generator_batch_size))
+        while batch:
+            self.rows_read += len(batch)
+            yield batch
+            batch = list(islice(rows, self.dbutils.generator_batch_size))
+
+    def to_vector(self, batch:list[Dict]) -> list[Dict]:
+        # rows that are already stored with the same text keep their vectors
+        batch = self.dbutils.changed_rows(self.index_name, self.namespace, batch)
+        if not batch:
+            return []
+
+        embeddings = self.dbutils.create_embedding(batch)
+        with self.stats_lock:
+            self.rows_embedded += len(batch)
+        return [{
+            "id": d['id'],
+            "values": e['values'],
+            "metadata": {'text': d['text']}
+        } for d, e in zip(batch, embeddings)]
+
+    def save_vectors(self, vectors:list[Dict]) -> int:
+        if not vectors:
+            return 0
+        upserted = self.dbutils.upsert_embeddings(self.index_name, self.namespace, vectors)
+        with self.stats_lock:
+            self.vectors_upserted += upserted
+        return upserted
+
+    def process_batch(self, batch:list[Dict]) -> int:
+        return self.save_vectors(self.to_vector(batch))
+
+    def collect(self, done:Iterable[Future], pending:Dict[Future, int], checkpoint:SeedCheckpoint) -> int:
+        upserted = 0
+        for future in done:
+            sequence = pending.pop(future)
+            upserted += future.result()
+            checkpoint.finish(sequence)
+        return upserted
+
+    def run(self) -> int:
+        """Seed the whole file, returns how many vectors were upserted."""
+        self.prepare_index()
+        checkpoint = SeedCheckpoint(self.checkpoint_dir, self.index_name, self.namespace, self.file_path)
+        rows = checkpoint.resume(self.rows) if self.resume else self.rows()
+        total_upserted = 0
+        # future -> which batch it is, the checkpoint needs them back in file order
+        pending: Dict[Future, int] = {}
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            try:
+                for sequence, batch in enumerate(self.batches(rows)):
+                    # backpressure, stop reading until a batch is done
+                    while len(pending) >= self.max_pending:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        total_upserted += self.collect(done, pending, checkpoint)
+                    checkpoint.add(sequence, batch)
+                    pending[executor.submit(self.process_batch, batch)] = sequence
+
+                done, _ = wait(pending)
+                total_upserted += self.collect(done, pending, checkpoint)
+            except BaseException:
+                # a failed batch stops the seed, batches not started yet are dropped
+                for future in pending:
+                    future.cancel()
+                raise
+
+        return total_upserted
@@ -0,0 +1,121 @@
+import os
+import numpy as np
+from typing import Optional
+
+class IVFSettings(object):
+    """
+    Knobs for the inverted file (IVF) index used by the local vector store.
+
+    nlist: how many k-means clusters the vectors are split into, None picks about sqrt(n).
+    nprobe: how many of the closest clusters a query scans. Higher means better recall and slower queries.
+    min_vectors: below this many vectors a namespace is scanned exactly, the index is not worth it.
+    iterations: k-means iterations when training.
+    sample_size: how many vectors k-means trains on.
+    """
+
+    def __init__(self, nlist:Optional[int]=None, nprobe:int=8, min_vectors:int=10000, iterations:int=10,
+                 sample_size:int=50000, seed:int=0):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_vectors = min_vectors
+        self.iterations = iterations
+        self.sample_size = sample_size
+        self.seed = seed
+
+
+def normalize(vectors:np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+class IVFIndex(object):
+    """
+    Spherical k-means centroids over the vectors of one namespace.
+    The namespace keeps which cluster (list) every row belongs to, a query only scores the rows in the
+    nprobe clusters closest to it instead of every row.
+    """
+
+    def __init__(self, settings:IVFSettings):
+        self.settings = settings
+        self.centroids: Optional[np.ndarray] = None
+        self.trained_count = 0
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    def active(self, count:int) -> bool:
+        return self.trained and count >= self.settings.min_vectors
+
+    def needs_training(self, count:int) -> bool:
+        # retrained once the namespace doubles, so clusters keep up with the data
+        if count < self.settings.min_vectors:
+            return False
+        return not self.trained or count > 2 * self.trained_count
+
+    def train(self, sample:np.ndarray, count:int) -> None:
+        """Run k-means on a sample of the namespace. count is the size of the whole namespace."""
+        rng = np.random.default_rng(self.settings.seed)
+        data = normalize(np.asarray(sample, dtype=np.float32))
+        nlist = self.settings.nlist or max(1, int(np.sqrt(count)))
+        nlist = min(nlist, len(data))
+
+        centroids = data[rng.choice(len(data), nlist, replace=False)].copy()
+        for _ in range(self.settings.iterations):
+            labels = self.nearest(data, centroids)
+            sizes = np.bincount(labels, minlength=nlist)
+            empty = sizes == 0
+            # sum every cluster in one pass over the rows sorted by cluster
+            order = np.argsort(labels, kind="stable")
+            starts = np.searchsorted(labels[order], np.arange(nlist))
+            sums = np.zeros_like(centroids)
+            sums[~empty] = np.add.reduceat(data[order], starts[~empty], axis=0)
+            # empty clusters get restarted on random points instead of being lost
+            if empty.any():
+                sums[empty] = data[rng.choice(len(data), int(empty.sum()), replace=False)]
+            centroids = normalize(sums)
+
+        self.centroids = centroids
+        self.trained_count = count
+
+    def nearest(self, vectors:np.ndarray, centroids:np.ndarray, block_rows:int=16384) -> np.ndarray:
+        labels = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), block_rows):
+            block = np.asarray(vectors[start:start + block_rows], dtype=np.float32)
+            labels[start:start + block_rows] = np.argmax(block @ centroids.T, axis=1)
+        return labels
+
+    def trained_centroids(self) -> np.ndarray:
+        if self.centroids is None:
+            raise Exception("The IVF index is not trained yet.")
+        return self.centroids
+
+    def assign(self, vectors:np.ndarray) -> np.ndarray:
+        """The list every vector belongs to. Cosine, so the vectors do not need to be normalised first."""
+        return self.nearest(vectors, self.trained_centroids())
+
+    def probe(self, query:np.ndarray, nprobe:Optional[int]=None) -> np.ndarray:
+        centroids = self.trained_centroids()
+        nprobe = min(nprobe or self.settings.nprobe, len(centroids))
+        scores = centroids @ np.asarray(query, dtype=np.float32)
+        if nprobe >= len(scores):
+            return np.arange(len(scores), dtype=np.int32)
+        return np.argpartition(-scores, nprobe - 1)[:nprobe].astype(np.int32)
+
+    def probe_mask(self, query:np.ndarray, nprobe:Optional[int]=None) -> np.ndarray:
+        """
+        True for every probed list, indexed by list number: mask[row_lists] picks the candidate rows.
+        One extra False slot on the end so unassigned rows (list -1) never match.
+        """
+        mask = np.zeros(len(self.trained_centroids()) + 1, dtype=bool)
+        mask[self.probe(query, nprobe)] = True
+        return mask
+
+    def save(self, path:str) -> None:
+        temp_path = path + ".tmp.npy"
+        np.save(temp_path, self.trained_centroids())
+        os.replace(temp_path, path)
+
+    def load(self, path:str, trained_count:int) -> None:
+        self.centroids = np.load(path)
+        self.trained_count = trained_count
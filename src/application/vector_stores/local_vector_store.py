@@ -0,0 +1,366 @@
+import os
+import json
+import threading
+import numpy as np
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from application.environment import Environment
+from application.vector_stores.vector_store_base import (
+    VectorStoreBase, ScoredVector, Vector, QueryResponse, FetchResponse, IndexDescription
+)
+from application.vector_stores.segment_namespace import SegmentNamespace
+from application.vector_stores.ivf_index import IVFIndex, IVFSettings
+
+Record = Tuple[str, List[float], Optional[Dict]]
+
+def to_records(vectors:Any) -> List[Record]:
+    """Accepts the same shapes pinecone does: dicts, (id, values) / (id, values, metadata) tuples or Vector objects."""
+    records = []
+    for vector in vectors:
+        if isinstance(vector, (tuple, list)):
+            vector_id, values, *metadata = vector
+            records.append((str(vector_id), values, metadata[0] if metadata else None))
+        else:
+            records.append((str(vector["id"]), vector["values"], vector.get("metadata")))
+    return records
+
+
+class LocalNamespace(object):
+    """
+    Every vector of one namespace, held as a dense float32 matrix.
+    Rows stay packed, deletes move the last row into the hole.
+    With ann settings, big namespaces are searched through an IVF index instead of scoring every row.
+    """
+
+    def __init__(self, dimension:int, initial_capacity:int=1024, ann:Optional[IVFSettings]=None):
+        self.dimension = dimension
+        self.vectors = np.zeros((initial_capacity, dimension), dtype=np.float32)
+        self.norms = np.zeros(initial_capacity, dtype=np.float32)
+        # the IVF list every row belongs to, -1 until the index is trained
+        self.row_lists = np.full(initial_capacity, -1, dtype=np.int32)
+        self.ivf = IVFIndex(ann) if ann is not None else None
+        self.ids: List[str] = []
+        self.metadata: List[Optional[Dict]] = []
+        self.rows: Dict[str, int] = {}
+        # one lock per namespace, so queries against different namespaces run side by side
+        self.lock = threading.RLock()
+
+    @property
+    def count(self) -> int:
+        return len(self.ids)
+
+    def grow(self, needed:int) -> None:
+        capacity = self.vectors.shape[0]
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        vectors = np.zeros((capacity, self.dimension), dtype=np.float32)
+        norms = np.zeros(capacity, dtype=np.float32)
+        row_lists = np.full(capacity, -1, dtype=np.int32)
+        vectors[:self.count] = self.vectors[:self.count]
+        norms[:self.count] = self.norms[:self.count]
+        row_lists[:self.count] = self.row_lists[:self.count]
+        self.vectors = vectors
+        self.norms = norms
+        self.row_lists = row_lists
+
+    def upsert(self, records:List[Record]) -> int:
+        if not records:
+            return 0
+
+        matrix = np.asarray([values for _, values, _ in records], dtype=np.float32)
+        if matrix.ndim != 2 or matrix.shape[1] != self.dimension:
+            raise ValueError(f"Vector dimension {matrix.shape[-1]} does not match index dimension {self.dimension}")
+        norms = np.linalg.norm(matrix, axis=1)
+
+        self.grow(self.count + len(records))
+        written = []
+        for position, (vector_id, _, metadata) in enumerate(records):
+            row = self.rows.get(vector_id)
+            if row is None:
+                row = self.count
+                self.rows[vector_id] = row
+                self.ids.append(vector_id)
+                self.metadata.append(metadata)
+            else:
+                self.metadata[row] = metadata
+            self.vectors[row] = matrix[position]
+            self.norms[row] = norms[position]
+            written.append(row)
+
+        if self.ivf is not None and self.ivf.trained:
+            # new rows join their closest cluster straight away, retraining waits for the next query
+            self.row_lists[written] = self.ivf.assign(matrix)
+
+        return len(records)
+
+    def delete(self, ids:List[str]) -> None:
+        for vector_id in ids:
+            row = self.rows.pop(vector_id, None)
+            if row is None:
+                continue
+
+            last = self.count - 1
+            if row != last:
+                # move the last row into the gap to keep the matrix dense
+                moved_id = self.ids[last]
+                self.vectors[row] = self.vectors[last]
+                self.norms[row] = self.norms[last]
+                self.row_lists[row] = self.row_lists[last]
+                self.ids[row] = moved_id
+                self.metadata[row] = self.metadata[last]
+                self.rows[moved_id] = row
+
+            self.ids.pop()
+            self.metadata.pop()
+
+    def scores(self, vector:List[float], rows:Optional[np.ndarray]=None) -> np.ndarray:
+        query = np.asarray(vector, dtype=np.float32)
+        query_norm = np.linalg.norm(query)
+        if rows is None:
+            vectors, norms = self.vectors[:self.count], self.norms[:self.count]
+        else:
+            vectors, norms = self.vectors[rows], self.norms[rows]
+        norms = norms * query_norm
+        dots = vectors @ query
+        # zero vectors score zero instead of dividing by zero
+        return np.divide(dots, norms, out=np.zeros_like(dots), where=norms > 0)
+
+    def train_ann(self, ivf:IVFIndex) -> None:
+        settings = ivf.settings
+        rng = np.random.default_rng(settings.seed)
+        sample_rows = rng.choice(self.count, min(settings.sample_size, self.count), replace=False)
+        ivf.train(self.vectors[np.sort(sample_rows)], self.count)
+        self.row_lists[:self.count] = ivf.assign(self.vectors[:self.count])
+
+    def ann_rows(self, vector:List[float], top_k:int, nprobe:Optional[int]) -> Optional[np.ndarray]:
+        """Rows in the clusters closest to the query, None when the namespace should be scanned exactly."""
+        if self.ivf is None:
+            return None
+        if self.ivf.needs_training(self.count):
+            self.train_ann(self.ivf)
+        if not self.ivf.active(self.count):
+            return None
+
+        probed = self.ivf.probe_mask(np.asarray(vector, dtype=np.float32), nprobe)
+        rows = np.nonzero(probed[self.row_lists[:self.count]])[0]
+        # too few rows in the probed clusters to fill top k, fall back to the exact scan
+        return rows if len(rows) >= top_k else None
+
+    def query(self, vector:List[float], top_k:int, include_values:bool, include_metadata:bool,
+              nprobe:Optional[int]=None, exact:bool=False) -> List[ScoredVector]:
+        k = min(top_k, self.count)
+        if k <= 0:
+            return []
+
+        rows = None if exact else self.ann_rows(vector, k, nprobe)
+        scores = self.scores(vector, rows)
+        if k < len(scores):
+            # only the top k get sorted, argpartition finds them in linear time
+            candidates = np.argpartition(-scores, k - 1)[:k]
+        else:
+            candidates = np.arange(len(scores))
+        ordered = candidates[np.argsort(-scores[candidates], kind="stable")]
+        if rows is not None:
+            return [self.scored(int(rows[position]), float(scores[position]), include_values, include_metadata) for position in ordered]
+        return [self.scored(int(row), float(scores[row]), include_values, include_metadata) for row in ordered]
+
+    def scored(self, row:int, score:float, include_values:bool, include_metadata:bool) -> ScoredVector:
+        return ScoredVector(
+            id=self.ids[row],
+            score=score,
+            values=self.vectors[row].tolist() if include_values else None,
+            metadata=self.metadata[row] if include_metadata else None
+        )
+
+    def fetch(self, ids:List[str]) -> Dict[str, Vector]:
+        vectors = {}
+        for vector_id in ids:
+            row = self.rows.get(vector_id)
+            if row is not None:
+                vectors[vector_id] = Vector(vector_id, self.vectors[row].tolist(), self.metadata[row])
+        return vectors
+
+    def list_ids(self, prefix:Optional[str]) -> List[str]:
+        return sorted(vector_id for vector_id in self.ids if not prefix or vector_id.startswith(prefix))
+
+    def drop(self) -> None:
+        return
+
+
+class LocalIndex(object):
+    """
+    An in process stand in for a pinecone Index, with the same method names and return shapes.
+    With a directory, namespaces are kept on disk as memory mapped segments, otherwise in memory.
+    ann turns on the IVF index for namespaces with at least ann.min_vectors vectors.
+    """
+
+    def __init__(self, name:str, dimension:int, metric:str="cosine", directory:Optional[str]=None,
+                 dtype:str="float32", max_segments:int=8, ann:Optional[IVFSettings]=None):
+        if metric != "cosine":
+            raise ValueError(f"Unsupported metric for the local vector store: {metric}")
+        self.name = name
+        self.dimension = dimension
+        self.metric = metric
+        self.directory = directory
+        self.dtype = dtype
+        self.max_segments = max_segments
+        self.ann = ann
+        self.namespaces: Dict[str, Any] = {}
+        self.lock = threading.RLock()
+
+        if directory is not None:
+            self.open_directory(directory)
+
+    def open_directory(self, directory:str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, "index.json"), "w") as file:
+            json.dump({"dimension": self.dimension, "metric": self.metric, "dtype": self.dtype}, file)
+
+        for entry in os.listdir(directory):
+            if entry.startswith("ns_"):
+                namespace = bytes.fromhex(entry[3:]).decode("utf-8")
+                self.namespaces[namespace] = self.create_namespace(namespace)
+
+    def namespace_directory(self, directory:str, namespace:str) -> str:
+        # hex keeps any namespace name safe to use as a folder name
+        return os.path.join(directory, "ns_" + namespace.encode("utf-8").hex())
+
+    def create_namespace(self, namespace:str) -> Any:
+        if self.directory is None:
+            return LocalNamespace(self.dimension, ann=self.ann)
+        return SegmentNamespace(self.namespace_directory(self.directory, namespace), self.dimension, self.dtype,
+                                self.max_segments, ann=self.ann)
+
+    def get_namespace(self, namespace:str, create:bool=False) -> Any:
+        store = self.namespaces.get(namespace)
+        if store is None and create:
+            with self.lock:
+                store = self.namespaces.get(namespace)
+                if store is None:
+                    store = self.create_namespace(namespace)
+                    self.namespaces[namespace] = store
+        return store
+
+    def upsert(self, vectors:Any, namespace:str="", **kwargs) -> Dict[str, int]:
+        records = to_records(vectors)
+        store = self.get_namespace(namespace, create=True)
+        with store.lock:
+            upserted = store.upsert(records)
+        return {"upserted_count": upserted}
+
+    def query(self, vector:List[float], top_k:int, namespace:str="", include_values:bool=False,
+              include_metadata:bool=False, nprobe:Optional[int]=None, exact:bool=False, **kwargs) -> QueryResponse:
+        # nprobe overrides the ann setting for this query, exact skips the ann index altogether
+        store = self.get_namespace(namespace)
+        if store is None:
+            return QueryResponse([], namespace)
+        with store.lock:
+            matches = store.query(vector, top_k, include_values, include_metadata, nprobe=nprobe, exact=exact)
+        return QueryResponse(matches, namespace)
+
+    def fetch(self, ids:List[str], namespace:str="", **kwargs) -> FetchResponse:
+        store = self.get_namespace(namespace)
+        if store is None:
+            return FetchResponse({}, namespace)
+        with store.lock:
+            vectors = store.fetch(ids)
+        return FetchResponse(vectors, namespace)
+
+    def delete(self, ids:Optional[List[str]]=None, namespace:str="", delete_all:bool=False, **kwargs) -> Dict:
+        if delete_all:
+            with self.lock:
+                store = self.namespaces.pop(namespace, None)
+            if store is not None:
+                with store.lock:
+                    store.drop()
+            return {}
+
+        store = self.get_namespace(namespace)
+        if store is not None:
+            with store.lock:
+                store.delete(ids or [])
+        return {}
+
+    def list(self, prefix:Optional[str]=None, limit:int=100, namespace:str="", **kwargs) -> Iterator[List[str]]:
+        # pages of ids, like the pinecone list generator
+        store = self.get_namespace(namespace)
+        ids = []
+        if store is not None:
+            with store.lock:
+                ids = store.list_ids(prefix)
+        for start in range(0, len(ids), limit):
+            yield ids[start:start + limit]
+
+    def describe_index_stats(self, **kwargs) -> Dict[str, Any]:
+        with self.lock:
+            stores = list(self.namespaces.items())
+        namespaces = {
+            name: {"vector_count": store.count}
+            for name, store in stores if store.count > 0
+        }
+        return {
+            "dimension": self.dimension,
+            "namespaces": namespaces,
+            "total_vector_count": sum(namespace["vector_count"] for namespace in namespaces.values())
+        }
+
+
+class LocalVectorStore(VectorStoreBase):
+    """
+    Keeps every index in this process. Good for tests, benchmarks and small deployments.
+    Give it a path and the indexes are persisted there and opened again on the next start.
+    """
+
+    def __init__(self, path:Optional[str]=None, dtype:str="float32", max_segments:int=8, ann:Optional[IVFSettings]=None):
+        self.path = path
+        self.dtype = dtype
+        self.max_segments = max_segments
+        self.ann = ann
+        self.indexes: Dict[str, LocalIndex] = {}
+        self.lock = threading.Lock()
+
+        if path is not None:
+            self.load_indexes(path)
+
+    def load_indexes(self, path:str) -> None:
+        os.makedirs(path, exist_ok=True)
+        for index_name in os.listdir(path):
+            settings_path = os.path.join(path, index_name, "index.json")
+            if not os.path.exists(settings_path):
+                continue
+            with open(settings_path, "r") as file:
+                settings = json.load(file)
+            self.indexes[index_name] = self.new_index(index_name, settings["dimension"], settings["metric"], settings["dtype"])
+
+    def new_index(self, index_name:str, dimension:int, metric:str="cosine", dtype:Optional[str]=None) -> LocalIndex:
+        directory = os.path.join(self.path, index_name) if self.path is not None else None
+        return LocalIndex(index_name, dimension, metric, directory, dtype or self.dtype, self.max_segments, self.ann)
+
+    def get_index(self, index_name:str) -> LocalIndex:
+        index = self.indexes.get(index_name)
+        if index is None:
+            raise Exception(f"Index not found: {index_name}")
+        return index
+
+    def create_index(self, index_name:str, dimension:int) -> None:
+        with self.lock:
+            if index_name in self.indexes:
+                raise Exception(f"Index already exists: {index_name}")
+            self.indexes[index_name] = self.new_index(index_name, dimension)
+
+    def index_exists(self, index_name:str) -> bool:
+        return index_name in self.indexes
+
+    def describe_index(self, index_name:str) -> IndexDescription:
+        index = self.get_index(index_name)
+        return IndexDescription(index.name, index.dimension, index.metric)
+
+
+def vector_store_from_env(env:Environment) -> Optional[LocalVectorStore]:
+    """The local store VECTOR_STORE=local asks for, None for pinecone (DbUtils builds that one from its client)."""
+    if env.VECTOR_STORE != "local":
+        return None
+    ann = IVFSettings(nprobe=env.VECTOR_STORE_NPROBE) if env.VECTOR_STORE_ANN else None
+    return LocalVectorStore(env.VECTOR_STORE_PATH or None, ann=ann)
@@ -0,0 +1,31 @@
+from pinecone import Pinecone, ServerlessSpec, Index, IndexModel, NotFoundException
+from application.vector_stores.vector_store_base import VectorStoreBase
+
+class PineconeVectorStore(VectorStoreBase):
+    def __init__(self, client:Pinecone):
+        self.client = client
+
+    def get_index(self, index_name:str) -> Index:
+        return self.client.Index(index_name)
+
+    def create_index(self, index_name:str, dimension:int) -> None:
+        # hardcoded value are to stay within the free tier
+        self.client.create_index(
+            name=index_name,
+            dimension=dimension,
+            metric="cosine",
+            spec=ServerlessSpec(
+            cloud="aws",
+            region="us-east-1"
+            )
+        )
+
+    def index_exists(self, index_name:str) -> bool:
+        try:
+            self.client.describe_index(index_name)
+            return True
+        except NotFoundException:
+            return False
+
+    def describe_index(self, index_name:str) -> IndexModel:
+        return self.client.describe_index(index_name)
@@ -0,0 +1,406 @@
+import os
+import json
+import shutil
+import sqlite3
+import threading
+import numpy as np
+from typing import Dict, List, Optional, Tuple, cast
+
+from application.vector_stores.vector_store_base import ScoredVector, Vector
+from application.vector_stores.ivf_index import IVFIndex, IVFSettings
+
+class SegmentNamespace(object):
+    """
+    One namespace of the local vector store, kept on disk.
+
+    Vectors are written in append only segments, one raw float32 (or float16) file per upsert,
+    and opened with np.memmap so only the pages a query touches come into memory.
+    Each segment has a norms file and a live file (one byte per row, 0 once the row is replaced or deleted).
+    Ids and metadata sit in a sqlite side table that maps every live id to its (segment, row).
+    The sqlite table is the source of truth, the live files only let queries skip dead rows cheaply.
+    Small segments get merged and dead rows dropped by compact().
+    With ann settings every segment also gets a lists file, the IVF list of each row,
+    and the trained centroids are kept next to the manifest.
+    """
+
+    def __init__(self, directory:str, dimension:int, dtype:str="float32", max_segments:int=8, max_dead_ratio:float=0.3,
+                 ann:Optional[IVFSettings]=None):
+        if dtype not in ("float32", "float16"):
+            raise ValueError(f"Unsupported vector dtype: {dtype}")
+        self.directory = directory
+        self.dimension = dimension
+        self.dtype = dtype
+        self.max_segments = max_segments
+        self.max_dead_ratio = max_dead_ratio
+        self.lock = threading.RLock()
+
+        os.makedirs(directory, exist_ok=True)
+        self.manifest_path = os.path.join(directory, "manifest.json")
+        self.manifest = self.load_manifest()
+        self.centroids_path = os.path.join(directory, "centroids.npy")
+        self.ivf = IVFIndex(ann) if ann is not None else None
+        # the manifest only names the centroids once every lists file was written against them
+        if self.ivf is not None and "ann" in self.manifest and os.path.exists(self.centroids_path):
+            self.ivf.load(self.centroids_path, self.manifest["ann"]["trained_count"])
+
+        self.db = sqlite3.connect(os.path.join(directory, "meta.sqlite"), check_same_thread=False)
+        self.db.execute("CREATE TABLE IF NOT EXISTS vectors (id TEXT PRIMARY KEY, segment INTEGER, row INTEGER, metadata TEXT)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS vectors_location ON vectors (segment, row)")
+        self.db.commit()
+
+        # segment id -> (vectors, norms, live, lists), all memory mapped
+        self.segments: Dict[int, Tuple[np.memmap, np.memmap, np.memmap, np.memmap]] = {}
+        for segment in self.manifest["segments"]:
+            self.segments[segment["id"]] = self.open_segment(segment["id"], segment["rows"])
+        self.live_count = self.db.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+
+    @property
+    def count(self) -> int:
+        return self.live_count
+
+    # -- files --
+
+    def load_manifest(self) -> Dict:
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, "r") as file:
+                manifest = json.load(file)
+            if manifest["dimension"] != self.dimension or manifest["dtype"] != self.dtype:
+                raise ValueError(f"Segments in {self.directory} were written as {manifest['dimension']} x {manifest['dtype']}")
+            return manifest
+        return {"dimension": self.dimension, "dtype": self.dtype, "segments": [], "next_segment": 1}
+
+    def save_manifest(self) -> None:
+        # written to a temp file then swapped in, so a crash never leaves half a manifest
+        temp_path = self.manifest_path + ".tmp"
+        with open(temp_path, "w") as file:
+            json.dump(self.manifest, file)
+        os.replace(temp_path, self.manifest_path)
+
+    def segment_path(self, segment_id:int, kind:str) -> str:
+        return os.path.join(self.directory, f"seg-{segment_id:06d}.{kind}")
+
+    def open_segment(self, segment_id:int, rows:int) -> Tuple[np.memmap, np.memmap, np.memmap, np.memmap]:
+        vectors = np.memmap(self.segment_path(segment_id, "vectors"), dtype=self.dtype, mode="r", shape=(rows, self.dimension))
+        norms = np.memmap(self.segment_path(segment_id, "norms"), dtype=np.float32, mode="r", shape=(rows,))
+        live = np.memmap(self.segment_path(segment_id, "live"), dtype=np.uint8, mode="r+", shape=(rows,))
+        lists_path = self.segment_path(segment_id, "lists")
+        if not os.path.exists(lists_path):
+            # segments written before the ann index existed, unassigned until the next training
+            np.full(rows, -1, dtype=np.int32).tofile(lists_path)
+        lists = np.memmap(lists_path, dtype=np.int32, mode="r+", shape=(rows,))
+        return vectors, norms, live, lists
+
+    def assign_lists(self, vectors:np.ndarray) -> np.ndarray:
+        if self.ivf is None or not self.ivf.trained:
+            return np.full(len(vectors), -1, dtype=np.int32)
+        return self.ivf.assign(vectors)
+
+    def write_segment(self, matrix:np.ndarray) -> int:
+        segment_id = self.manifest["next_segment"]
+        vectors = matrix.astype(self.dtype)
+        # norms of what was actually stored, float16 rounding included
+        norms = np.linalg.norm(vectors.astype(np.float32), axis=1).astype(np.float32)
+        vectors.tofile(self.segment_path(segment_id, "vectors"))
+        norms.tofile(self.segment_path(segment_id, "norms"))
+        np.ones(len(vectors), dtype=np.uint8).tofile(self.segment_path(segment_id, "live"))
+        self.assign_lists(vectors).tofile(self.segment_path(segment_id, "lists"))
+
+        self.manifest["next_segment"] = segment_id + 1
+        self.manifest["segments"].append({"id": segment_id, "rows": len(vectors)})
+        self.save_manifest()
+        self.segments[segment_id] = self.open_segment(segment_id, len(vectors))
+        return segment_id
+
+    def remove_segment(self, segment_id:int) -> None:
+        # the maps have to be let go of before the files can be removed on windows
+        self.segments.pop(segment_id, None)
+        for kind in ("vectors", "norms", "live", "lists"):
+            path = self.segment_path(segment_id, kind)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def mark_dead(self, locations:List[Tuple[int, int]]) -> None:
+        touched = set()
+        for segment_id, row in locations:
+            segment = self.segments.get(segment_id)
+            if segment is not None:
+                segment[2][row] = 0
+                touched.add(segment_id)
+        for segment_id in touched:
+            self.segments[segment_id][2].flush()
+
+    def locations(self, ids:List[str]) -> Dict[str, Tuple[int, int]]:
+        found = {}
+        # sqlite caps the number of bound parameters, so look them up in slices
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            for vector_id, segment_id, row in self.db.execute(
+                f"SELECT id, segment, row FROM vectors WHERE id IN ({placeholders})", chunk
+            ):
+                found[vector_id] = (segment_id, row)
+        return found
+
+    # -- namespace interface, same as LocalNamespace --
+
+    def upsert(self, records:List) -> int:
+        if not records:
+            return 0
+
+        # last write wins inside one batch too
+        latest = {}
+        for vector_id, values, metadata in records:
+            latest[vector_id] = (values, metadata)
+        ids = list(latest.keys())
+
+        matrix = np.asarray([latest[vector_id][0] for vector_id in ids], dtype=np.float32)
+        if matrix.ndim != 2 or matrix.shape[1] != self.dimension:
+            raise ValueError(f"Vector dimension {matrix.shape[-1]} does not match index dimension {self.dimension}")
+
+        replaced = self.locations(ids)
+        segment_id = self.write_segment(matrix)
+        self.db.executemany(
+            "INSERT OR REPLACE INTO vectors (id, segment, row, metadata) VALUES (?, ?, ?, ?)",
+            [(vector_id, segment_id, row, json.dumps(latest[vector_id][1])) for row, vector_id in enumerate(ids)]
+        )
+        self.db.commit()
+        # only after the commit, so a crash before it leaves the old rows readable
+        self.mark_dead(list(replaced.values()))
+        self.live_count += len(ids) - len(replaced)
+
+        self.maybe_compact()
+        return len(records)
+
+    def delete(self, ids:List[str]) -> None:
+        found = self.locations(ids)
+        if not found:
+            return
+        self.db.executemany("DELETE FROM vectors WHERE id = ?", [(vector_id,) for vector_id in found])
+        self.db.commit()
+        self.mark_dead(list(found.values()))
+        self.live_count -= len(found)
+        self.maybe_compact()
+
+    def row_values(self, segment_id:int, row:int) -> List[float]:
+        # float16 segments hand back float32 values, the same as the other stores
+        return cast(List[float], self.segments[segment_id][0][row].astype(np.float32).tolist())
+
+    def dot_products(self, vectors:np.ndarray, query:np.ndarray, block_rows:int=16384) -> np.ndarray:
+        if vectors.dtype == np.float32:
+            return vectors @ query
+        # numpy has no fast float16 matmul, so score in float32 blocks to keep memory bounded
+        dots = np.empty(len(vectors), dtype=np.float32)
+        for start in range(0, len(vectors), block_rows):
+            dots[start:start + block_rows] = vectors[start:start + block_rows].astype(np.float32) @ query
+        return dots
+
+    # -- ann --
+
+    def train_ann(self, ivf:IVFIndex) -> None:
+        """Train the IVF centroids on a sample of the live rows, then put every row of every segment in its list."""
+        settings = ivf.settings
+        rng = np.random.default_rng(settings.seed)
+        fraction = min(1.0, settings.sample_size / max(1, self.live_count))
+        sample = []
+        for vectors, _, live, _ in self.segments.values():
+            rows = np.nonzero(live)[0]
+            if len(rows) == 0:
+                continue
+            picked = np.sort(rng.choice(rows, max(1, int(len(rows) * fraction)), replace=False))
+            sample.append(np.asarray(vectors[picked], dtype=np.float32))
+        if not sample:
+            return
+
+        # old centroids stop counting before any lists file changes, a crash part way just means training again
+        self.manifest.pop("ann", None)
+        self.save_manifest()
+        ivf.train(np.concatenate(sample), self.live_count)
+        ivf.save(self.centroids_path)
+        for vectors, _, _, lists in self.segments.values():
+            if len(vectors):
+                lists[:] = ivf.assign(vectors)
+                lists.flush()
+        self.manifest["ann"] = {"trained_count": ivf.trained_count}
+        self.save_manifest()
+
+    def ann_rows(self, query:np.ndarray, top_k:int, nprobe:Optional[int]) -> Optional[Dict[int, np.ndarray]]:
+        """Live rows of each segment in the clusters closest to the query, None when every row should be scanned."""
+        if self.ivf is None:
+            return None
+        if self.ivf.needs_training(self.live_count):
+            self.train_ann(self.ivf)
+        if not self.ivf.active(self.live_count):
+            return None
+
+        probed = self.ivf.probe_mask(query, nprobe)
+        rows = {
+            segment_id: np.nonzero(probed[lists] & (live != 0))[0]
+            for segment_id, (_, _, live, lists) in self.segments.items()
+        }
+        # too few rows in the probed clusters to fill top k, fall back to the exact scan
+        if sum(len(segment_rows) for segment_rows in rows.values()) < top_k:
+            return None
+        return rows
+
+    def query(self, vector:List[float], top_k:int, include_values:bool, include_metadata:bool,
+              nprobe:Optional[int]=None, exact:bool=False) -> List[ScoredVector]:
+        if top_k <= 0 or self.live_count == 0:
+            return []
+
+        query = np.asarray(vector, dtype=np.float32)
+        query_norm = np.linalg.norm(query)
+        ann_rows = None if exact else self.ann_rows(query, top_k, nprobe)
+
+        candidates = []
+        for segment_id, (vectors, norms, live, _) in self.segments.items():
+            if len(vectors) == 0:
+                continue
+            if ann_rows is None:
+                rows = np.arange(len(vectors))
+                dots = self.dot_products(vectors, query)
+            else:
+                rows = ann_rows[segment_id]
+                if len(rows) == 0:
+                    continue
+                # fancy indexing only pages in the probed rows
+                dots = self.dot_products(vectors[rows], query)
+                norms = norms[rows]
+            scaled = norms * query_norm
+            scores = np.divide(dots, scaled, out=np.zeros_like(dots), where=scaled > 0)
+            if ann_rows is None:
+                scores[live == 0] = -np.inf
+
+            k = min(top_k, len(scores))
+            best = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+            for position in best:
+                if scores[position] != -np.inf:
+                    candidates.append((float(scores[position]), segment_id, int(rows[position])))
+
+        candidates.sort(key=lambda candidate: -candidate[0])
+        matches = []
+        for score, segment_id, row in candidates:
+            found = self.db.execute("SELECT id, metadata FROM vectors WHERE segment = ? AND row = ?", (segment_id, row)).fetchone()
+            # a row still marked live but not in sqlite was superseded right before a crash, skip it
+            if found is None:
+                continue
+            values = self.row_values(segment_id, row) if include_values else None
+            metadata = json.loads(found[1]) if include_metadata else None
+            matches.append(ScoredVector(id=found[0], score=score, values=values, metadata=metadata))
+            if len(matches) == top_k:
+                break
+        return matches
+
+    def fetch(self, ids:List[str]) -> Dict[str, Vector]:
+        vectors = {}
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            for vector_id, segment_id, row, metadata in self.db.execute(
+                f"SELECT id, segment, row, metadata FROM vectors WHERE id IN ({placeholders})", chunk
+            ):
+                vectors[vector_id] = Vector(vector_id, self.row_values(segment_id, row), json.loads(metadata))
+        return vectors
+
+    def list_ids(self, prefix:Optional[str]) -> List[str]:
+        if not prefix:
+            return [row[0] for row in self.db.execute("SELECT id FROM vectors ORDER BY id")]
+        return [row[0] for row in self.db.execute(
+            "SELECT id FROM vectors WHERE substr(id, 1, ?) = ? ORDER BY id", (len(prefix), prefix)
+        )]
+
+    # -- compaction --
+
+    def total_rows(self) -> int:
+        return sum(segment["rows"] for segment in self.manifest["segments"])
+
+    def maybe_compact(self) -> None:
+        total = self.total_rows()
+        if total and (total - self.live_count) / total > self.max_dead_ratio:
+            # lots of dead rows, rewrite everything
+            self.compact()
+        elif len(self.manifest["segments"]) > self.max_segments:
+            segment_ids = self.merge_candidates()
+            # nothing of a similar size means every segment is over 3x the ones below it, so there are only log n of them
+            if len(segment_ids) >= 2:
+                self.compact(segment_ids)
+
+    def merge_candidates(self) -> List[int]:
+        """
+        Size tiered: from the smallest segment up, takes the next one while it has at most twice the rows taken so far.
+        A merge then grows the segment every copied row lands in by at least half, so a row is copied O(log n) times
+        and big segments stay put until enough small ones add up to their size.
+        """
+        smallest = sorted(self.manifest["segments"], key=lambda segment: segment["rows"])
+        segment_ids = []
+        rows = 0
+        for segment in smallest:
+            if segment_ids and segment["rows"] > 2 * rows:
+                break
+            segment_ids.append(segment["id"])
+            rows += segment["rows"]
+        return segment_ids
+
+    def compact(self, segment_ids:Optional[List[int]]=None) -> None:
+        """Merge the given segments (all of them by default) into one, dropping dead rows."""
+        if segment_ids is None:
+            segment_ids = [segment["id"] for segment in self.manifest["segments"]]
+        if not segment_ids:
+            return
+        # copied in the same order as live_rows below, so each old row maps onto the row it was copied to
+        segment_ids = sorted(segment_ids)
+
+        # sqlite decides what is live, not the live files
+        placeholders = ",".join("?" * len(segment_ids))
+        live_rows = self.db.execute(
+            f"SELECT segment, row FROM vectors WHERE segment IN ({placeholders}) ORDER BY segment, row", segment_ids
+        ).fetchall()
+
+        by_segment: Dict[int, List[int]] = {}
+        for segment_id, row in live_rows:
+            by_segment.setdefault(segment_id, []).append(row)
+
+        merged_id = self.manifest["next_segment"]
+        self.manifest["next_segment"] = merged_id + 1
+        if live_rows:
+            output = np.memmap(self.segment_path(merged_id, "vectors"), dtype=self.dtype, mode="w+", shape=(len(live_rows), self.dimension))
+            norms = np.memmap(self.segment_path(merged_id, "norms"), dtype=np.float32, mode="w+", shape=(len(live_rows),))
+            lists = np.memmap(self.segment_path(merged_id, "lists"), dtype=np.int32, mode="w+", shape=(len(live_rows),))
+            position = 0
+            # copied one source segment at a time so memory stays at one segment
+            for segment_id in segment_ids:
+                rows = np.asarray(by_segment.get(segment_id, []), dtype=np.int64)
+                if len(rows) == 0:
+                    continue
+                source_vectors, source_norms, _, source_lists = self.segments[segment_id]
+                output[position:position + len(rows)] = source_vectors[rows]
+                norms[position:position + len(rows)] = source_norms[rows]
+                lists[position:position + len(rows)] = source_lists[rows]
+                position += len(rows)
+            output.flush()
+            norms.flush()
+            lists.flush()
+            del output, norms, lists
+            np.ones(len(live_rows), dtype=np.uint8).tofile(self.segment_path(merged_id, "live"))
+
+            # the merged segment is listed before sqlite points at it, and the old ones stay listed until after,
+            # so a crash in between only leaves unreferenced rows behind, which queries already skip
+            self.manifest["segments"].append({"id": merged_id, "rows": len(live_rows)})
+            self.save_manifest()
+            self.segments[merged_id] = self.open_segment(merged_id, len(live_rows))
+
+        self.db.executemany(
+            "UPDATE vectors SET segment = ?, row = ? WHERE segment = ? AND row = ?",
+            [(merged_id, new_row, segment_id, row) for new_row, (segment_id, row) in enumerate(live_rows)]
+        )
+        self.db.commit()
+
+        merged = set(segment_ids)
+        self.manifest["segments"] = [segment for segment in self.manifest["segments"] if segment["id"] not in merged]
+        self.save_manifest()
+        for segment_id in segment_ids:
+            self.remove_segment(segment_id)
+
+    def drop(self) -> None:
+        self.segments.clear()
+        self.db.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
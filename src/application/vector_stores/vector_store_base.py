@@ -0,0 +1,71 @@
+from typing import Any, Dict, List, Optional
+
+# ABSTRACT
+# DbUtils only talks to a vector store through these methods.
+# get_index should hand back something that behaves like a pinecone Index:
+# upsert, query, fetch, delete, list and describe_index_stats.
+# Stores replace every method below.
+class VectorStoreBase(object):
+
+    def get_index(self, index_name:str) -> Any:
+        return None
+
+    def create_index(self, index_name:str, dimension:int) -> None:
+        pass
+
+    def index_exists(self, index_name:str) -> bool:
+        return False
+
+    def describe_index(self, index_name:str) -> Any:
+        return None
+
+
+# Response types for stores that are not pinecone.
+# They allow both attribute and key access, the same as the pinecone models do.
+class VectorStoreResponse(object):
+    def __getitem__(self, key:str) -> Any:
+        return getattr(self, key)
+
+    def __contains__(self, key:str) -> bool:
+        return getattr(self, key, None) is not None
+
+    def get(self, key:str, default:Any=None) -> Any:
+        value = getattr(self, key, None)
+        return default if value is None else value
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.__dict__})"
+
+
+class ScoredVector(VectorStoreResponse):
+    def __init__(self, id:str, score:float, values:Optional[List[float]]=None, metadata:Optional[Dict]=None):
+        self.id = id
+        self.score = score
+        self.values = values
+        self.metadata = metadata
+
+
+class Vector(VectorStoreResponse):
+    def __init__(self, id:str, values:List[float], metadata:Optional[Dict]=None):
+        self.id = id
+        self.values = values
+        self.metadata = metadata
+
+
+class QueryResponse(VectorStoreResponse):
+    def __init__(self, matches:List[ScoredVector], namespace:str):
+        self.matches = matches
+        self.namespace = namespace
+
+
+class FetchResponse(VectorStoreResponse):
+    def __init__(self, vectors:Dict[str, Vector], namespace:str):
+        self.vectors = vectors
+        self.namespace = namespace
+
+
+class IndexDescription(VectorStoreResponse):
+    def __init__(self, name:str, dimension:int, metric:str):
+        self.name = name
+        self.dimension = dimension
+        self.metric = metric
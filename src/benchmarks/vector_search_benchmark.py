@@ -0,0 +1,75 @@
+"""
+Exact vs IVF search on the local vector store.
+
+Run from src:
+    python -m benchmarks.vector_search_benchmark --vectors 200000 --nprobe 4 8 16
+"""
+import time
+import argparse
+import tempfile
+import numpy as np
+from typing import List, Set, Tuple
+
+from application.vector_stores.ivf_index import IVFSettings
+from application.vector_stores.local_vector_store import LocalVectorStore
+
+def clustered_vectors(count:int, dimension:int, clusters:int, rng:np.random.Generator) -> np.ndarray:
+    # embeddings are clustered by topic, uniform random vectors would make any ann index look bad
+    centers = rng.normal(size=(clusters, dimension)).astype(np.float32)
+    labels = rng.integers(0, clusters, count)
+    return centers[labels] + rng.normal(scale=0.3, size=(count, dimension)).astype(np.float32)
+
+def run_queries(index, queries:np.ndarray, top_k:int, **kwargs) -> Tuple[List[Set[str]], float]:
+    results = []
+    start = time.perf_counter()
+    for query in queries:
+        response = index.query(query.tolist(), top_k=top_k, namespace="bench", **kwargs)
+        results.append({match.id for match in response.matches})
+    return results, len(queries) / (time.perf_counter() - start)
+
+def recall(found:List[Set[str]], expected:List[Set[str]]) -> float:
+    return float(np.mean([len(f & e) / max(1, len(e)) for f, e in zip(found, expected)]))
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=100000)
+    parser.add_argument("--dimension", type=int, default=1024)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=None)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16, 32])
+    parser.add_argument("--disk", action="store_true", help="use memory mapped segments instead of memory")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    vectors = clustered_vectors(args.vectors, args.dimension, args.clusters, rng)
+    queries = clustered_vectors(args.queries, args.dimension, args.clusters, rng)
+
+    with tempfile.TemporaryDirectory() as directory:
+        settings = IVFSettings(nlist=args.nlist, min_vectors=1)
+        store = LocalVectorStore(directory if args.disk else None, ann=settings)
+        store.create_index("bench", args.dimension)
+        index = store.get_index("bench")
+
+        start = time.perf_counter()
+        for batch in range(0, args.vectors, 10000):
+            chunk = vectors[batch:batch + 10000]
+            index.upsert([(str(batch + i), vector.tolist()) for i, vector in enumerate(chunk)], namespace="bench")
+        print(f"upserted {args.vectors} x {args.dimension} in {time.perf_counter() - start:.1f}s")
+
+        # the first ann query trains the index, time it apart from the rest
+        start = time.perf_counter()
+        index.query(queries[0].tolist(), top_k=args.top_k, namespace="bench")
+        print(f"trained in {time.perf_counter() - start:.1f}s")
+
+        expected, exact_qps = run_queries(index, queries, args.top_k, exact=True)
+        print(f"{'mode':<14}{'recall@' + str(args.top_k):>12}{'qps':>10}")
+        print(f"{'exact':<14}{1.0:>12.3f}{exact_qps:>10.1f}")
+        for nprobe in args.nprobe:
+            found, qps = run_queries(index, queries, args.top_k, nprobe=nprobe)
+            print(f"{'nprobe=' + str(nprobe):<14}{recall(found, expected):>12.3f}{qps:>10.1f}")
+
+if __name__ == "__main__":
+    main()
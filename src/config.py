@@ -1,5 +1,6 @@
 from application.environment import Environment
 from application.dbutils import DbUtils
+from application.vector_stores.local_vector_store import vector_store_from_env
 from application.api.sqlclient import SQLClient
 from application.connectors.connector_builder import ConnectorBuilder
 from application.agents.supervisor_agent.supervisor_agent import SupervisorAgent
@@ -8,7 +9,7 @@ from application.agents.integration_agent.integration_agent import IntegrationAg
 env = Environment()
 env.load_environment()
 
-dbutils = DbUtils(env, 96, 200, "multilingual-e5-large")
+dbutils = DbUtils(env, 96, 200, "multilingual-e5-large", vector_store=vector_store_from_env(env))
 
 
 connect_args = {"check_same_thread": False}
@@ -17,5 +18,5 @@ sqlclient.create_db_and_tables()
 
 connector_manager = ConnectorBuilder(sqlclient, "application/seeds/connectors/pinecone_schema.json")
 
-supervisor_agent = SupervisorAgent(env, dbutils)
+supervisor_agent = SupervisorAgent(env, dbutils, fixed_pipeline=env.FIXED_PIPELINE)
 integration_agent = IntegrationAgent(env, dbutils, connector_manager)
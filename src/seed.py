@@ -0,0 +1,107 @@
+"""
+Seeds a file into the vector store and reports throughput, to size a job before running it for real.
+
+Run from src:
+    python seed.py application/seeds/csv/laptop_prices.csv --index quickstart --namespace laptops --concurrency 8
+"""
+import os
+import sys
+import time
+import argparse
+from typing import Dict, List, Optional
+
+from application.environment import Environment
+from application.dbutils import DbUtils
+from application.seeds.seed_parser import BaseSeedParser
+from application.seeds.csv_parser import CSVParser
+from application.seeds.json_parser import JSONParser
+from application.seeds.parquet_parser import ParquetParser
+from application.vector_stores.local_vector_store import vector_store_from_env
+
+PARSERS = {
+    "csv": CSVParser,
+    "json": JSONParser,
+    "ndjson": JSONParser,
+    "jsonl": JSONParser,
+    "parquet": ParquetParser,
+    "arrow": ParquetParser,
+    "feather": ParquetParser,
+    "ipc": ParquetParser,
+}
+
+def peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:
+        # no resource module on windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on linux, bytes on macos
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def seed_format(file_path:str, file_format:Optional[str]) -> str:
+    file_format = file_format or os.path.splitext(file_path)[1].lstrip(".").lower()
+    if file_format not in PARSERS:
+        raise ValueError(f"No seed parser for '{file_format}' files, use --format with one of: {', '.join(PARSERS)}")
+    return file_format
+
+def run_seed(parser:BaseSeedParser) -> Dict[str, float]:
+    start = time.perf_counter()
+    parser.run()
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    return {
+        "seconds": elapsed,
+        "rows": parser.rows_read,
+        "embeddings": parser.rows_embedded,
+        "upserts": parser.vectors_upserted,
+        "rows_per_second": parser.rows_read / elapsed,
+        "embeddings_per_second": parser.rows_embedded / elapsed,
+        "upserts_per_second": parser.vectors_upserted / elapsed,
+    }
+
+def format_report(stats:Dict[str, float], peak_rss:Optional[float]) -> str:
+    rss = "n/a" if peak_rss is None else f"{peak_rss:.1f} MB"
+    return "\n".join([
+        f"seeded in {stats['seconds']:.2f}s",
+        f"rows:       {stats['rows']:>10}  {stats['rows_per_second']:>10.1f}/s",
+        f"embeddings: {stats['embeddings']:>10}  {stats['embeddings_per_second']:>10.1f}/s",
+        f"upserts:    {stats['upserts']:>10}  {stats['upserts_per_second']:>10.1f}/s",
+        f"skipped:    {stats['rows'] - stats['embeddings']:>10}  (unchanged rows)",
+        f"peak rss:   {rss}",
+    ])
+
+def main(argv:Optional[List[str]]=None) -> None:
+    argument_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    argument_parser.add_argument("file")
+    argument_parser.add_argument("--index", required=True)
+    argument_parser.add_argument("--namespace", required=True)
+    argument_parser.add_argument("--format", choices=sorted(PARSERS), help="defaults to the file extension")
+    argument_parser.add_argument("--batch-size", type=int, default=96, help="rows per embedding call")
+    argument_parser.add_argument("--upsert-batch-size", type=int, default=200, help="vectors per upsert call")
+    argument_parser.add_argument("--concurrency", type=int, default=4, help="batches embedded at once")
+    argument_parser.add_argument("--max-pending", type=int, default=None, help="batches read ahead, 2 x concurrency by default")
+    argument_parser.add_argument("--embedding-model", default="multilingual-e5-large")
+    argument_parser.add_argument("--checkpoint-dir", default=None)
+    argument_parser.add_argument("--resume", action="store_true", help="skip the rows a failed run already upserted")
+    args = argument_parser.parse_args(argv)
+
+    env = Environment()
+    env.load_environment()
+    dbutils = DbUtils(env, args.batch_size, args.upsert_batch_size, args.embedding_model, vector_store=vector_store_from_env(env))
+
+    file_format = seed_format(args.file, args.format)
+    parser_type = PARSERS[file_format]
+    # one parser reads parquet and the arrow formats, it gets told which, the file extension can be anything
+    options = {"file_format": file_format} if parser_type is ParquetParser else {}
+    parser = parser_type(
+        args.file, args.index, args.namespace, dbutils,
+        concurrency=args.concurrency,
+        max_pending=args.max_pending,
+        checkpoint_dir=args.checkpoint_dir,
+        resume=args.resume,
+        **options
+    )
+    print(format_report(run_seed(parser), peak_rss_mb()))
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,6 @@
+import json
 import pytest
+import requests
 from typing import Any
 from fastapi.testclient import TestClient
 from datetime import datetime
@@ -10,6 +12,7 @@ from main import app
 from application.environment import Environment
 from application.api.sqlclient import SQLClient 
 from application.dbutils import DbUtils
+from application.vector_stores.local_vector_store import LocalVectorStore
 from application.api.dependencies import get_sql_client, get_dbutils, get_supervisor_agent
 from application.agents.tools.query_dbutils import create_pinecone_tool
 from application.agents.supervisor_agent.supervisor_agent import SupervisorAgent
@@ -20,9 +23,30 @@ from application.api.models.conversation import Conversation
 from application.api.models.chat import Chat
 
 class MockAgent():
-    def take_input(self, input_message: str, permissions: str):
+    async def take_input(self, input_message: str, permissions: str):
         return "Mock Agent Response"
 
+    async def stream_input(self, input_message: str, permissions: str):
+        for token in ["Mock ", "Agent ", "Response"]:
+            yield "token", token
+        yield "answer", "Mock Agent Response"
+
+# a clock the test moves by hand, for anything that takes a clock callable
+class FakeClock():
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+# a requests.Response without the network, bytes bodies go in as is, anything else as json
+def fake_response(status:int=200, body:Any=b"{}", headers=None) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    response._content = body if isinstance(body, bytes) else json.dumps(body).encode()
+    return response
+
 @pytest.fixture(name='environment')
 def environment_fixture() -> Environment:
     env = Environment()
@@ -46,6 +70,25 @@ def dbutils_fixture(environment: Environment):
     dbutils = DbUtils(environment, 96, 200, "multilingual-e5-large")
     yield dbutils
 
+# a fake embedding (text length, 1, 0) standing in for pinecone inference
+@pytest.fixture(name='fake_embed')
+def fake_embed_fixture() -> MagicMock:
+    return MagicMock(side_effect=lambda model, inputs, parameters: [
+        {"values": [float(len(text)), 1.0, 0.0]} for text in inputs
+    ])
+
+# in memory store and the fake embedding, for seeding tests that should not reach pinecone
+@pytest.fixture(name='local_dbutils')
+def local_dbutils_fixture(fake_embed: MagicMock) -> DbUtils:
+    env = MagicMock()
+    env.PINECONE_API_KEY = "fake-api-key"
+    env.DEBUG_MODE = False
+    dbutils = DbUtils(env, 2, 2, "fake-model", vector_store=LocalVectorStore())
+    dbutils.client = MagicMock()
+    dbutils.client.inference.embed = fake_embed
+    dbutils.create_index("test-index", 3)
+    return dbutils
+
 @pytest.fixture(name='client')
 def client_fixture(sqlclient: SQLClient, dbutils: DbUtils): 
     def get_db_override():
@@ -92,7 +135,7 @@ def initial_state():
 
 @pytest.fixture
 def mock_chat_mistralai():
-    with patch.object(ChatMistralAI, "invoke") as mock:
+    with patch.object(ChatMistralAI, "ainvoke") as mock:
         yield mock
 
 @pytest.fixture
@@ -100,6 +143,13 @@ def mock_chat_mistralai_structured():
     with patch.object(ChatMistralAI, "with_structured_output") as mock:
         yield mock
 
+def mock_astream(steps: list):
+    """Stand in for graph.astream, hands back a fresh async iterator over the steps on every call."""
+    async def astream(*args, **kwargs):
+        for step in steps:
+            yield step
+    return astream
+
 # test data
 
 def get_test_user() -> User:
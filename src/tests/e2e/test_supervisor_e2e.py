@@ -1,3 +1,4 @@
+import pytest
 from application.environment import Environment
 from application.api.sqlclient import SQLClient
 from application.dbutils import DbUtils
@@ -6,7 +7,8 @@ from application.api.models.user import User
 from application.api.models.permission import Permission
 from application.api.models.user_permission import UserPermission
 
-def test_supervisor_agent_permissions(environment: Environment, sqlclient: SQLClient, dbutils: DbUtils):
+@pytest.mark.asyncio
+async def test_supervisor_agent_permissions(environment: Environment, sqlclient: SQLClient, dbutils: DbUtils):
     supervisor_agent = SupervisorAgent(environment, dbutils)
 
     # set up sql data
@@ -32,11 +34,12 @@ def test_supervisor_agent_permissions(environment: Environment, sqlclient: SQLCl
 
     user = sqlclient.get_by_id(User, test_user.id, eager_relationships=[User.permissions])
 
-    result = supervisor_agent.take_input("Tell me about the macbook 1 in laptop_prices.", user.permissions)
+    result = await supervisor_agent.take_input("Tell me about the macbook 1 in laptop_prices.", user.permissions)
 
     assert "laptop_prices" in result
 
-def test_supervisor_agent_no_permissions(environment: Environment, dbutils: DbUtils, sqlclient: SQLClient):
+@pytest.mark.asyncio
+async def test_supervisor_agent_no_permissions(environment: Environment, dbutils: DbUtils, sqlclient: SQLClient):
     supervisor_agent = SupervisorAgent(environment, dbutils)
 
     test_user = User(
@@ -49,5 +52,5 @@ def test_supervisor_agent_no_permissions(environment: Environment, dbutils: DbUt
     sqlclient.add_object(test_user)
 
     user = sqlclient.get_by_id(User, 1, [User.permissions])
-    result = supervisor_agent.take_input("Tell me about the macbook 1 in laptop_prices.", user.permissions)
+    result = await supervisor_agent.take_input("Tell me about the macbook 1 in laptop_prices.", user.permissions)
 
@@ -1,4 +1,5 @@
-from unittest.mock import MagicMock
+import pytest
+from unittest.mock import MagicMock, AsyncMock
 from application.agents.tools.query_dbutils import create_pinecone_tool
 from application.api.models.permission import Permission
 
@@ -6,15 +7,19 @@ from langchain_core.messages import HumanMessage, AIMessage
 from langgraph.types import Command
 from langgraph.graph import END
 from langchain_mistralai import ChatMistralAI
+from langchain_core.runnables import RunnableConfig
 
+from application.agents.extras import State
 from application.agents.supervisor_agent.supervisor_agent import SupervisorAgent
+from tests.conftest import mock_astream
 
 def test_initialization(mock_env: MagicMock, mock_dbutils: MagicMock, mock_pinecone_tool: MagicMock):
     create_pinecone_tool.return_value = mock_pinecone_tool
     supervisor_agent = SupervisorAgent(mock_env, mock_dbutils)
     
-    assert supervisor_agent.context_limit == 0
-    assert supervisor_agent.gen_limit == 0
+    assert not hasattr(supervisor_agent, "context_limit")
+    assert not hasattr(supervisor_agent, "gen_limit")
+    assert supervisor_agent.fixed_pipeline == False
     assert supervisor_agent.members == ["gen", "context"]
     assert supervisor_agent.options == ["gen", "context", "FINISH"]
     assert isinstance(supervisor_agent.genclient, ChatMistralAI)
@@ -23,189 +28,292 @@ def test_initialization(mock_env: MagicMock, mock_dbutils: MagicMock, mock_pinec
     assert supervisor_agent.context_agent is not None
     assert supervisor_agent.graph is not None
 
-def test_context_node(mock_chat_mistralai: MagicMock, supervisor_agent: SupervisorAgent, initial_state: dict):
+@pytest.mark.asyncio
+async def test_context_node(mock_chat_mistralai: MagicMock, supervisor_agent: SupervisorAgent, initial_state: State):
     mock_output = {"role": "assistant", "content": "Context Facts", "name": "context_agent"}
     mock_chat_mistralai.return_value = mock_output
-    result = supervisor_agent.context(initial_state)
+    result = await supervisor_agent.context(initial_state, {})
     
     assert isinstance(result, Command)
     assert result.goto == "supervisor"
+    assert result.update is not None
     assert len(result.update["messages"]) == 1
     assert result.update["messages"][0].content == "Context Facts"
     assert result.update["messages"][0].name == "context"
+    assert result.update["node_failed"] == False
 
-def test_context_node_empty_response(mock_chat_mistralai: MagicMock, supervisor_agent: SupervisorAgent, initial_state: dict):
+@pytest.mark.asyncio
+async def test_context_node_empty_response(mock_chat_mistralai: MagicMock, supervisor_agent: SupervisorAgent, initial_state: State):
     mock_output = {"role": "assistant", "content": ""}
     mock_chat_mistralai.return_value = mock_output
-    result = supervisor_agent.context(initial_state)
+    result = await supervisor_agent.context(initial_state, {})
 
     assert isinstance(result, Command)
     assert result.goto == "supervisor"
+    assert result.update is not None
     assert len(result.update["messages"]) == 1
     assert result.update["messages"][0].content == "" # Empty content if no messages
     assert result.update["messages"][0].name == "context"
+    assert result.update["node_failed"] == True
 
-def test_gen_node(mock_chat_mistralai: MagicMock, supervisor_agent: SupervisorAgent, initial_state: dict):
+@pytest.mark.asyncio
+async def test_gen_node(mock_chat_mistralai: MagicMock, supervisor_agent: SupervisorAgent, initial_state: State):
     mock_output = {"role": "assistant", "content": "Gen Facts", "name": "gen_agent"}
     mock_chat_mistralai.return_value = mock_output
-    result = supervisor_agent.gen(initial_state)
+    result = await supervisor_agent.gen(initial_state, {})
 
     assert isinstance(result, Command)
     assert result.goto == "supervisor"
+    assert result.update is not None
     assert len(result.update["messages"]) == 1
     assert result.update["messages"][0].content == "Gen Facts"
     assert result.update["messages"][0].name == "gen"
 
-def test_gen_node_empty_response(mock_chat_mistralai: MagicMock, supervisor_agent: SupervisorAgent, initial_state: dict):
+@pytest.mark.asyncio
+async def test_gen_node_empty_response(mock_chat_mistralai: MagicMock, supervisor_agent: SupervisorAgent, initial_state: State):
     mock_output = {"role": "assistant", "content": ""}
     mock_chat_mistralai.return_value = mock_output
-    result = supervisor_agent.gen(initial_state)
+    result = await supervisor_agent.gen(initial_state, {})
 
     assert isinstance(result, Command)
     assert result.goto == "supervisor"
+    assert result.update is not None
     assert len(result.update["messages"]) == 1
     assert result.update["messages"][0].content == "" # Empty content if no messages
     assert result.update["messages"][0].name == "gen"
+    assert result.update["node_failed"] == True
 
-def test_supervisor_node_chooses_context(mock_chat_mistralai_structured: MagicMock, supervisor_agent: SupervisorAgent, initial_state: dict):
+@pytest.mark.asyncio
+async def test_supervisor_node_chooses_context(mock_chat_mistralai_structured: MagicMock, supervisor_agent: SupervisorAgent, initial_state: State):
     mock_router = MagicMock()
-    mock_router.invoke.return_value = {"next": "context"}
+    mock_router.ainvoke = AsyncMock(return_value={"next": "context"})
     mock_chat_mistralai_structured.return_value = mock_router
-    result = supervisor_agent.supervisor(initial_state)
+    result = await supervisor_agent.supervisor(initial_state, {})
 
     assert isinstance(result, Command)
     assert result.goto == "context"
-    assert result.update == {"next": "context"}
-    assert supervisor_agent.context_limit == 1
-    assert supervisor_agent.gen_limit == 0
+    assert result.update == {"next": "context", "context_limit": 1}
 
-def test_supervisor_node_chooses_gen(mock_chat_mistralai_structured: MagicMock, supervisor_agent: SupervisorAgent, initial_state: dict):
+@pytest.mark.asyncio
+async def test_supervisor_node_chooses_gen(mock_chat_mistralai_structured: MagicMock, supervisor_agent: SupervisorAgent, initial_state: State):
     mock_router = MagicMock()
-    mock_router.invoke.return_value = {"next": "gen"}
+    mock_router.ainvoke = AsyncMock(return_value={"next": "gen"})
     mock_chat_mistralai_structured.return_value = mock_router
-    result = supervisor_agent.supervisor(initial_state)
+    result = await supervisor_agent.supervisor(initial_state, {})
 
     assert isinstance(result, Command)
     assert result.goto == "gen"
-    assert result.update == {"next": "gen"}
-    assert supervisor_agent.context_limit == 0
-    assert supervisor_agent.gen_limit == 1
+    assert result.update == {"next": "gen", "gen_limit": 1}
 
-def test_supervisor_node_chooses_finish_and_gen_limit_reached(mock_chat_mistralai_structured: MagicMock, supervisor_agent: SupervisorAgent, initial_state: dict):
-    supervisor_agent.gen_limit = 3
+@pytest.mark.asyncio
+async def test_supervisor_node_chooses_finish_and_gen_limit_reached(mock_chat_mistralai_structured: MagicMock, supervisor_agent: SupervisorAgent, initial_state: State):
+    initial_state["gen_limit"] = 3
     mock_router = MagicMock()
-    mock_router.invoke.return_value = {"next": "FINISH"}
+    mock_router.ainvoke = AsyncMock(return_value={"next": "FINISH"})
     mock_chat_mistralai_structured.return_value = mock_router
-    result = supervisor_agent.supervisor(initial_state)
+    result = await supervisor_agent.supervisor(initial_state, {})
 
     assert isinstance(result, Command)
     assert result.goto == "context" # Should go to context as gen limit reached
-    assert result.update == {"next": "context"}
-    assert supervisor_agent.context_limit == 1
-    assert supervisor_agent.gen_limit == 3
+    assert result.update == {"next": "context", "context_limit": 1}
 
-def test_supervisor_node_chooses_finish_and_context_limit_reached(mock_chat_mistralai_structured: MagicMock, supervisor_agent: SupervisorAgent, initial_state: dict):
-    supervisor_agent.context_limit = 3
+@pytest.mark.asyncio
+async def test_supervisor_node_chooses_finish_and_context_limit_reached(mock_chat_mistralai_structured: MagicMock, supervisor_agent: SupervisorAgent, initial_state: State):
+    initial_state["context_limit"] = 3
     mock_router = MagicMock()
-    mock_router.invoke.return_value = {"next": "FINISH"}
+    mock_router.ainvoke = AsyncMock(return_value={"next": "FINISH"})
     mock_chat_mistralai_structured.return_value = mock_router
-    result = supervisor_agent.supervisor(initial_state)
+    result = await supervisor_agent.supervisor(initial_state, {})
 
     assert isinstance(result, Command)
     assert result.goto == "gen" # Should go to gen as context limit reached
-    assert result.update == {"next": "gen"}
-    assert supervisor_agent.context_limit == 3
-    assert supervisor_agent.gen_limit == 1
+    assert result.update == {"next": "gen", "gen_limit": 1}
 
-def test_supervisor_node_chooses_finish_and_both_limits_reached_and_both_called(mock_chat_mistralai_structured: MagicMock, supervisor_agent: SupervisorAgent, initial_state: dict):
-    supervisor_agent.context_limit = 1
-    supervisor_agent.gen_limit = 1
+@pytest.mark.asyncio
+async def test_supervisor_node_chooses_finish_and_both_limits_reached_and_both_called(mock_chat_mistralai_structured: MagicMock, supervisor_agent: SupervisorAgent, initial_state: State):
+    initial_state["context_limit"] = 1
+    initial_state["gen_limit"] = 1
     mock_router = MagicMock()
-    mock_router.invoke.return_value = {"next": "FINISH"}
+    mock_router.ainvoke = AsyncMock(return_value={"next": "FINISH"})
     mock_chat_mistralai_structured.return_value = mock_router
-    result = supervisor_agent.supervisor(initial_state)
+    result = await supervisor_agent.supervisor(initial_state, {})
 
     assert isinstance(result, Command)
     assert result.goto == END
     assert result.update == {"next": END}
-    assert supervisor_agent.context_limit == 1
-    assert supervisor_agent.gen_limit == 1
 
-def test_supervisor_node_forces_gen_if_context_limit_reached_before_gen(mock_chat_mistralai_structured: MagicMock, supervisor_agent: SupervisorAgent, initial_state: dict):
-    supervisor_agent.context_limit = 3
+@pytest.mark.asyncio
+async def test_supervisor_node_forces_gen_if_context_limit_reached_before_gen(mock_chat_mistralai_structured: MagicMock, supervisor_agent: SupervisorAgent, initial_state: State):
+    initial_state["context_limit"] = 3
     mock_router = MagicMock()
-    mock_router.invoke.return_value = {"next": "context"} # Even if it chooses context
+    mock_router.ainvoke = AsyncMock(return_value={"next": "context"}) # Even if it chooses context
     mock_chat_mistralai_structured.return_value = mock_router
-    result = supervisor_agent.supervisor(initial_state)
+    result = await supervisor_agent.supervisor(initial_state, {})
 
     assert isinstance(result, Command)
     assert result.goto == "gen"
-    assert result.update == {"next": "gen"}
-    assert supervisor_agent.context_limit == 3
-    assert supervisor_agent.gen_limit == 1
+    assert result.update == {"next": "gen", "gen_limit": 1}
 
-def test_supervisor_node_forces_context_if_gen_limit_reached_before_context(mock_chat_mistralai_structured: MagicMock, supervisor_agent: SupervisorAgent, initial_state: dict):
-    supervisor_agent.gen_limit = 3
+@pytest.mark.asyncio
+async def test_supervisor_node_forces_context_if_gen_limit_reached_before_context(mock_chat_mistralai_structured: MagicMock, supervisor_agent: SupervisorAgent, initial_state: State):
+    initial_state["gen_limit"] = 3
     
     mock_router = MagicMock()
-    mock_router.invoke.return_value = {"next": "gen"} # even if it chooses gen
+    mock_router.ainvoke = AsyncMock(return_value={"next": "gen"}) # even if it chooses gen
     mock_chat_mistralai_structured.return_value = mock_router
 
-    result = supervisor_agent.supervisor(initial_state)
+    result = await supervisor_agent.supervisor(initial_state, {})
 
     assert isinstance(result, Command)
     assert result.goto == "context"
-    assert result.update == {"next": "context"}
-    assert supervisor_agent.context_limit == 1
-    assert supervisor_agent.gen_limit == 3
+    assert result.update == {"next": "context", "context_limit": 1}
 
-def test_take_input_no_end_state(supervisor_agent: SupervisorAgent):
+@pytest.mark.asyncio
+async def test_supervisor_fixed_pipeline_runs_context_gen_finish(mock_chat_mistralai_structured: MagicMock, supervisor_agent: SupervisorAgent, initial_state: State):
+    supervisor_agent.fixed_pipeline = True
+
+    first = await supervisor_agent.supervisor(initial_state, {})
+    initial_state["context_limit"] = 1
+    second = await supervisor_agent.supervisor(initial_state, {})
+    initial_state["gen_limit"] = 1
+    third = await supervisor_agent.supervisor(initial_state, {})
+
+    assert first.goto == "context"
+    assert first.update == {"next": "context", "context_limit": 1}
+    assert second.goto == "gen"
+    assert second.update == {"next": "gen", "gen_limit": 1}
+    assert third.goto == END
+    assert third.update == {"next": END}
+    mock_chat_mistralai_structured.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_supervisor_fixed_pipeline_falls_back_to_llm_on_failure(mock_chat_mistralai_structured: MagicMock, supervisor_agent: SupervisorAgent, initial_state: State):
+    supervisor_agent.fixed_pipeline = True
+    initial_state["context_limit"] = 1
+    initial_state["node_failed"] = True
+    mock_router = MagicMock()
+    mock_router.ainvoke = AsyncMock(return_value={"next": "context"})
+    mock_chat_mistralai_structured.return_value = mock_router
+
+    result = await supervisor_agent.supervisor(initial_state, {})
+
+    assert result.goto == "context"
+    assert result.update == {"next": "context", "context_limit": 2}
+    mock_router.ainvoke.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_take_input_no_end_state(supervisor_agent: SupervisorAgent):
     mock_permission = MagicMock(spec=Permission)
     mock_permission.permission_name = "test_permission"
     mock_graph = MagicMock()
     supervisor_agent.graph = mock_graph
-    mock_graph.stream.return_value = [
+    mock_graph.astream.side_effect = mock_astream([
         ("start", {"messages": [HumanMessage(content="Test User Query"), HumanMessage(content="['test_permission']")]}),
         ("supervisor", {"next": "gen"}),
         ("gen", {"messages": [AIMessage(content="Final Answer", name="gen")]}),
         ("supervisor", {"next": "context"}), # No END state
-    ]
+    ])
     
-    assert supervisor_agent.context_limit == 0
-    assert supervisor_agent.gen_limit == 0
+    result = await supervisor_agent.take_input("Test User Query", [mock_permission])
+
+    assert result is None
 
-def test_take_input_empty_permissions(supervisor_agent: SupervisorAgent):
+@pytest.mark.asyncio
+async def test_take_input_empty_permissions(supervisor_agent: SupervisorAgent):
     mock_permission = MagicMock(spec=Permission)
     mock_permission.permission_name = "test_permission"
     mock_graph = MagicMock()
     supervisor_agent.graph = mock_graph
 
-    mock_graph.stream.return_value = [
+    mock_graph.astream.side_effect = mock_astream([
         ("start", {"messages": [HumanMessage(content="Test User Query"), HumanMessage(content="[]")]}),
         ("supervisor", {"next": "gen"}),
         ("gen", {"messages": [AIMessage(content="Final Answer", name="gen")]}),
         ("supervisor", {"next": END}),
         (END, {})
-    ]
+    ])
 
-    result = supervisor_agent.take_input("Test User Query", [])
+    result = await supervisor_agent.take_input("Test User Query", [])
     assert result == None
-    assert supervisor_agent.context_limit == 0
-    assert supervisor_agent.gen_limit == 0
 
-def test_take_input_supervisor_finishes_immediately(supervisor_agent: SupervisorAgent):
+@pytest.mark.asyncio
+async def test_take_input_supervisor_finishes_immediately(supervisor_agent: SupervisorAgent):
     mock_permission = MagicMock(spec=Permission)
     mock_permission.permission_name = "test_permission"
     mock_graph = MagicMock()
     supervisor_agent.graph = mock_graph
-    mock_graph.stream.return_value = [
+    mock_graph.astream.side_effect = mock_astream([
         ("start", {"messages": [HumanMessage(content="Test User Query"), HumanMessage(content="['test_permission']")]}),
         ("supervisor", {"next": "FINISH"}),
         ("FINISH", {})
-    ]
+    ])
     
-    result = supervisor_agent.take_input("Test User Query", [mock_permission])
+    result = await supervisor_agent.take_input("Test User Query", [mock_permission])
 
     assert result is None
-    assert supervisor_agent.context_limit == 0
-    assert supervisor_agent.gen_limit == 0
+
+@pytest.mark.asyncio
+async def test_take_input_starts_with_fresh_counters(supervisor_agent: SupervisorAgent):
+    mock_graph = MagicMock()
+    supervisor_agent.graph = mock_graph
+    mock_graph.astream.side_effect = mock_astream([])
+
+    await supervisor_agent.take_input("Test User Query", [])
+    await supervisor_agent.take_input("Another Query", [])
+
+    for call in mock_graph.astream.call_args_list:
+        graph_input = call.args[0]
+        assert graph_input["context_limit"] == 0
+        assert graph_input["gen_limit"] == 0
+
+@pytest.mark.asyncio
+async def test_stream_input_only_streams_gen_tokens(supervisor_agent: SupervisorAgent):
+    mock_graph = MagicMock()
+    supervisor_agent.graph = mock_graph
+    mock_graph.astream.side_effect = mock_astream([
+        ((), "updates", {"supervisor": {"next": "context"}}),
+        (("context:1", "agent:1"), "messages", (AIMessage(content="context token"), {})),
+        ((), "updates", {"context": {"messages": [HumanMessage(content="Facts", name="context")]}}),
+        ((), "updates", {"supervisor": {"next": "gen"}}),
+        (("gen:1", "agent:2"), "messages", (AIMessage(content="Final "), {})),
+        (("gen:1", "agent:2"), "messages", (AIMessage(content="Answer"), {})),
+        (("gen:1",), "updates", {"agent": {"messages": [AIMessage(content="Final Answer")]}}),
+        ((), "updates", {"gen": {"messages": [HumanMessage(content="Final Answer", name="gen")]}}),
+        ((), "updates", {"supervisor": {"next": END}}),
+    ])
+
+    events = [event async for event in supervisor_agent.stream_input("Test User Query", [])]
+
+    assert events == [("token", "Final "), ("token", "Answer"), ("answer", "Final Answer")]
+    assert mock_graph.astream.call_args.kwargs["stream_mode"] == ["messages", "updates"]
+
+@pytest.mark.asyncio
+async def test_nodes_pass_their_config_on(supervisor_agent: SupervisorAgent, initial_state: State):
+    config: RunnableConfig = {"callbacks": [MagicMock()]}
+    for name in ["context_agent", "gen_agent"]:
+        agent = MagicMock()
+        agent.ainvoke = AsyncMock(return_value={"messages": [AIMessage(content="Facts")]})
+        setattr(supervisor_agent, name, agent)
+
+    await supervisor_agent.context(initial_state, config)
+    await supervisor_agent.gen(initial_state, config)
+
+    supervisor_agent.context_agent.ainvoke.assert_awaited_once_with(initial_state, config)
+    supervisor_agent.gen_agent.ainvoke.assert_awaited_once_with(initial_state, config)
+
+@pytest.mark.asyncio
+async def test_stream_input_resets_when_gen_runs_again(supervisor_agent: SupervisorAgent):
+    mock_graph = MagicMock()
+    supervisor_agent.graph = mock_graph
+    mock_graph.astream.side_effect = mock_astream([
+        (("gen:1", "agent:1"), "messages", (AIMessage(content="First"), {})),
+        ((), "updates", {"gen": {"messages": [HumanMessage(content="", name="gen")]}}),
+        ((), "updates", {"supervisor": {"next": "gen"}}),
+        (("gen:2", "agent:2"), "messages", (AIMessage(content="Second"), {})),
+        ((), "updates", {"gen": {"messages": [HumanMessage(content="Second", name="gen")]}}),
+        ((), "updates", {"supervisor": {"next": END}}),
+    ])
+
+    events = [event async for event in supervisor_agent.stream_input("Test User Query", [])]
+
+    assert events == [("token", "First"), ("reset", None), ("token", "Second"), ("answer", "Second")]
@@ -1,5 +1,5 @@
 from application.dbutils import DbUtils
-from application.agents.tools.query_dbutils import create_pinecone_tool
+from application.agents.tools.query_dbutils import create_pinecone_tool, create_multi_namespace_tool
 from application.agents.tools.namespace_tool import namespace_tool
 from application.agents.tools.query_connectors import create_connector_tool
 from application.agents.tools.upsert_dbutils import create_upserter_tool
@@ -19,6 +19,25 @@ def test_query_dbutils_tool(dbutils: DbUtils):
     assert result == [{"id": "1", "score": "0.9"}, {"id": "2", "score": "0.8"}]
     assert isinstance(pinecone_tool, BaseTool)
 
+def test_query_dbutils_many_tool():
+    mock_dbutils = MagicMock()
+    mock_dbutils.create_query_embedding.return_value = [0.1, 0.2, 0.3]
+    mock_dbutils.search_many.return_value = [{"id": "1", "score": 0.9, "namespace": "ns1"}]
+
+    tool = create_multi_namespace_tool(mock_dbutils)
+
+    result = tool.run(tool_input={"user_query": "test query", "namespaces": ["ns1", "ns2"]})
+
+    assert result == [{"id": "1", "score": 0.9, "namespace": "ns1"}]
+    mock_dbutils.create_query_embedding.assert_called_once_with("test query")
+    mock_dbutils.search_many.assert_called_once_with(
+        index_name="quickstart",
+        namespaces=["ns1", "ns2"],
+        embedding=[0.1, 0.2, 0.3],
+        result_amount=5
+    )
+    assert isinstance(tool, BaseTool)
+
 def test_namespace_tool(dbutils: DbUtils):
     mock_dbutils = MagicMock()
     mock_dbutils.get_namespaces.return_value = ["namespace1", "namespace2"]
@@ -51,6 +70,24 @@ def test_query_rest_connector_tool():
 
     assert isinstance(tool, BaseTool)
 
+def test_query_rest_connector_batch_tool():
+    mock_connector_builder = MagicMock()
+    mock_rest_connector = MagicMock()
+
+    mock_connector_builder.get_connector.return_value = mock_rest_connector
+    mock_rest_connector.fetch_many.return_value = [{"stops": 1}, {"error": "404"}]
+
+    tool = create_connector_tool(mock_connector_builder)[2]
+
+    result = tool.run(tool_input={
+        "connector_name": "rest_connector",
+        "requests": [{"endpoint": "/stops", "params": {"route": "42"}}, {"endpoint": "/missing"}]
+    })
+
+    assert result == [{"stops": 1}, {"error": "404"}]
+    mock_rest_connector.fetch_many.assert_called_once_with([("/stops", {"route": "42"}), ("/missing", None)])
+    assert isinstance(tool, BaseTool)
+
 def test_query_postgres_connector():
     mock_connector_builder = MagicMock()
     mock_postgres_connector = MagicMock()
@@ -73,8 +110,7 @@ def test_query_postgres_connector():
 def test_upsert_dbutils():
     mock_dbutils = MagicMock()
 
-    mock_dbutils.create_embedding.return_value = [{"values": [0.1, 0.2, 0.3]}, {"values": [0.4, 0.5, 0.6]}]
-    mock_dbutils.upsert_embeddings.return_value = 2
+    mock_dbutils.embed_and_upsert.return_value = 2
 
     upsert_tool = create_upserter_tool(mock_dbutils)
 
@@ -91,4 +127,5 @@ def test_upsert_dbutils():
     result = upsert_tool.run(tool_input=tool_input)
 
     assert result == 2
+    mock_dbutils.embed_and_upsert.assert_called_once_with("quickstart", "test_namespace", test_data)
     assert isinstance(upsert_tool, BaseTool)
@@ -1,8 +1,11 @@
+import json
+import asyncio
 from fastapi.testclient import TestClient
 from fastapi.encoders import jsonable_encoder
 
 from application.api.sqlclient import SQLClient
 from application.api.models.user import User
+from application.api.models.chat import Chat
 from tests.conftest import create_test_conversation, create_test_chat
 
 # get_last_conversation
@@ -184,6 +187,72 @@ def test_create_response_success(client: TestClient, sqlclient):
     assert response.status_code == 200
     assert content["conversation_id"] == 1
 
+def record_sql_on_loop(sqlclient: SQLClient, mocker) -> list:
+    # one entry per sql call, True when it ran on the event loop thread
+    on_loop = []
+    for name in ["get_by_id", "add_object"]:
+        call = getattr(sqlclient, name)
+        def recorded(*args, call=call, **kwargs):
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(True)
+            except RuntimeError:
+                on_loop.append(False)
+            return call(*args, **kwargs)
+        mocker.patch.object(sqlclient, name, side_effect=recorded)
+    return on_loop
+
+def test_create_response_keeps_sql_off_the_event_loop(client: TestClient, sqlclient: SQLClient, mocker):
+    sqlclient.add_object(create_test_conversation(id=1))
+    sqlclient.add_object(User(id=1, username="testuser", email="test@example.com", password="password", is_admin=False))
+    on_loop = record_sql_on_loop(sqlclient, mocker)
+
+    response = client.post("/conversation/1/chat/response", json=jsonable_encoder(create_test_chat(conversation_id=1, body="User Input")))
+
+    assert response.status_code == 200
+    assert on_loop == [False, False, False]
+
+def test_stream_response_keeps_sql_off_the_event_loop(client: TestClient, sqlclient: SQLClient, mocker):
+    sqlclient.add_object(create_test_conversation(id=1))
+    sqlclient.add_object(User(id=1, username="testuser", email="test@example.com", password="password", is_admin=False))
+    on_loop = record_sql_on_loop(sqlclient, mocker)
+
+    response = client.post("/conversation/1/chat/response/stream", json=jsonable_encoder(create_test_chat(conversation_id=1, body="User Input")))
+
+    assert response.status_code == 200
+    assert on_loop == [False, False, False]
+
+def test_stream_response_not_found(client: TestClient):
+    chat = create_test_chat(conversation_id=1, body="User Input")
+    response = client.post("/conversation/1/chat/response/stream", json=jsonable_encoder(chat))
+
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Conversation not found"}
+
+def test_stream_response_success(client: TestClient, sqlclient: SQLClient):
+    conversation = create_test_conversation(id=1)
+    sqlclient.add_object(conversation)
+    user = User(id=1, username="testuser", email="test@example.com", password="password", is_admin=False)
+    sqlclient.add_object(user)
+
+    chat = create_test_chat(conversation_id=1, body="User Input")
+    response = client.post("/conversation/1/chat/response/stream", json=jsonable_encoder(chat))
+    events = [event for event in response.text.split("\n\n") if event]
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert events[:3] == [
+        'event: token\ndata: "Mock "',
+        'event: token\ndata: "Agent "',
+        'event: token\ndata: "Response"'
+    ]
+    assert events[-1].startswith("event: done\ndata: ")
+
+    saved = json.loads(events[-1].split("data: ", 1)[1])
+    assert saved["body"] == "Response:Mock Agent Response"
+    assert saved["conversation_id"] == 1
+    assert sqlclient.get_by_id(Chat, saved["id"]) is not None
+
 
 # delete_chat
 def test_delete_chat_not_found(client: TestClient):
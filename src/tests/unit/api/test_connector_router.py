@@ -1,7 +1,10 @@
 import json
+from unittest.mock import MagicMock
 from fastapi.testclient import TestClient
 
 from application.api.sqlclient import SQLClient
+from application.dbutils import DbUtils
+from application.vector_stores.local_vector_store import LocalVectorStore
 from tests.conftest import get_test_rest_connector, get_test_rest_connector_json
 
 # get_all_connectors
@@ -44,3 +47,98 @@ def test_create_connector_success(client: TestClient):
     assert response_json["type_c"] == connector["type_c"]
     assert response_json["c_params"] == connector["c_params"]
     assert response_json["e_params"] == connector["e_params"]
+
+# get_connector_cache_stats
+def test_get_connector_cache_stats_no_cache(client: TestClient):
+    connector = get_test_rest_connector_json()
+    client.post(url="connector/new", json=connector)
+
+    response = client.get(f"connector/{connector['name']}/cache")
+
+    assert response.status_code == 404
+    assert response.text == '{"detail":"No response cache for this connector"}'
+
+def test_get_connector_cache_stats(client: TestClient):
+    connector = get_test_rest_connector_json()
+    connector["c_params"]["cache"] = "True"
+    client.post(url="connector/new", json=connector)
+
+    response = client.get(f"connector/{connector['name']}/cache")
+
+    assert response.status_code == 200
+    assert response.json()["hits"] == 0
+    assert response.json()["max_size"] == 256
+
+# ingest_connector_endpoint
+def test_ingest_connector_not_found(client: TestClient):
+    response = client.post("connector/missing/ingest", json={"endpoint": "/stops"})
+
+    assert response.status_code == 404
+
+def test_ingest_connector_without_pagination(client: TestClient):
+    connector = get_test_rest_connector_json()
+    client.post(url="connector/new", json=connector)
+
+    response = client.post(f"connector/{connector['name']}/ingest", json={"endpoint": "/stops"})
+
+    assert response.status_code == 400
+    assert response.text == '{"detail":"Connector has no pagination set up"}'
+
+def test_ingest_connector_streams_pages(client: TestClient, dbutils: DbUtils):
+    from config import connector_manager
+    connector = get_test_rest_connector_json()
+    connector["c_params"]["pagination"] = {"style": "cursor", "items": "data", "id_field": "stop_id"}
+    client.post(url="connector/new", json=connector)
+    pages = [
+        {"data": [{"stop_id": "s1", "name": "Main St"}, {"stop_id": "s2", "name": "Station"}], "next_cursor": "2"},
+        {"data": [{"stop_id": "s3", "name": "Quay"}], "next_cursor": None},
+    ]
+    rest_connector = connector_manager.get_connector(connector["name"])
+    assert rest_connector is not None
+    rest_connector.fetch_page = MagicMock(side_effect=[(page, {}) for page in pages])
+    dbutils.vector_store = LocalVectorStore()
+    dbutils.client = MagicMock()
+    dbutils.client.inference.embed.side_effect = lambda model, inputs, parameters: [{"values": [1.0] * 1023 + [float(len(text))]} for text in inputs]
+
+    response = client.post(f"connector/{connector['name']}/ingest", json={"endpoint": "/stops", "index_name": "test-index"})
+
+    assert response.status_code == 200
+    assert response.json() == {"rows": 3, "embedded": 3, "upserted": 3}
+    stored = dbutils.get_index("test-index").fetch(["s3"], namespace=connector["name"]).vectors
+    assert stored["s3"].metadata["text"] == "s3, Quay"
+
+# get_connector_status
+def test_get_connector_status_not_found(client: TestClient):
+    response = client.get("connector/missing/status")
+
+    assert response.status_code == 404
+
+def test_get_connector_status_shows_the_circuit(client: TestClient):
+    connector = get_test_rest_connector_json()
+    connector["c_params"]["circuit_breaker"] = {"failure_threshold": 2, "reset_timeout": 60}
+    client.post(url="connector/new", json=connector)
+
+    response = client.get(f"connector/{connector['name']}/status")
+
+    assert response.status_code == 200
+    assert response.json()["active"] == False
+    assert response.json()["circuit_breaker"]["state"] == "closed"
+    assert response.json()["rate_limit"] is None
+
+def test_ingest_connector_needs_an_endpoint_or_query(client: TestClient):
+    connector = get_test_rest_connector_json()
+    client.post(url="connector/new", json=connector)
+
+    response = client.post(f"connector/{connector['name']}/ingest", json={})
+
+    assert response.status_code == 400
+    assert response.text == '{"detail":"An endpoint or a query is needed"}'
+
+def test_ingest_rest_connector_with_a_query(client: TestClient):
+    connector = get_test_rest_connector_json()
+    client.post(url="connector/new", json=connector)
+
+    response = client.post(f"connector/{connector['name']}/ingest", json={"query": "select * from stops"})
+
+    assert response.status_code == 400
+    assert response.text == '{"detail":"Connector can not stream sql queries"}'
@@ -0,0 +1,83 @@
+import asyncio
+import httpx
+import pytest
+from typing import Any
+
+from tests.conftest import get_test_rest_connector
+from application.connectors.async_rest_connector import AsyncRestConnector
+
+@pytest.fixture
+def connector(mocker):
+    config = get_test_rest_connector()
+    config.c_params["base_url"] = "https://simplytransport.ie"
+    config.c_params["headers"] = {"Content-Type": "application/json"}
+    config.c_params["retries"] = 3
+    config.c_params["max_concurrency"] = 2
+    connector = AsyncRestConnector(config)
+    mocker.patch("application.connectors.rest_connector.random.uniform", return_value=0)
+    yield connector
+    connector.shutdown()
+
+def use_transport(connector: AsyncRestConnector, handler):
+    connector.ensure_loop()
+    connector.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+def test_get_runs_on_the_connector_loop(connector: AsyncRestConnector):
+    use_transport(connector, lambda request: httpx.Response(200, json={"path": request.url.path, "route": request.url.params.get("route")}))
+
+    assert connector.get("/stops", {"route": "42"}) == {"path": "/stops", "route": "42"}
+    assert connector.thread is not None and connector.thread.is_alive()
+
+def test_fetch_many_runs_concurrently_under_the_limit(connector: AsyncRestConnector):
+    state = {"in_flight": 0, "most": 0}
+
+    async def handler(request):
+        state["in_flight"] += 1
+        state["most"] = max(state["most"], state["in_flight"])
+        await asyncio.sleep(0.02)
+        state["in_flight"] -= 1
+        return httpx.Response(200, json={"stop": request.url.params["id"]})
+
+    use_transport(connector, handler)
+    results = connector.fetch_many([("/stop", {"id": str(i)}) for i in range(6)])
+
+    assert results == [{"stop": str(i)} for i in range(6)]
+    assert state["most"] == 2
+
+def test_fetch_many_keeps_going_past_a_failure(connector: AsyncRestConnector):
+    calls = {"flaky": 0}
+
+    def handler(request):
+        if request.url.path == "/missing":
+            return httpx.Response(404)
+        if request.url.path == "/flaky":
+            calls["flaky"] += 1
+            if calls["flaky"] == 1:
+                return httpx.Response(503)
+        return httpx.Response(200, json={"ok": request.url.path})
+
+    use_transport(connector, handler)
+    results = connector.fetch_many([("/a", None), ("/missing", None), ("/flaky", None)])
+
+    assert results[0] == {"ok": "/a"}
+    assert "not retrying" in results[1]["error"]
+    assert results[2] == {"ok": "/flaky"}
+    assert calls["flaky"] == 2
+
+def test_http2_is_on_by_default(connector: AsyncRestConnector):
+    connector.ensure_loop()
+
+    assert connector.session is None
+    assert connector.client is not None
+    transport: Any = connector.client._transport
+    assert transport._pool._http2
+
+def test_shutdown_stops_the_loop(connector: AsyncRestConnector):
+    connector.ensure_loop()
+    thread = connector.thread
+    assert thread is not None
+    connector.shutdown()
+
+    thread.join(timeout=1)
+    assert not thread.is_alive()
+    assert connector.loop is None
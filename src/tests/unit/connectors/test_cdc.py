@@ -0,0 +1,110 @@
+import json
+import pytest
+from unittest.mock import MagicMock
+
+from tests.conftest import FakeClock
+from application.dbutils import DbUtils
+from application.connectors.cdc import CDCIngestor, ChangeBatcher, RowChange, decode, parse_change
+
+def change_event(op, before=None, after=None, table="orders", wrapped=True):
+    payload = {"op": op, "before": before, "after": after, "source": {"table": table}}
+    return {"schema": {}, "payload": payload} if wrapped else payload
+
+def row_change(event, key=None, key_columns=None) -> RowChange:
+    change = parse_change(event, key, key_columns)
+    assert change is not None
+    return change
+
+def test_parse_upserts_use_the_after_row():
+    change = row_change(change_event("u", {"id": 7, "total": 1}, {"id": 7, "total": 2, "tags": ["a"]}))
+
+    assert change.id == "orders:7"
+    assert not change.deleted
+    assert change.text() == 'orders: id: 7, total: 2, tags: ["a"]'
+
+def test_parse_deletes_use_the_before_row():
+    change = row_change(change_event("d", before={"id": 7}, wrapped=False))
+
+    assert change.deleted
+    assert change.id == "orders:7"
+
+def test_primary_key_from_message_key_then_key_columns():
+    event = change_event("c", after={"order_id": 1, "line": 2, "sku": "x"}, table="order_lines")
+
+    assert row_change(event, {"schema": {}, "payload": {"order_id": 1, "line": 2}}).id == "order_lines:1-2"
+    assert row_change(event, None, {"order_lines": ["order_id", "line"]}).id == "order_lines:1-2"
+    # no key and no id column, nothing to tie the vector to
+    assert parse_change(event) is None
+
+@pytest.mark.parametrize("event", [
+    None,
+    "not json",
+    change_event("t"),
+    change_event("c", after=None),
+    {"payload": None, "schema": {}},
+])
+def test_non_row_events_are_ignored(event):
+    assert parse_change(event) is None
+
+def test_decode_keys():
+    assert decode(json.dumps({"schema": {}, "payload": {"id": 3}}).encode()) == {"id": 3}
+    assert decode(b"{not json") is None
+    assert decode(None) is None
+
+def test_ingestor_upserts_and_deletes(local_dbutils: DbUtils):
+    ingestor = CDCIngestor(local_dbutils, "test-index", "postgres_database")
+
+    result = ingestor.apply([
+        row_change(change_event("c", after={"id": 1, "total": 5})),
+        row_change(change_event("c", after={"id": 2, "total": 6})),
+    ])
+    assert result == {"upserted": 2, "deleted": 0}
+
+    result = ingestor.apply([row_change(change_event("d", before={"id": 1}))])
+    assert result == {"upserted": 0, "deleted": 1}
+
+    stored = local_dbutils.get_index("test-index").fetch(["orders:1", "orders:2"], namespace="postgres_database").vectors
+    assert list(stored) == ["orders:2"]
+    assert stored["orders:2"].metadata["text"] == "orders: id: 2, total: 6"
+
+def test_ingestor_skips_rows_whose_text_did_not_change(local_dbutils: DbUtils, fake_embed: MagicMock):
+    ingestor = CDCIngestor(local_dbutils, "test-index", "postgres_database")
+    change = row_change(change_event("u", after={"id": 1, "total": 5}))
+    ingestor.apply([change])
+
+    assert ingestor.apply([change]) == {"upserted": 0, "deleted": 0}
+    assert fake_embed.call_count == 1
+
+def test_batcher_is_due_on_size():
+    batcher = ChangeBatcher(max_events=3, max_wait=10, clock=FakeClock())
+    assert batcher.time_left() is None and not batcher.ready()
+
+    for key in ["a", "b", "a"]:
+        batcher.add(key, key.upper())
+
+    # three events but two rows
+    assert batcher.ready()
+    assert batcher.drain() == ["A", "B"]
+    assert batcher.coalesced == 1
+    assert batcher.events == 0 and batcher.time_left() is None
+
+def test_batcher_is_due_on_time():
+    clock = FakeClock()
+    batcher = ChangeBatcher(max_events=100, max_wait=0.2, clock=clock)
+    clock.now = 5
+    batcher.add("a", 1)
+    clock.now = 5.15
+
+    assert batcher.time_left() == pytest.approx(0.05)
+    assert not batcher.ready()
+    clock.now = 5.2
+    assert batcher.ready()
+
+def test_last_change_to_a_row_wins():
+    batcher = ChangeBatcher()
+    for event in [change_event("c", after={"id": 1, "v": 1}), change_event("u", after={"id": 1, "v": 2}), change_event("d", before={"id": 1})]:
+        change = row_change(event)
+        batcher.add(change.id, change)
+
+    [change] = batcher.drain()
+    assert change.deleted
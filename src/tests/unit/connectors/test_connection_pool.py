@@ -0,0 +1,144 @@
+import threading
+import psycopg2
+import pytest
+from unittest.mock import MagicMock
+
+from tests.conftest import FakeClock
+from application.connectors.connection_pool import PostgresPool
+
+class FakeConnection(object):
+    def __init__(self):
+        self.closed = 0
+        self.cursor_obj = MagicMock()
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self, cursor_factory=None):
+        return self.cursor_obj
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+class FakePool(object):
+    def __init__(self, minconn, maxconn, **connection_params):
+        self.idle = []
+        self.made = 0
+        self.closed = []
+
+    def getconn(self):
+        if self.idle:
+            return self.idle.pop()
+        self.made += 1
+        return FakeConnection()
+
+    def putconn(self, connection, close=False):
+        if close:
+            connection.closed = 1
+            self.closed.append(connection)
+        else:
+            self.idle.append(connection)
+
+    def closeall(self):
+        pass
+
+@pytest.fixture
+def pool() -> PostgresPool:
+    return PostgresPool({"dbname": "test"}, max_size=2, timeout=0.05, health_check_interval=30, clock=FakeClock(), pool_factory=FakePool)
+
+def test_connections_are_reused_and_committed(pool: PostgresPool):
+    with pool.connection() as connection:
+        first = connection
+    with pool.connection() as connection:
+        assert connection is first
+
+    assert first.commits == 2
+    assert pool.pool.made == 1
+    assert pool.stats() == {"max_size": 2, "in_use": 0, "reconnects": 0}
+
+def test_pool_is_bounded(pool: PostgresPool):
+    held = [pool.checkout(), pool.checkout()]
+
+    with pytest.raises(Exception, match="No postgres connection free"):
+        pool.checkout()
+
+    pool.checkin(held[0])
+    assert pool.checkout() is held[0]
+
+def test_waiting_callers_get_the_next_free_connection(pool: PostgresPool):
+    held = [pool.checkout(), pool.checkout()]
+    pool.timeout = 5
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.checkout()))
+    waiter.start()
+    pool.checkin(held[1])
+    waiter.join(timeout=5)
+
+    assert got == [held[1]]
+
+def test_idle_dead_connections_are_replaced(pool: PostgresPool):
+    with pool.connection() as connection:
+        stale = connection
+    pool.clock.now = 31
+    stale.cursor_obj.__enter__.return_value.execute.side_effect = psycopg2.OperationalError("server closed the connection")
+
+    with pool.connection() as connection:
+        assert connection is not stale
+
+    assert pool.pool.closed == [stale]
+    assert pool.stats()["reconnects"] == 1
+
+def test_every_dead_idle_connection_is_replaced(pool: PostgresPool):
+    idle = [pool.checkout(), pool.checkout()]
+    for connection in idle:
+        pool.checkin(connection)
+        connection.cursor_obj.__enter__.return_value.execute.side_effect = psycopg2.OperationalError("terminating connection")
+    pool.clock.now = 31
+
+    with pool.connection() as connection:
+        assert connection not in idle
+
+    assert sorted(map(id, pool.pool.closed)) == sorted(map(id, idle))
+    assert pool.stats()["reconnects"] == 2
+
+def test_gives_up_when_no_connection_is_healthy(pool: PostgresPool, mocker):
+    mocker.patch.object(pool, "healthy", return_value=False)
+
+    with pytest.raises(Exception, match="No healthy postgres connection after 3 tries"):
+        pool.checkout()
+    assert pool.stats()["in_use"] == 0
+    # the slot was given back
+    assert pool.slots.acquire(timeout=0) and pool.slots.acquire(timeout=0)
+
+def test_recently_used_connections_skip_the_check(pool: PostgresPool):
+    with pool.connection() as connection:
+        used = connection
+    # new connections are always checked once
+    used.cursor_obj.reset_mock()
+    pool.clock.now = 10
+
+    with pool.connection():
+        pass
+
+    used.cursor_obj.__enter__.return_value.execute.assert_not_called()
+
+def test_broken_connections_are_not_put_back(pool: PostgresPool):
+    with pytest.raises(psycopg2.InterfaceError):
+        with pool.connection() as connection:
+            broken = connection
+            raise psycopg2.InterfaceError("connection already closed")
+
+    assert pool.pool.closed == [broken]
+    assert pool.stats()["in_use"] == 0
+
+def test_query_errors_roll_back(pool: PostgresPool):
+    with pytest.raises(psycopg2.ProgrammingError):
+        with pool.connection() as connection:
+            connection.rollbacks = 0
+            raise psycopg2.ProgrammingError("relation does not exist")
+
+    assert connection.rollbacks == 1
+    assert connection.commits == 0
+    assert pool.pool.idle == [connection]
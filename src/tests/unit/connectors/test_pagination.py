@@ -0,0 +1,74 @@
+import pytest
+from unittest.mock import MagicMock
+
+from tests.conftest import fake_response, get_test_rest_connector
+from application.connectors.pagination import Pagination, lookup, next_link
+from application.connectors.rest_connector import RestConnector
+
+def paged_connector(pagination) -> RestConnector:
+    config = get_test_rest_connector()
+    config.c_params["base_url"] = "https://simplytransport.ie"
+    config.c_params["headers"] = {}
+    config.c_params["pagination"] = pagination
+    connector = RestConnector(config)
+    connector.session.request = MagicMock()
+    return connector
+
+def test_lookup_and_next_link():
+    assert lookup({"meta": {"next": "abc"}}, "meta.next") == "abc"
+    assert lookup({"meta": None}, "meta.next") is None
+    assert next_link('<https://api/items?page=2>; rel="next", <https://api/items?page=9>; rel="last"') == "https://api/items?page=2"
+    assert next_link('<https://api/items?page=1>; rel="prev"') is None
+    assert next_link(None) is None
+
+def test_unknown_style():
+    with pytest.raises(ValueError, match="Unknown pagination style: pages"):
+        Pagination({"style": "pages"})
+
+def test_cursor_pages(mocker):
+    connector = paged_connector({"style": "cursor", "items": "data", "next_cursor": "meta.next"})
+    connector.session.request.side_effect = [
+        fake_response(200, {"data": [1, 2], "meta": {"next": "c2"}}),
+        fake_response(200, {"data": [3], "meta": {"next": None}}),
+    ]
+
+    assert list(connector.paginate("/stops", {"route": "42"})) == [[1, 2], [3]]
+    params = [call[1]["params"] for call in connector.session.request.call_args_list]
+    assert params == [{"route": "42"}, {"route": "42", "cursor": "c2"}]
+
+def test_offset_pages_stop_on_a_short_page():
+    connector = paged_connector({"style": "offset", "page_size": 2})
+    connector.session.request.side_effect = [fake_response(200, [1, 2]), fake_response(200, [3, 4]), fake_response(200, [5])]
+
+    assert list(connector.iter_items("/stops")) == [1, 2, 3, 4, 5]
+    offsets = [call[1]["params"]["offset"] for call in connector.session.request.call_args_list]
+    assert offsets == [0, 2, 4]
+    assert connector.session.request.call_args[1]["params"]["limit"] == 2
+
+def test_link_pages_follow_relative_links():
+    connector = paged_connector({"style": "link", "items": "results"})
+    connector.session.request.side_effect = [
+        fake_response(200, {"results": ["a"]}, {"Link": '</stops?page=2>; rel="next"'}),
+        fake_response(200, {"results": ["b"]}),
+    ]
+
+    assert list(connector.iter_items("/stops", {"page": 1})) == ["a", "b"]
+    second = connector.session.request.call_args_list[1]
+    assert second[0][1] == "https://simplytransport.ie/stops?page=2"
+    assert second[1]["params"] is None
+
+def test_pages_are_fetched_lazily_and_capped():
+    connector = paged_connector({"style": "cursor", "max_pages": 3})
+    connector.session.request.return_value = fake_response(200, {"next_cursor": "again", "items": [1]})
+
+    pages = connector.paginate("/stops")
+    next(pages)
+    assert connector.session.request.call_count == 1
+    assert len(list(pages)) == 2
+    assert connector.session.request.call_count == 3
+
+def test_no_pagination_configured():
+    connector = RestConnector(get_test_rest_connector())
+
+    with pytest.raises(Exception, match="No pagination set up for connector: hello"):
+        connector.paginate("/stops")
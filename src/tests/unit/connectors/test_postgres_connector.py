@@ -0,0 +1,277 @@
+import json
+import pytest
+from contextlib import contextmanager
+from typing import Tuple
+from unittest.mock import MagicMock
+
+from application.api.models.connector import Connector
+from application.connectors.postgres_connector import PostgresConnector
+from application.connectors.cdc import CDCIngestor, ChangeBatcher
+
+class FakeCursor(object):
+    def __init__(self, rows, executed, name=None):
+        self.rows = list(rows)
+        self.executed = executed
+        self.name = name
+        self.description = [("id",)]
+        self.fetch_sizes = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def execute(self, query, params=None):
+        self.executed.append((self.name, query, params))
+
+    def fetchmany(self, size):
+        self.fetch_sizes.append(size)
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+class FakeConnection(object):
+    def __init__(self, rows):
+        self.rows = rows
+        self.executed = []
+        self.cursors = []
+
+    def cursor(self, name=None, cursor_factory=None):
+        cursor = FakeCursor(self.rows if name or not self.cursors else [], self.executed, name)
+        self.cursors.append(cursor)
+        return cursor
+
+def postgres_connector(rows, **c_params) -> Tuple[PostgresConnector, FakeConnection]:
+    connector = PostgresConnector(Connector(
+        id=2,
+        name="postgres_database",
+        type_c="postgres",
+        c_params={"db_name": "db", "user": "user", "password": "pw", "host": "localhost", "port": 5432, **c_params},
+        e_params={"class": "io.debezium.connector.postgresql.PostgresConnector", "topic": "shop", "include_list": "public.*",
+                  "plugin.name": "pgoutput", "publication.name": "dbz_publication"}
+    ))
+    connection = FakeConnection([{"id": i, "name": f"row {i}"} for i in range(rows)])
+
+    @contextmanager
+    def borrow():
+        yield connection
+
+    connector.pool = MagicMock()
+    connector.pool.connection = borrow
+    return connector, connection
+
+def test_stream_query_uses_a_named_cursor_in_batches():
+    connector, connection = postgres_connector(7, fetch_size=3, statement_timeout=5000)
+
+    batches = list(connector.stream_query("select * from orders"))
+
+    assert [len(batch) for batch in batches] == [3, 3, 1]
+    assert batches[2] == [{"id": 6, "name": "row 6"}]
+    assert connection.executed[0] == (None, "set local statement_timeout = %s", (5000,))
+    named = connection.cursors[-1]
+    assert named.name.startswith("stream_")
+    assert named.executed[-1] == (named.name, "select * from orders", None)
+
+def test_stream_query_stops_at_the_row_cap():
+    connector, connection = postgres_connector(10, fetch_size=4, max_rows=6)
+
+    assert [len(batch) for batch in connector.stream_query("select * from orders")] == [4, 2]
+    assert connection.cursors[-1].fetch_sizes == [4, 2]
+    assert len(list(connector.iter_rows("select * from orders", max_rows=3))) == 3
+
+def test_execute_sql_query_is_capped():
+    connector, connection = postgres_connector(50, max_rows=20, statement_timeout=0)
+
+    rows = connector.execute_sql_query("select * from orders")
+    assert rows is not None and len(rows) == 20
+    # no timeout set when it is turned off
+    assert [query for _, query, _ in connection.executed] == ["select * from orders"]
+
+def schema_connector():
+    connector, _ = postgres_connector(0)
+    connector.execute_sql_query = MagicMock(return_value=[
+        {"table_name": "orders", "column_name": "id", "data_type": "integer"},
+        {"table_name": "orders", "column_name": "total", "data_type": "numeric"},
+        {"table_name": "customers", "column_name": "id", "data_type": "integer"},
+    ])
+    return connector
+
+def change_event(table, row, wrapped=True):
+    payload = {"op": "u", "source": {"table": table}, "before": None, "after": row}
+    return {"schema": {}, "payload": payload} if wrapped else payload
+
+def test_metadata_is_cached_with_columns():
+    connector = schema_connector()
+
+    assert connector.load_metadata() == {"orders": {"id": "integer", "total": "numeric"}, "customers": {"id": "integer"}}
+    connector.load_metadata()
+    assert connector.execute_sql_query.call_count == 1
+
+def test_events_with_known_columns_keep_the_cache():
+    connector = schema_connector()
+    connector.load_metadata()
+
+    connector.check_event_schema(change_event("orders", {"id": 1, "total": 9.5}))
+    connector.check_event_schema(None)
+    connector.check_event_schema({"payload": None})
+    connector.load_metadata()
+
+    assert connector.execute_sql_query.call_count == 1
+
+@pytest.mark.parametrize("event", [
+    change_event("orders", {"id": 1, "total": 9.5, "status": "paid"}),
+    change_event("invoices", {"id": 1}, wrapped=False),
+])
+def test_events_with_new_columns_or_tables_invalidate(event):
+    connector = schema_connector()
+    connector.load_metadata()
+
+    connector.check_event_schema(event)
+    connector.load_metadata()
+
+    assert connector.execute_sql_query.call_count == 2
+
+def test_ddl_queries_invalidate():
+    connector, connection = postgres_connector(0)
+    connector.schema_cache = {"orders": {"id": "integer"}}
+
+    connector.execute_sql_query("select * from orders")
+    assert connector.schema_cache is not None
+
+    connector.execute_sql_query("  ALTER TABLE orders add column status text")
+    assert connector.schema_cache is None
+
+def test_ddl_queries_invalidate_after_the_commit():
+    connector, connection = postgres_connector(0)
+    connector.schema_cache = {"orders": {"id": "integer"}}
+    cached_at_commit = []
+
+    @contextmanager
+    def commit_on_exit():
+        yield connection
+        cached_at_commit.append(connector.schema_cache)
+
+    connector.pool = MagicMock(connection=commit_on_exit)
+    connector.execute_sql_query("alter table orders add column status text")
+
+    assert cached_at_commit == [{"orders": {"id": "integer"}}]
+    assert connector.schema_cache is None
+
+def test_failed_ddl_keeps_the_cache():
+    connector, connection = postgres_connector(0)
+    connector.schema_cache = {"orders": {"id": "integer"}}
+
+    @contextmanager
+    def failing_commit():
+        yield connection
+        raise RuntimeError("commit failed")
+
+    connector.pool = MagicMock(connection=failing_commit)
+    with pytest.raises(RuntimeError):
+        connector.execute_sql_query("alter table orders add column status text")
+
+    assert connector.schema_cache == {"orders": {"id": "integer"}}
+
+class FakeMessage(object):
+    def __init__(self, value, key=None, error=None):
+        self.raw_value = None if value is None else json.dumps(value).encode()
+        self.raw_key = None if key is None else json.dumps(key).encode()
+        self.error_value = error
+
+    def value(self):
+        return self.raw_value
+
+    def key(self):
+        return self.raw_key
+
+    def error(self):
+        return self.error_value
+
+def direct_connector(mocker):
+    connector, _ = postgres_connector(0)
+    connector.ingest_mode = "direct"
+    connector.pool_settings = {}
+    mocker.patch("application.connectors.postgres_connector.PostgresPool")
+    mocker.patch.object(connector, "debezium_connector")
+    mocker.patch.object(connector, "start_monitoring")
+    integration_agent = MagicMock()
+    connector.startup(integration_agent)
+    assert isinstance(connector.cdc, CDCIngestor)
+    assert connector.cdc.dbutils is integration_agent.dbutils
+    apply = connector.cdc.apply = MagicMock(return_value={"upserted": 1, "deleted": 0})
+    return connector, integration_agent, apply
+
+def test_direct_mode_ingests_changes_without_the_agent(mocker):
+    connector, integration_agent, apply = direct_connector(mocker)
+    batcher = ChangeBatcher(max_events=10)
+
+    connector.collect_changes([FakeMessage(change_event("orders", {"id": 4, "total": 1}), {"id": 4})], batcher)
+    result = connector.flush_changes(batcher.drain(), integration_agent)
+
+    assert result == {"upserted": 1, "deleted": 0}
+    assert apply.call_args[0][0][0].id == "orders:4"
+    integration_agent.graph.invoke.assert_not_called()
+
+def test_changes_to_one_row_are_coalesced(mocker):
+    connector, integration_agent, apply = direct_connector(mocker)
+    batcher = ChangeBatcher(max_events=10)
+    messages = [FakeMessage(change_event("orders", {"id": i % 3, "total": i})) for i in range(9)]
+    messages.append(FakeMessage(None))
+    messages.append(FakeMessage({"op": "c"}, error="broker down"))
+
+    connector.collect_changes(messages, batcher)
+    connector.flush_changes(batcher.drain(), integration_agent)
+
+    changes = apply.call_args[0][0]
+    assert [(change.id, change.row["total"]) for change in changes] == [("orders:0", 6), ("orders:1", 7), ("orders:2", 8)]
+    assert apply.call_count == 1
+
+def test_agent_mode_runs_once_per_batch():
+    connector, _ = postgres_connector(0)
+    connector.load_metadata = MagicMock(return_value={})
+    integration_agent = MagicMock()
+    batcher = ChangeBatcher(max_events=10)
+
+    connector.collect_changes([FakeMessage(change_event("orders", {"id": i})) for i in range(5)] + [FakeMessage("heartbeat")], batcher)
+    assert batcher.events == 6
+    connector.flush_changes(batcher.drain(), integration_agent)
+    connector.flush_changes(batcher.drain(), integration_agent)
+
+    assert integration_agent.graph.invoke.call_count == 1
+
+def test_failed_changes_do_not_stop_the_monitor():
+    connector, _ = postgres_connector(0)
+    connector.cdc = MagicMock()
+    connector.cdc.apply.side_effect = Exception("pinecone down")
+    batcher = ChangeBatcher()
+    connector.collect_changes([FakeMessage(change_event("orders", {"id": 4})), FakeMessage({"payload": None, "schema": {}})], batcher)
+
+    assert batcher.events == 1
+    assert connector.flush_changes(batcher.drain()) is None
+    assert connector.flush_changes([]) is None
+
+def test_monitor_consumes_in_batches(mocker):
+    connector, integration_agent, apply = direct_connector(mocker)
+    connector.batch_size = 4
+    consumer = MagicMock()
+    consumer.list_topics.return_value.topics = {"shop.public.orders": None}
+    polls = [
+        [FakeMessage(change_event("orders", {"id": i})) for i in range(3)],
+        [FakeMessage(change_event("orders", {"id": 3}))],
+        [FakeMessage(change_event("orders", {"id": 9}))],
+    ]
+
+    def consume(num_messages, timeout):
+        if len(polls) == 1:
+            connector.stop_monitoring = True
+        return polls.pop(0)
+
+    consumer.consume.side_effect = consume
+    mocker.patch("application.connectors.postgres_connector.Consumer", return_value=consumer)
+
+    connector._monitor_events(integration_agent)
+
+    # a full batch of four, then what was left when the monitor stopped
+    assert [len(call[0][0]) for call in apply.call_args_list] == [4, 1]
+    assert [call[1]["num_messages"] for call in consumer.consume.call_args_list] == [4, 1, 4]
+    assert consumer.consume.call_args_list[0][1]["timeout"] == 1.0
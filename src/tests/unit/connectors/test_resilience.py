@@ -0,0 +1,114 @@
+import pytest
+from unittest.mock import MagicMock
+
+from tests.conftest import FakeClock, fake_response, get_test_rest_connector
+from application.connectors.resilience import RateLimiter, CircuitBreaker
+from application.connectors.rest_connector import RestConnector
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+@pytest.fixture
+def connector(mocker, clock: FakeClock) -> RestConnector:
+    config = get_test_rest_connector()
+    config.c_params["retries"] = 3
+    config.c_params["circuit_breaker"] = {"failure_threshold": 3, "reset_timeout": 30}
+    config.c_params["rate_limit"] = {"rate": 2, "burst": 2, "max_wait": 1}
+    connector = RestConnector(config)
+    assert connector.circuit_breaker is not None and connector.rate_limiter is not None
+    connector.circuit_breaker.clock = connector.rate_limiter.clock = clock
+    connector.rate_limiter.updated = 0.0
+    connector.session.request = MagicMock()
+    mocker.patch("application.connectors.rest_connector.random.uniform", return_value=0)
+    return connector
+
+def test_rate_limiter_queues_then_rejects():
+    clock = FakeClock()
+    limiter = RateLimiter(rate=2, burst=2, max_wait=1, clock=clock)
+
+    assert [limiter.reserve() for _ in range(2)] == [0, 0]
+    assert limiter.reserve() == 0.5
+    assert limiter.reserve() == 1.0
+    with pytest.raises(Exception, match="Rate limit reached"):
+        limiter.reserve()
+
+    clock.now = 10
+    assert limiter.reserve() == 0
+    assert limiter.status()["throttled"] == 2
+    assert limiter.status()["rejected"] == 1
+    assert limiter.status()["tokens"] == 1
+
+def test_circuit_opens_and_recovers_through_half_open():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=clock)
+    breaker.record_failure()
+    breaker.before_request()
+    breaker.record_failure()
+
+    with pytest.raises(Exception, match="Circuit open"):
+        breaker.before_request()
+    assert breaker.status()["retry_in"] == 30
+
+    # one trial once the timeout is up, everyone else still waits
+    clock.now = 30
+    breaker.before_request()
+    with pytest.raises(Exception, match="half open"):
+        breaker.before_request()
+
+    breaker.record_success()
+    breaker.before_request()
+    assert breaker.status()["state"] == "closed"
+    assert breaker.status()["rejected"] == 2
+
+def test_failed_trial_opens_the_circuit_again():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=10, clock=clock)
+    for _ in range(5):
+        breaker.record_failure()
+    clock.now = 10
+    breaker.before_request()
+    breaker.record_failure()
+
+    assert breaker.status()["state"] == "open"
+    assert breaker.status()["retry_in"] == 10
+
+def test_connector_without_settings_has_neither():
+    connector = RestConnector(get_test_rest_connector())
+
+    assert connector.status() == {"active": False, "circuit_breaker": None, "rate_limit": None}
+
+def test_open_circuit_fails_fast(connector: RestConnector, mocker):
+    mocker.patch("application.connectors.rest_connector.time.sleep")
+    connector.session.request.return_value = fake_response(503)
+
+    with pytest.raises(Exception, match="after 3 attempts"):
+        connector.get("/stops")
+    with pytest.raises(Exception, match="Circuit open"):
+        connector.get("/stops")
+
+    # the third failure opened it, nothing was sent after that
+    assert connector.session.request.call_count == 3
+    assert connector.status()["circuit_breaker"]["state"] == "open"
+
+def test_client_errors_do_not_open_the_circuit(connector: RestConnector, clock: FakeClock):
+    connector.session.request.return_value = fake_response(404)
+    for _ in range(4):
+        with pytest.raises(Exception, match="not retrying"):
+            connector.get("/stops")
+        clock.now += 1
+
+    assert connector.status()["circuit_breaker"]["state"] == "closed"
+
+def test_rate_limited_requests_wait_for_a_slot(connector: RestConnector, mocker):
+    sleep = mocker.patch("application.connectors.rest_connector.time.sleep")
+    connector.session.request.return_value = fake_response(200)
+    for _ in range(3):
+        connector.get("/stops")
+
+    connector.get("/stops")
+
+    assert [call[0][0] for call in sleep.call_args_list] == [0.5, 1.0]
+    with pytest.raises(Exception, match="Rate limit reached"):
+        connector.get("/stops")
+    assert connector.session.request.call_count == 4
@@ -0,0 +1,125 @@
+import httpx
+import pytest
+from unittest.mock import MagicMock
+
+from tests.conftest import FakeClock, fake_response, get_test_rest_connector
+from application.connectors.response_cache import ResponseCache
+from application.connectors.rest_connector import RestConnector
+from application.connectors.async_rest_connector import AsyncRestConnector
+
+def cached_config(**c_params):
+    config = get_test_rest_connector()
+    config.c_params["headers"] = {"Content-Type": "application/json"}
+    config.c_params["cache"] = "True"
+    config.c_params.update(c_params)
+    return config
+
+def cache_of(connector: RestConnector) -> ResponseCache:
+    assert connector.cache is not None
+    return connector.cache
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+@pytest.fixture
+def connector(clock: FakeClock) -> RestConnector:
+    connector = RestConnector(cached_config(cache_ttl=60))
+    cache_of(connector).clock = clock
+    connector.session.request = MagicMock()
+    return connector
+
+def test_freshness_from_cache_control():
+    cache = ResponseCache(ttl=60)
+
+    assert cache.freshness({"Cache-Control": "public, max-age=300"}) == 300
+    assert cache.freshness({"Cache-Control": "no-cache"}) == 0
+    assert cache.freshness({"Cache-Control": "private, no-store"}) is None
+    assert cache.freshness({}) == 60
+
+def test_cache_is_opt_in():
+    assert RestConnector(get_test_rest_connector()).cache is None
+    assert RestConnector(get_test_rest_connector()).cache_stats() is None
+
+def test_fresh_responses_are_served_from_the_cache(connector: RestConnector):
+    connector.session.request.return_value = fake_response(200, b'{"stops": [1, 2]}')
+
+    first = connector.get("/stops", {"route": "42"})
+    first["stops"].append(3)
+    second = connector.get("/stops", {"route": "42"})
+
+    # same call once, and the caller changing its copy does not leak into the cache
+    assert second == {"stops": [1, 2]}
+    assert connector.session.request.call_count == 1
+
+    # other params are another entry
+    connector.get("/stops", {"route": "7"})
+    assert connector.session.request.call_count == 2
+
+def test_ttl_expiry_without_validators_refetches(connector: RestConnector, clock: FakeClock):
+    connector.session.request.return_value = fake_response(200, b'{"v": 1}')
+    connector.get("/stops")
+    clock.now = 61
+
+    connector.get("/stops")
+
+    assert connector.session.request.call_count == 2
+    assert "If-None-Match" not in connector.session.request.call_args[1]["headers"]
+
+def test_stale_entries_are_revalidated_with_etag(connector: RestConnector, clock: FakeClock):
+    connector.session.request.return_value = fake_response(200, b'{"v": 1}', {"ETag": '"abc"', "Cache-Control": "max-age=10", "Last-Modified": "Wed, 01 Oct 2025 10:00:00 GMT"})
+    connector.get("/stops")
+    clock.now = 11
+    connector.session.request.return_value = fake_response(304, b"", {"Cache-Control": "max-age=10"})
+
+    assert connector.get("/stops") == {"v": 1}
+    headers = connector.session.request.call_args[1]["headers"]
+    assert headers["If-None-Match"] == '"abc"'
+    assert headers["If-Modified-Since"] == "Wed, 01 Oct 2025 10:00:00 GMT"
+
+    # the 304 made it fresh again
+    connector.get("/stops")
+    assert connector.session.request.call_count == 2
+    assert cache_of(connector).stats()["revalidated"] == 1
+    assert cache_of(connector).stats()["hits"] == 1
+    assert cache_of(connector).stats()["hit_rate"] == pytest.approx(2 / 3)
+
+def test_no_store_and_non_get_are_not_cached(connector: RestConnector):
+    connector.session.request.return_value = fake_response(200, b'{"v": 1}', {"Cache-Control": "no-store"})
+    connector.get("/stops")
+    connector.get("/stops")
+    connector.session.request.return_value = fake_response(200, b'{"v": 1}')
+    connector.post("/stops", {"v": 1})
+    connector.post("/stops", {"v": 1})
+
+    assert connector.session.request.call_count == 4
+    assert cache_of(connector).stats()["size"] == 0
+
+def test_lru_bound(connector: RestConnector):
+    connector.cache = ResponseCache(max_size=2, ttl=60, clock=FakeClock())
+    connector.session.request.return_value = fake_response(200, b'{"v": 1}')
+    for endpoint in ["/a", "/b", "/c", "/a"]:
+        connector.get(endpoint)
+
+    assert connector.session.request.call_count == 4
+    assert cache_of(connector).stats()["evictions"] == 2
+
+def test_async_connector_revalidates(mocker):
+    connector = AsyncRestConnector(cached_config(cache_ttl=0, base_url="https://simplytransport.ie"))
+    calls = []
+
+    def handler(request):
+        calls.append(request.headers.get("If-None-Match"))
+        if request.headers.get("If-None-Match") == '"abc"':
+            return httpx.Response(304)
+        return httpx.Response(200, json={"v": 1}, headers={"ETag": '"abc"'})
+
+    try:
+        connector.ensure_loop()
+        connector.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+        assert connector.get("/stops") == {"v": 1}
+        assert connector.get("/stops") == {"v": 1}
+        assert calls == [None, '"abc"']
+    finally:
+        connector.shutdown()
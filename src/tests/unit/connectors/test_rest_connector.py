@@ -0,0 +1,82 @@
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+from unittest.mock import MagicMock
+
+from tests.conftest import fake_response, get_test_rest_connector
+from application.connectors.rest_connector import RestConnector
+
+@pytest.fixture
+def connector(mocker) -> RestConnector:
+    config = get_test_rest_connector()
+    config.c_params["retries"] = 4
+    config.c_params["pool_size"] = 3
+    connector = RestConnector(config)
+    connector.session.request = MagicMock()
+    mocker.patch("application.connectors.rest_connector.random.uniform", side_effect=lambda low, high: high)
+    return connector
+
+def test_session_is_pooled(connector: RestConnector):
+    adapter = connector.session.get_adapter("https://simplytransport.ie")
+
+    assert isinstance(adapter, HTTPAdapter)
+    assert adapter.poolmanager.connection_pool_kw["maxsize"] == 3
+    assert connector.session.get_adapter("http://simplytransport.ie") is adapter
+
+def test_get_reuses_the_session(connector: RestConnector, mocker):
+    connector.session.request.return_value = fake_response(200, b'{"stops": 3}')
+
+    assert connector.get("/stops", {"route": "42"}) == {"stops": 3}
+    assert connector.get("/stops") == {"stops": 3}
+    assert connector.session.request.call_count == 2
+    assert connector.session.request.call_args_list[0][1]["params"] == {"route": "42"}
+
+def test_retries_back_off_exponentially(connector: RestConnector, mocker):
+    sleep = mocker.patch("application.connectors.rest_connector.time.sleep")
+    connector.session.request.side_effect = [
+        requests.ConnectionError("reset"),
+        fake_response(503),
+        fake_response(500),
+        fake_response(200, b'{"ok": true}'),
+    ]
+
+    assert connector.get("/stops") == {"ok": True}
+    assert [call[0][0] for call in sleep.call_args_list] == [0.5, 1.0, 2.0]
+
+def test_backoff_is_capped_and_honours_retry_after(connector: RestConnector):
+    connector.backoff_max = 5
+    rate_limited = requests.HTTPError(response=fake_response(429, headers={"Retry-After": "3"}))
+
+    assert connector.backoff(10, requests.ConnectionError()) == 5
+    assert connector.backoff(0, rate_limited) == 3
+
+def test_client_errors_are_not_retried(connector: RestConnector, mocker):
+    sleep = mocker.patch("application.connectors.rest_connector.time.sleep")
+    connector.session.request.return_value = fake_response(404)
+
+    with pytest.raises(Exception, match="Request failed, not retrying"):
+        connector.get("/missing")
+    assert connector.session.request.call_count == 1
+    sleep.assert_not_called()
+
+def test_gives_up_after_the_last_retry(connector: RestConnector, mocker):
+    mocker.patch("application.connectors.rest_connector.time.sleep")
+    connector.session.request.side_effect = requests.Timeout("slow")
+
+    with pytest.raises(Exception, match="Request failed after 4 attempts"):
+        connector.get("/stops")
+    assert connector.session.request.call_count == 4
+
+def test_fetch_many_keeps_order_and_errors(connector: RestConnector, mocker):
+    mocker.patch("application.connectors.rest_connector.time.sleep")
+    def request(method, url, **kwargs):
+        if url.endswith("/missing"):
+            return fake_response(404)
+        return fake_response(200, ('{"url": "%s"}' % url).encode())
+    connector.session.request.side_effect = request
+
+    results = connector.fetch_many([("/a", None), ("/missing", None), ("/b", {"x": 1})])
+
+    assert results[0] == {"url": "hello/a"}
+    assert "not retrying" in results[1]["error"]
+    assert results[2] == {"url": "hello/b"}
@@ -0,0 +1,86 @@
+import json
+import pytest
+from unittest.mock import MagicMock
+
+from application.dbutils import DbUtils
+from application.seeds.checkpoint import SeedCheckpoint
+from application.seeds.csv_parser import CSVParser
+
+def write_csv(path, first:str="brand0") -> str:
+    lines = ["brand,price", f"{first},0"] + [f"brand{i},{i * 100}" for i in range(1, 9)]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+def embedded_texts(embed:MagicMock) -> list:
+    return [text for call in embed.call_args_list for text in call[1]["inputs"]]
+
+def test_batches_move_the_checkpoint_in_file_order(tmp_path):
+    checkpoint = SeedCheckpoint(str(tmp_path), "index", "ns", "file.csv")
+    rows = [{"id": str(i), "text": f"row {i}"} for i in range(6)]
+    for sequence in range(3):
+        checkpoint.add(sequence, rows[sequence * 2:sequence * 2 + 2])
+
+    checkpoint.finish(1)
+    assert checkpoint.load() is None
+
+    checkpoint.finish(0)
+    saved = checkpoint.load()
+    assert saved is not None and saved["rows"] == 4
+
+    checkpoint.finish(2)
+    saved = checkpoint.load()
+    assert saved is not None and saved["rows"] == 6
+    assert saved["namespace"] == "ns"
+
+def test_resume_after_a_failed_batch(local_dbutils: DbUtils, tmp_path, fake_embed: MagicMock):
+    csv_file = write_csv(tmp_path / "laptops.csv")
+    embed = fake_embed.side_effect
+    calls = {"count": 0}
+    def failing_embed(model, inputs, parameters):
+        calls["count"] += 1
+        if calls["count"] == 3:
+            raise RuntimeError("inference down")
+        return embed(model, inputs, parameters)
+    fake_embed.side_effect = failing_embed
+
+    parser = CSVParser(csv_file, "test-index", "laptops", local_dbutils, concurrency=1, checkpoint_dir=str(tmp_path / "checkpoints"))
+    with pytest.raises(RuntimeError):
+        parser.run()
+
+    # batches 0 and 1 landed, batch 2 did not
+    [checkpoint_file] = (tmp_path / "checkpoints").iterdir()
+    assert json.loads(checkpoint_file.read_text())["rows"] == 4
+
+    fake_embed.side_effect = embed
+    fake_embed.reset_mock()
+    resumed = CSVParser(csv_file, "test-index", "laptops", local_dbutils, concurrency=1,
+                        checkpoint_dir=str(tmp_path / "checkpoints"), resume=True)
+    resumed.run()
+
+    assert "brand0, 0" not in embedded_texts(fake_embed)
+    assert "brand4, 400" in embedded_texts(fake_embed)
+    assert json.loads(checkpoint_file.read_text())["rows"] == 9
+    assert local_dbutils.get_index("test-index").describe_index_stats()["namespaces"]["laptops"]["vector_count"] == 9
+
+def test_resume_starts_over_when_the_file_changed(local_dbutils: DbUtils, tmp_path, fake_embed: MagicMock):
+    checkpoint_dir = str(tmp_path / "checkpoints")
+    csv_file = write_csv(tmp_path / "laptops.csv")
+    CSVParser(csv_file, "test-index", "laptops", local_dbutils, checkpoint_dir=checkpoint_dir).run()
+
+    write_csv(tmp_path / "laptops.csv", first="renamed")
+    fake_embed.reset_mock()
+    CSVParser(csv_file, "test-index", "laptops", local_dbutils, checkpoint_dir=checkpoint_dir, resume=True).run()
+
+    # the whole file is read again, only the changed row needs a new embedding
+    assert embedded_texts(fake_embed) == ["renamed, 0"]
+
+def test_resume_of_a_finished_seed_does_nothing(local_dbutils: DbUtils, tmp_path, fake_embed: MagicMock):
+    checkpoint_dir = str(tmp_path / "checkpoints")
+    csv_file = write_csv(tmp_path / "laptops.csv")
+    CSVParser(csv_file, "test-index", "laptops", local_dbutils, checkpoint_dir=checkpoint_dir).run()
+    fake_embed.reset_mock()
+    local_dbutils.vector_store.get_index("test-index").fetch = MagicMock()
+
+    assert CSVParser(csv_file, "test-index", "laptops", local_dbutils, checkpoint_dir=checkpoint_dir, resume=True).run() == 0
+    fake_embed.assert_not_called()
+    local_dbutils.vector_store.get_index("test-index").fetch.assert_not_called()
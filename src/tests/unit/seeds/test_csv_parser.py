@@ -0,0 +1,70 @@
+import time
+import threading
+import pytest
+from unittest.mock import MagicMock
+
+from application.dbutils import DbUtils
+from application.seeds.csv_parser import CSVParser
+
+@pytest.fixture
+def csv_file(tmp_path) -> str:
+    path = tmp_path / "laptops.csv"
+    lines = ["brand,price"] + [f"brand{i},{i * 100}" for i in range(9)]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+def test_run_seeds_every_row(local_dbutils: DbUtils, csv_file: str, fake_embed: MagicMock):
+    parser = CSVParser(csv_file, "test-index", "laptops", local_dbutils, concurrency=3)
+
+    assert parser.run() == 9
+    assert parser.dimensions == 3
+    # 9 rows in batches of 2
+    assert fake_embed.call_count == 5
+
+    stored = local_dbutils.get_index("test-index").fetch(["0", "8"], namespace="laptops").vectors
+    assert stored["8"].metadata["text"] == "brand8, 800"
+
+def test_run_again_skips_unchanged_rows(local_dbutils: DbUtils, csv_file: str, fake_embed: MagicMock):
+    CSVParser(csv_file, "test-index", "laptops", local_dbutils).run()
+    fake_embed.reset_mock()
+
+    assert CSVParser(csv_file, "test-index", "laptops", local_dbutils).run() == 0
+    fake_embed.assert_not_called()
+
+def test_rows_are_read_lazily_with_backpressure(local_dbutils: DbUtils, csv_file: str):
+    parser = CSVParser(csv_file, "test-index", "laptops", local_dbutils, concurrency=2, max_pending=2)
+    lock = threading.Lock()
+    state = {"running": 0, "most_running": 0, "read": 0, "most_ahead": 0, "done": 0}
+
+    batches = parser.batches
+    def counting_batches(rows):
+        for batch in batches(rows):
+            with lock:
+                state["read"] += 1
+                state["most_ahead"] = max(state["most_ahead"], state["read"] - state["done"])
+            yield batch
+
+    def slow_batch(batch):
+        with lock:
+            state["running"] += 1
+            state["most_running"] = max(state["most_running"], state["running"])
+        time.sleep(0.02)
+        with lock:
+            state["running"] -= 1
+            state["done"] += 1
+        return len(batch)
+
+    parser.batches = counting_batches
+    parser.process_batch = slow_batch
+
+    assert parser.run() == 9
+    assert state["most_running"] == 2
+    # never more than max_pending batches in flight plus the one being handed over
+    assert state["most_ahead"] <= 3
+
+def test_failed_batch_stops_the_seed(local_dbutils: DbUtils, csv_file: str, fake_embed: MagicMock):
+    fake_embed.side_effect = RuntimeError("inference down")
+    parser = CSVParser(csv_file, "test-index", "laptops", local_dbutils)
+
+    with pytest.raises(RuntimeError, match="inference down"):
+        parser.run()
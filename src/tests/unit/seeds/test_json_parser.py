@@ -0,0 +1,48 @@
+import io
+import json
+import pytest
+
+from application.dbutils import DbUtils
+from application.seeds.json_parser import JSONParser, read_json_values
+
+RECORDS = [
+    {"route": "42", "stops": ["Main St", "Station"], "fare": 2.5},
+    {"route": "7", "stops": [], "fare": 1234567},
+    {"route": "9 éxpress", "stops": None, "fare": 3},
+]
+
+@pytest.mark.parametrize("text", [
+    json.dumps(RECORDS),
+    json.dumps(RECORDS, indent=4),
+    "\n".join(json.dumps(record) for record in RECORDS) + "\n",
+])
+@pytest.mark.parametrize("chunk_size", [1, 7, 65536])
+def test_read_json_values_across_chunk_boundaries(text: str, chunk_size: int):
+    assert list(read_json_values(io.StringIO(text), chunk_size)) == RECORDS
+
+def test_read_json_values_numbers_at_chunk_end():
+    assert list(read_json_values(io.StringIO("12345\n678"), 3)) == [12345, 678]
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 4, 5])
+def test_read_json_values_numbers_cut_by_small_chunks(chunk_size: int):
+    assert list(read_json_values(io.StringIO("[-2.5, 3]"), chunk_size)) == [-2.5, 3]
+    assert list(read_json_values(io.StringIO("[1e-3,true, null]"), chunk_size)) == [0.001, True, None]
+
+def test_read_json_values_empty_file():
+    assert list(read_json_values(io.StringIO(""))) == []
+    assert list(read_json_values(io.StringIO("[ ]"))) == []
+
+def test_read_json_values_invalid():
+    with pytest.raises(json.JSONDecodeError):
+        list(read_json_values(io.StringIO('[{"route": 1}, {"route": '), 4))
+    with pytest.raises(json.JSONDecodeError):
+        list(read_json_values(io.StringIO("[12x, 3]"), 4))
+
+def test_json_parser_seeds_records(local_dbutils: DbUtils, tmp_path):
+    path = tmp_path / "bus_data.ndjson"
+    path.write_text("\n".join(json.dumps(record) for record in RECORDS), encoding="utf-8")
+
+    assert JSONParser(str(path), "test-index", "buses", local_dbutils).run() == 3
+
+    stored = local_dbutils.get_index("test-index").fetch(["0"], namespace="buses").vectors["0"]
+    assert stored.metadata["text"] == '42, ["Main St", "Station"], 2.5'
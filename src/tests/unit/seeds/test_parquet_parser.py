@@ -0,0 +1,69 @@
+import pytest
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+from unittest.mock import MagicMock
+
+from application.dbutils import DbUtils
+from application.seeds.parquet_parser import ParquetParser
+
+TABLE = pa.table({
+    "brand": ["Acer", "Dell", None, "HP", "Asus"],
+    "price": [499, 899, 650, None, 1200],
+    "tags": [["gaming"], [], None, ["office", "cheap"], ["gaming"]],
+})
+
+def test_rows_from_parquet(local_dbutils: DbUtils, tmp_path):
+    path = str(tmp_path / "laptops.parquet")
+    pq.write_table(TABLE, path, row_group_size=3)
+    parser = ParquetParser(path, "test-index", "laptops", local_dbutils)
+
+    rows = list(parser.rows())
+
+    assert [row["id"] for row in rows] == ["0", "1", "2", "3", "4"]
+    assert rows[0]["text"] == 'Acer, 499, ["gaming"]'
+    # nulls become empty fields
+    assert rows[2]["text"] == ", 650, "
+    assert rows[3]["text"] == 'HP, , ["office", "cheap"]'
+
+def test_record_batches_line_up_with_embedding_batches(local_dbutils: DbUtils, tmp_path, fake_embed: MagicMock):
+    path = str(tmp_path / "laptops.parquet")
+    pq.write_table(TABLE, path)
+    parser = ParquetParser(path, "test-index", "laptops", local_dbutils)
+
+    assert [batch.num_rows for batch in parser.load_data()] == [2, 2, 1]
+    assert parser.run() == 5
+    assert fake_embed.call_count == 3
+
+@pytest.mark.parametrize("kind", [pa.binary(), pa.large_binary()])
+def test_binary_columns_that_are_not_utf8(local_dbutils: DbUtils, tmp_path, kind):
+    path = str(tmp_path / "blobs.parquet")
+    pq.write_table(pa.table({"name": ["a", "b"], "blob": pa.array([b"\xff\x00", b"plain"], kind)}), path)
+    parser = ParquetParser(path, "test-index", "blobs", local_dbutils)
+
+    assert [row["text"] for row in parser.rows()] == ["a, /wA=", "b, plain"]
+
+@pytest.mark.parametrize("suffix", [".arrow", ".feather", ".ipc"])
+def test_rows_from_arrow_files(local_dbutils: DbUtils, tmp_path, suffix: str):
+    path = str(tmp_path / f"laptops{suffix}")
+    feather.write_feather(TABLE, path, chunksize=4)
+    parser = ParquetParser(path, "test-index", "laptops", local_dbutils)
+
+    assert [batch.num_rows for batch in parser.load_data()] == [2, 2, 1]
+    assert [row["text"] for row in parser.rows()][4] == 'Asus, 1200, ["gaming"]'
+
+def test_file_format_overrides_the_extension(local_dbutils: DbUtils, tmp_path):
+    path = str(tmp_path / "laptops.bin")
+    feather.write_feather(TABLE, path)
+
+    assert len(list(ParquetParser(path, "test-index", "laptops", local_dbutils, file_format="arrow").rows())) == 5
+    with pytest.raises(pa.ArrowInvalid):
+        list(ParquetParser(path, "test-index", "laptops", local_dbutils).rows())
+
+def test_rows_from_an_arrow_stream(local_dbutils: DbUtils, tmp_path):
+    path = str(tmp_path / "laptops.arrow")
+    with pa.OSFile(path, "wb") as sink, pa.ipc.new_stream(sink, TABLE.schema) as writer:
+        writer.write_table(TABLE)
+    parser = ParquetParser(path, "test-index", "laptops", local_dbutils)
+
+    assert len(list(parser.rows())) == 5
@@ -1,6 +1,8 @@
 import pytest
 from application.dbutils import DbUtils
 from application.environment import Environment
+from application.vector_stores.pinecone_vector_store import PineconeVectorStore
+from application.vector_stores.local_vector_store import LocalVectorStore
 from pinecone import QueryResponse, NotFoundException, ServerlessSpec
 
 @pytest.fixture
@@ -22,6 +24,7 @@ def mock_pinecone_client(mock_env, mocker):
         embedding_model="fake-model"
     )
     db_utils.client = mock_client
+    db_utils.vector_store = PineconeVectorStore(mock_client)
     return db_utils, mock_client
 
 def test_get_client(mock_env, mock_pinecone_client):
@@ -73,6 +76,40 @@ def test_create_embedding(mock_pinecone_client, mocker):
     assert embeddings[0]["values"] == [0.1, 0.2, 0.3]
     assert embeddings[1]["values"] == [0.4, 0.5, 0.6]
 
+def test_create_query_embedding_is_cached(mock_pinecone_client, mocker):
+    db_utils, mock_client = mock_pinecone_client
+
+    mock_embedding = mocker.MagicMock()
+    mock_embedding.data[0].values = [0.1, 0.2, 0.3]
+    mock_client.inference.embed.return_value = mock_embedding
+
+    first = db_utils.create_query_embedding("what laptops  are cheap")
+    # same query with different whitespace hits the cache
+    second = db_utils.create_query_embedding(" what laptops are cheap ")
+
+    assert first == [0.1, 0.2, 0.3]
+    assert second == [0.1, 0.2, 0.3]
+    mock_client.inference.embed.assert_called_once_with(
+        model="fake-model",
+        inputs=["what laptops are cheap"],
+        parameters={"input_type": "query"}
+    )
+    assert db_utils.query_cache.stats()["hits"] == 1
+    assert db_utils.query_cache.stats()["misses"] == 1
+
+def test_create_query_embedding_cache_is_per_model(mock_pinecone_client, mocker):
+    db_utils, mock_client = mock_pinecone_client
+
+    mock_embedding = mocker.MagicMock()
+    mock_embedding.data[0].values = [0.1, 0.2, 0.3]
+    mock_client.inference.embed.return_value = mock_embedding
+
+    db_utils.create_query_embedding("query")
+    db_utils.embedding_model = "other-model"
+    db_utils.create_query_embedding("query")
+
+    assert mock_client.inference.embed.call_count == 2
+
 def test_upsert_embeddings(mock_pinecone_client, mocker):
     db_utils, mock_client = mock_pinecone_client
 
@@ -88,6 +125,51 @@ def test_upsert_embeddings(mock_pinecone_client, mocker):
     mock_client.Index.return_value.upsert.assert_called()
 
 
+def fake_embed(model, inputs, parameters):
+    return [{"values": [float(len(text)), 1.0, 0.0]} for text in inputs]
+
+def test_embed_and_upsert_skips_unchanged_rows(mock_pinecone_client):
+    db_utils, mock_client = mock_pinecone_client
+    db_utils.vector_store = LocalVectorStore()
+    db_utils.create_index("test-index", 3)
+    mock_client.inference.embed.side_effect = fake_embed
+
+    rows = [{"id": "1", "text": "a"}, {"id": "2", "text": "bb"}, {"id": "3", "text": "ccc"}]
+    assert db_utils.embed_and_upsert("test-index", "ns", rows) == 3
+    assert mock_client.inference.embed.call_count == 2
+
+    mock_client.inference.embed.reset_mock()
+    assert db_utils.embed_and_upsert("test-index", "ns", rows) == 0
+    mock_client.inference.embed.assert_not_called()
+
+    # only the changed row and the new one get embedded
+    rows[1] = {"id": "2", "text": "changed"}
+    rows.append({"id": "4", "text": "dddd"})
+    assert db_utils.embed_and_upsert("test-index", "ns", rows) == 2
+    assert mock_client.inference.embed.call_args[1]["inputs"] == ["changed", "dddd"]
+
+    stored = db_utils.get_index("test-index").fetch(["2"], namespace="ns").vectors["2"]
+    assert stored.metadata == {"text": "changed", "content_hash": db_utils.content_hash("changed")}
+
+def test_content_hash_depends_on_the_model(mock_pinecone_client):
+    db_utils, _ = mock_pinecone_client
+    first = db_utils.content_hash("text")
+    db_utils.embedding_model = "other-model"
+
+    assert db_utils.content_hash("text") != first
+
+def test_upsert_embeddings_stamps_content_hash(mock_pinecone_client):
+    db_utils, mock_client = mock_pinecone_client
+    mock_client.Index.return_value.upsert.return_value = {"upserted_count": 1}
+
+    vector = {"id": "1", "values": [0.1], "metadata": {"text": "hello"}}
+    db_utils.upsert_embeddings("test-index", "namespace", [vector])
+
+    upserted = mock_client.Index.return_value.upsert.call_args[1]["vectors"][0]
+    assert upserted["metadata"]["content_hash"] == db_utils.content_hash("hello")
+    # the caller's dict is left alone
+    assert "content_hash" not in vector["metadata"]
+
 def test_search(mock_pinecone_client, mocker):
     '''A test to see if we can search for embeddings'''
     db_utils, mock_client = mock_pinecone_client
@@ -102,6 +184,54 @@ def test_search(mock_pinecone_client, mocker):
     # Check that the search returned the expected result
     assert len(result) != 0
 
+def test_search_many_merges_by_score(mock_pinecone_client, mocker):
+    db_utils, mock_client = mock_pinecone_client
+
+    responses = {
+        "ns1": [{"id": "a", "score": 0.9, "metadata": {"text": "a"}}, {"id": "b", "score": 0.3, "metadata": {"text": "b"}}],
+        "ns2": [{"id": "c", "score": 0.7, "metadata": {"text": "c"}}],
+        "ns3": []
+    }
+
+    def query(namespace, **kwargs):
+        response = mocker.MagicMock(spec=QueryResponse)
+        response.matches = responses[namespace]
+        return response
+
+    mock_client.Index.return_value.query.side_effect = query
+
+    result = db_utils.search_many("test-index", ["ns1", "ns2", "ns3"], [0.1, 0.2, 0.3], result_amount=2)
+
+    assert [match["id"] for match in result] == ["a", "c"]
+    assert [match["namespace"] for match in result] == ["ns1", "ns2"]
+    assert result[0]["metadata"] == {"text": "a"}
+    assert mock_client.Index.return_value.query.call_count == 3
+
+def test_search_leaves_out_the_content_hash(mock_pinecone_client):
+    db_utils, mock_client = mock_pinecone_client
+    db_utils.vector_store = LocalVectorStore()
+    db_utils.create_index("test-index", 3)
+    mock_client.inference.embed.side_effect = fake_embed
+
+    rows = [{"id": "1", "text": "a"}, {"id": "2", "text": "bb"}]
+    db_utils.embed_and_upsert("test-index", "ns", rows)
+
+    single = db_utils.search("test-index", "ns", [1.0, 1.0, 0.0], result_amount=2)
+    many = db_utils.search_many("test-index", ["ns"], [1.0, 1.0, 0.0], result_amount=2)
+
+    assert sorted(match["metadata"]["text"] for match in single) == ["a", "bb"]
+    assert all("content_hash" not in match["metadata"] for match in single)
+    assert sorted(match["metadata"]["text"] for match in many) == ["a", "bb"]
+    assert all("content_hash" not in match["metadata"] for match in many)
+    # the stored hashes are untouched, so nothing gets embedded again
+    assert db_utils.embed_and_upsert("test-index", "ns", rows) == 0
+
+def test_search_many_no_namespaces(mock_pinecone_client):
+    db_utils, mock_client = mock_pinecone_client
+
+    assert db_utils.search_many("test-index", [], [0.1], result_amount=5) == []
+    mock_client.Index.return_value.query.assert_not_called()
+
 def test_index_exists(mock_pinecone_client, mocker):
     db_utils, mock_client = mock_pinecone_client
 
@@ -167,4 +297,11 @@ def test_get_namespaces(mock_pinecone_client, mocker):
     namespaces = db_utils.get_namespaces("test-index")
 
     assert namespaces == []
-    mock_client.Index.assert_called_with("test-index")
\ No newline at end of file
+    mock_client.Index.assert_called_with("test-index")
+def test_delete_vectors_in_chunks(mock_pinecone_client):
+    db_utils, mock_client = mock_pinecone_client
+
+    db_utils.delete_vectors("test-index", "ns", ["1", "2", "3"])
+
+    deletes = mock_client.Index.return_value.delete.call_args_list
+    assert [call[1] for call in deletes] == [{"ids": ["1", "2"], "namespace": "ns"}, {"ids": ["3"], "namespace": "ns"}]
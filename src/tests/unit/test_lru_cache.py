@@ -0,0 +1,79 @@
+import threading
+from application.lru_cache import LRUCache
+from tests.conftest import FakeClock
+
+def test_get_and_put():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("b", "default") == "default"
+
+def test_evicts_least_recently_used():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    # touching a makes b the oldest
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = LRUCache(2, ttl=10, clock=clock)
+    cache.put("a", 1)
+
+    clock.now = 9.9
+    assert cache.get("a") == 1
+
+    clock.now = 10
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+def test_stats_count_hits_and_misses():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.get("a")
+    cache.get("a")
+    cache.get("b")
+
+    stats = cache.stats()
+
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+    assert stats["size"] == 1
+    assert stats["hit_rate"] == 2 / 3
+
+def test_pop_and_clear():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+
+    assert cache.pop("a") == 1
+    assert cache.pop("a") is None
+
+    cache.clear()
+    assert len(cache) == 0
+
+def test_concurrent_puts_stay_bounded():
+    cache = LRUCache(50)
+
+    def worker(offset: int):
+        for i in range(500):
+            cache.put(offset * 1000 + i, i)
+            cache.get(offset * 1000 + i)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = cache.stats()
+    assert len(cache) == 50
+    assert stats["hits"] + stats["misses"] == 8 * 500
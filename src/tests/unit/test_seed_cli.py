@@ -0,0 +1,65 @@
+import pytest
+
+import seed
+from application.dbutils import DbUtils
+from application.seeds.csv_parser import CSVParser
+from application.seeds.json_parser import JSONParser
+from application.seeds.parquet_parser import ParquetParser
+
+def test_seed_format():
+    assert seed.seed_format("laptops.csv", None) == "csv"
+    assert seed.seed_format("buses.NDJSON", None) == "ndjson"
+    assert seed.seed_format("export.txt", "csv") == "csv"
+    assert seed.PARSERS[seed.seed_format("export.ipc", None)] is ParquetParser
+
+    with pytest.raises(ValueError, match="No seed parser for 'txt' files"):
+        seed.seed_format("export.txt", None)
+
+@pytest.mark.parametrize("file_name, parser_type", [
+    ("laptops.csv", CSVParser),
+    ("buses.ndjson", JSONParser),
+    ("export.parquet", ParquetParser),
+])
+def test_main_picks_the_parser_from_the_extension(local_dbutils: DbUtils, mocker, tmp_path, file_name, parser_type):
+    mocker.patch.object(seed, "DbUtils", return_value=local_dbutils)
+    run_seed = mocker.patch.object(seed, "run_seed", return_value={
+        "seconds": 1, "rows": 0, "embeddings": 0, "upserts": 0,
+        "rows_per_second": 0, "embeddings_per_second": 0, "upserts_per_second": 0
+    })
+
+    seed.main([str(tmp_path / file_name), "--index", "test-index", "--namespace", "ns"])
+
+    assert type(run_seed.call_args[0][0]) is parser_type
+
+def test_main_passes_the_format_to_the_parser(local_dbutils: DbUtils, mocker, tmp_path):
+    mocker.patch.object(seed, "DbUtils", return_value=local_dbutils)
+    run_seed = mocker.patch.object(seed, "run_seed", return_value={
+        "seconds": 1, "rows": 0, "embeddings": 0, "upserts": 0,
+        "rows_per_second": 0, "embeddings_per_second": 0, "upserts_per_second": 0
+    })
+
+    seed.main([str(tmp_path / "export.bin"), "--index", "test-index", "--namespace", "ns", "--format", "arrow"])
+
+    parser = run_seed.call_args[0][0]
+    assert isinstance(parser, ParquetParser)
+    assert parser.file_format == "arrow"
+
+def test_run_seed_reports_throughput(local_dbutils: DbUtils, tmp_path):
+    path = tmp_path / "laptops.csv"
+    path.write_text("brand,price\nAcer,499\nDell,899\nHP,650\n", encoding="utf-8")
+
+    stats = seed.run_seed(CSVParser(str(path), "test-index", "laptops", local_dbutils))
+    assert (stats["rows"], stats["embeddings"], stats["upserts"]) == (3, 3, 3)
+    assert stats["rows_per_second"] > 0
+
+    # a second run reads every row but embeds none of them
+    again = seed.run_seed(CSVParser(str(path), "test-index", "laptops", local_dbutils))
+    assert (again["rows"], again["embeddings"], again["upserts"]) == (3, 0, 0)
+
+    report = seed.format_report(again, None)
+    assert "skipped:             3" in report
+    assert "peak rss:   n/a" in report
+
+def test_peak_rss_mb():
+    peak = seed.peak_rss_mb()
+    assert peak is None or peak > 0
@@ -6,6 +6,11 @@ def test_settings_loading():
 
     assert env.PINECONE_API_KEY is not None
     assert env.DEBUG_MODE is not None
+    assert env.FIXED_PIPELINE is not None
+    assert env.VECTOR_STORE is not None
+    assert env.VECTOR_STORE_PATH is not None
+    assert env.VECTOR_STORE_ANN is not None
+    assert env.VECTOR_STORE_NPROBE is not None
     assert env.SQL_LITE_DB_STRING is not None
     assert env.DEEPSEEK_API_KEY is not None
     assert env.LOCAL_HOST_BACKEND_IP is not None
@@ -0,0 +1,107 @@
+import numpy as np
+from typing import List
+
+from application.vector_stores.ivf_index import IVFIndex, IVFSettings
+from application.vector_stores.local_vector_store import LocalNamespace, LocalVectorStore, Record
+from application.vector_stores.segment_namespace import SegmentNamespace
+
+def clustered_vectors(count:int, dimension:int=16, clusters:int=20, seed:int=1) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dimension))
+    return (centers[rng.integers(0, clusters, count)] + rng.normal(scale=0.1, size=(count, dimension))).astype(np.float32)
+
+def records(vectors:np.ndarray, offset:int=0) -> List[Record]:
+    return [(str(offset + i), vector.tolist(), {"i": offset + i}) for i, vector in enumerate(vectors)]
+
+def ids(matches):
+    return [match.id for match in matches]
+
+def ivf_of(namespace) -> IVFIndex:
+    assert namespace.ivf is not None
+    return namespace.ivf
+
+def test_training_and_probing():
+    vectors = clustered_vectors(2000)
+    index = IVFIndex(IVFSettings(nlist=20, min_vectors=100))
+
+    assert index.needs_training(2000)
+    index.train(vectors, 2000)
+
+    assert index.trained and index.active(2000)
+    assert index.trained_centroids().shape == (20, 16)
+    assert not index.needs_training(4000)
+    assert index.needs_training(4001)
+    # a vector always lands in the list its closest centroid belongs to
+    assert index.probe(vectors[0], nprobe=1)[0] == index.assign(vectors[:1])[0]
+
+    mask = index.probe_mask(vectors[0], nprobe=3)
+    assert mask.sum() == 3
+    assert not mask[-1]
+
+def test_small_namespaces_stay_exact():
+    namespace = LocalNamespace(16, ann=IVFSettings(min_vectors=1000))
+    namespace.upsert(records(clustered_vectors(500)))
+    namespace.query(clustered_vectors(1)[0].tolist(), 5, False, False)
+
+    assert not ivf_of(namespace).trained
+
+def test_local_namespace_ann_matches_exact_top_results():
+    vectors = clustered_vectors(3000)
+    namespace = LocalNamespace(16, ann=IVFSettings(nlist=20, nprobe=4, min_vectors=1000))
+    namespace.upsert(records(vectors))
+
+    query = vectors[7].tolist()
+    approximate = namespace.query(query, 10, False, True)
+    exact = namespace.query(query, 10, False, True, exact=True)
+
+    assert ivf_of(namespace).trained
+    assert ids(approximate)[0] == "7"
+    assert len(set(ids(approximate)) & set(ids(exact))) >= 9
+    assert approximate[0].metadata == {"i": 7}
+
+def test_local_namespace_keeps_lists_through_upsert_and_delete():
+    vectors = clustered_vectors(2000)
+    namespace = LocalNamespace(16, ann=IVFSettings(nlist=20, nprobe=2, min_vectors=1000))
+    namespace.upsert(records(vectors))
+    namespace.query(vectors[0].tolist(), 1, False, False)
+
+    # new rows join a list straight away and moved rows keep theirs
+    namespace.upsert(records(clustered_vectors(10, seed=2), offset=2000))
+    namespace.delete(["0", "1", "2"])
+
+    assert (namespace.row_lists[:namespace.count] >= 0).all()
+    assert ids(namespace.query(vectors[1999].tolist(), 1, False, False)) == ["1999"]
+    assert ids(namespace.query(clustered_vectors(10, seed=2)[3].tolist(), 1, False, False)) == ["2003"]
+
+def test_segment_namespace_ann_survives_reopen_and_compaction(tmp_path):
+    directory = str(tmp_path / "ns")
+    settings = IVFSettings(nlist=20, nprobe=4, min_vectors=1000)
+    vectors = clustered_vectors(3000)
+    namespace = SegmentNamespace(directory, 16, max_segments=100, ann=settings)
+    for start in range(0, 3000, 1000):
+        namespace.upsert(records(vectors[start:start + 1000], offset=start))
+
+    assert ids(namespace.query(vectors[42].tolist(), 1, False, False)) == ["42"]
+    assert namespace.manifest["ann"] == {"trained_count": 3000}
+
+    namespace.compact()
+    reopened = SegmentNamespace(directory, 16, ann=settings)
+
+    assert ivf_of(reopened).trained
+    assert ids(reopened.query(vectors[2500].tolist(), 1, False, False)) == ["2500"]
+    exact = reopened.query(vectors[2500].tolist(), 10, False, False, exact=True)
+    approximate = reopened.query(vectors[2500].tolist(), 10, False, False)
+    assert len(set(ids(approximate)) & set(ids(exact))) >= 9
+
+def test_nprobe_per_query_on_the_local_index():
+    store = LocalVectorStore(ann=IVFSettings(nlist=20, nprobe=1, min_vectors=1000))
+    store.create_index("quickstart", 16)
+    index = store.get_index("quickstart")
+    vectors = clustered_vectors(2000)
+    index.upsert(records(vectors), namespace="laptops")
+
+    # probing every list is the same as the exact scan
+    everything = index.query(vectors[5].tolist(), top_k=20, namespace="laptops", nprobe=20)
+    exact = index.query(vectors[5].tolist(), top_k=20, namespace="laptops", exact=True)
+
+    assert ids(everything.matches) == ids(exact.matches)
@@ -0,0 +1,138 @@
+import pytest
+import numpy as np
+from unittest.mock import MagicMock
+
+from application.dbutils import DbUtils
+from application.vector_stores.local_vector_store import LocalVectorStore, vector_store_from_env
+
+@pytest.fixture
+def local_store() -> LocalVectorStore:
+    store = LocalVectorStore()
+    store.create_index("test-index", 3)
+    return store
+
+def test_create_and_describe_index(local_store: LocalVectorStore):
+    assert local_store.index_exists("test-index")
+    assert not local_store.index_exists("missing")
+
+    description = local_store.describe_index("test-index")
+
+    assert description.dimension == 3
+    assert description["metric"] == "cosine"
+
+def test_create_index_twice(local_store: LocalVectorStore):
+    with pytest.raises(Exception, match="Index already exists: test-index"):
+        local_store.create_index("test-index", 3)
+
+def test_get_missing_index(local_store: LocalVectorStore):
+    with pytest.raises(Exception, match="Index not found: missing"):
+        local_store.get_index("missing")
+
+def test_upsert_and_query_cosine_top_k(local_store: LocalVectorStore):
+    index = local_store.get_index("test-index")
+    response = index.upsert(vectors=[
+        {"id": "x", "values": [1.0, 0.0, 0.0], "metadata": {"text": "x"}},
+        {"id": "y", "values": [0.0, 1.0, 0.0], "metadata": {"text": "y"}},
+        ("xy", [1.0, 1.0, 0.0], {"text": "xy"}),
+        ("z", [0.0, 0.0, 5.0]),
+    ], namespace="ns")
+
+    results = index.query(namespace="ns", vector=[2.0, 0.1, 0.0], top_k=2, include_values=False, include_metadata=True)
+
+    assert response["upserted_count"] == 4
+    assert [match.id for match in results.matches] == ["x", "xy"]
+    assert results.matches[0]["metadata"] == {"text": "x"}
+    assert results.matches[0].values is None
+    assert results.matches[0].score == pytest.approx(2.0 / np.sqrt(4.01))
+
+def test_query_more_than_available(local_store: LocalVectorStore):
+    index = local_store.get_index("test-index")
+    index.upsert(vectors=[("a", [1.0, 0.0, 0.0]), ("b", [0.0, 1.0, 0.0])], namespace="ns")
+
+    results = index.query(namespace="ns", vector=[0.0, 1.0, 0.0], top_k=10, include_values=True)
+
+    assert [match.id for match in results.matches] == ["b", "a"]
+    assert results.matches[0].values == [0.0, 1.0, 0.0]
+    assert index.query(namespace="other", vector=[0.0, 1.0, 0.0], top_k=10).matches == []
+
+def test_upsert_overwrites_existing_id(local_store: LocalVectorStore):
+    index = local_store.get_index("test-index")
+    index.upsert(vectors=[("a", [1.0, 0.0, 0.0], {"text": "old"})], namespace="ns")
+    index.upsert(vectors=[("a", [0.0, 1.0, 0.0], {"text": "new"})], namespace="ns")
+
+    fetched = index.fetch(ids=["a", "missing"], namespace="ns")
+
+    assert list(fetched.vectors.keys()) == ["a"]
+    assert fetched.vectors["a"].values == [0.0, 1.0, 0.0]
+    assert fetched.vectors["a"]["metadata"] == {"text": "new"}
+    assert index.describe_index_stats()["namespaces"] == {"ns": {"vector_count": 1}}
+
+def test_upsert_wrong_dimension(local_store: LocalVectorStore):
+    index = local_store.get_index("test-index")
+
+    with pytest.raises(ValueError):
+        index.upsert(vectors=[("a", [1.0, 0.0])], namespace="ns")
+
+def test_delete_keeps_remaining_rows_searchable(local_store: LocalVectorStore):
+    index = local_store.get_index("test-index")
+    index.upsert(vectors=[
+        ("a", [1.0, 0.0, 0.0]),
+        ("b", [0.0, 1.0, 0.0]),
+        ("c", [0.0, 0.0, 1.0]),
+    ], namespace="ns")
+
+    index.delete(ids=["a"], namespace="ns")
+
+    assert index.fetch(ids=["a"], namespace="ns").vectors == {}
+    assert index.query(namespace="ns", vector=[0.0, 0.0, 1.0], top_k=1).matches[0].id == "c"
+    assert index.describe_index_stats()["total_vector_count"] == 2
+
+    index.delete(delete_all=True, namespace="ns")
+    assert index.describe_index_stats()["namespaces"] == {}
+
+def test_list_by_prefix_in_pages(local_store: LocalVectorStore):
+    index = local_store.get_index("test-index")
+    index.upsert(vectors=[(f"laptop-{i}", [1.0, 0.0, 0.0]) for i in range(5)] + [("bus-1", [0.0, 1.0, 0.0])], namespace="ns")
+
+    pages = list(index.list(prefix="laptop-", limit=2, namespace="ns"))
+
+    assert pages == [["laptop-0", "laptop-1"], ["laptop-2", "laptop-3"], ["laptop-4"]]
+
+def test_grows_past_initial_capacity(local_store: LocalVectorStore):
+    index = local_store.get_index("test-index")
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(3000, 3)).astype(np.float32)
+    index.upsert(vectors=[(str(i), vector.tolist()) for i, vector in enumerate(vectors)], namespace="ns")
+
+    results = index.query(namespace="ns", vector=vectors[2500].tolist(), top_k=1)
+
+    assert results.matches[0].id == "2500"
+    assert index.describe_index_stats()["namespaces"]["ns"]["vector_count"] == 3000
+
+def test_dbutils_with_local_store(local_store: LocalVectorStore):
+    env = MagicMock()
+    env.PINECONE_API_KEY = "fake-api-key"
+    env.DEBUG_MODE = False
+    dbutils = DbUtils(env, 2, 2, "fake-model", vector_store=local_store)
+
+    dbutils.upsert_embeddings("test-index", "ns1", [{"id": "a", "values": [1.0, 0.0, 0.0], "metadata": {"text": "a"}}])
+    dbutils.upsert_embeddings("test-index", "ns2", [{"id": "b", "values": [0.9, 0.1, 0.0], "metadata": {"text": "b"}}])
+
+    assert sorted(dbutils.get_namespaces("test-index")) == ["ns1", "ns2"]
+    assert [match["id"] for match in dbutils.search("test-index", "ns1", [1.0, 0.0, 0.0], 5)] == ["a"]
+    merged = dbutils.search_many("test-index", ["ns1", "ns2"], [1.0, 0.0, 0.0], 5)
+    assert [(match["id"], match["namespace"]) for match in merged] == [("a", "ns1"), ("b", "ns2")]
+    assert list(dbutils.list_ids_in_namespace("test-index", "a", "ns1")) == [["a"]]
+
+def test_vector_store_from_env(tmp_path):
+    env = MagicMock(VECTOR_STORE="pinecone")
+    assert vector_store_from_env(env) is None
+
+    env = MagicMock(VECTOR_STORE="local", VECTOR_STORE_PATH=str(tmp_path), VECTOR_STORE_ANN=True, VECTOR_STORE_NPROBE=4)
+    store = vector_store_from_env(env)
+    assert store is not None and store.path == str(tmp_path)
+    assert store.ann is not None and store.ann.nprobe == 4
+
+    env = MagicMock(VECTOR_STORE="local", VECTOR_STORE_PATH="", VECTOR_STORE_ANN=False)
+    store = vector_store_from_env(env)
+    assert store is not None and store.path is None and store.ann is None
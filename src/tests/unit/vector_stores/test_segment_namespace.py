@@ -0,0 +1,146 @@
+import os
+import pytest
+import numpy as np
+
+from application.vector_stores.segment_namespace import SegmentNamespace
+from application.vector_stores.local_vector_store import LocalVectorStore
+
+def test_upsert_query_and_reopen(tmp_path):
+    directory = str(tmp_path / "ns")
+    namespace = SegmentNamespace(directory, 3)
+    namespace.upsert([
+        ("a", [1.0, 0.0, 0.0], {"text": "a"}),
+        ("b", [0.0, 1.0, 0.0], {"text": "b"}),
+    ])
+
+    reopened = SegmentNamespace(directory, 3)
+    matches = reopened.query([0.9, 0.1, 0.0], top_k=1, include_values=True, include_metadata=True)
+
+    assert reopened.count == 2
+    assert matches[0].id == "a"
+    assert matches[0].metadata == {"text": "a"}
+    assert matches[0].values == [1.0, 0.0, 0.0]
+    assert isinstance(reopened.segments[1][0], np.memmap)
+
+def test_overwrite_and_delete_hide_old_rows(tmp_path):
+    namespace = SegmentNamespace(str(tmp_path / "ns"), 3, max_dead_ratio=1.0)
+    namespace.upsert([("a", [1.0, 0.0, 0.0], {"text": "old"}), ("b", [0.0, 1.0, 0.0], None)])
+    namespace.upsert([("a", [0.0, 0.0, 1.0], {"text": "new"})])
+
+    # the old "a" row would come first here if it was still visible
+    matches = namespace.query([1.0, 0.1, 0.0], top_k=5, include_values=False, include_metadata=True)
+    assert [match.id for match in matches] == ["b", "a"]
+    assert matches[1].metadata == {"text": "new"}
+    assert matches[1].score == pytest.approx(0.0)
+
+    namespace.delete(["b", "missing"])
+    assert namespace.count == 1
+    assert namespace.fetch(["a", "b"])["a"].values == [0.0, 0.0, 1.0]
+    assert list(namespace.fetch(["a", "b"]).keys()) == ["a"]
+
+def test_last_write_wins_inside_a_batch(tmp_path):
+    namespace = SegmentNamespace(str(tmp_path / "ns"), 2)
+    namespace.upsert([("a", [1.0, 0.0], {"v": 1}), ("a", [0.0, 1.0], {"v": 2})])
+
+    assert namespace.count == 1
+    assert namespace.fetch(["a"])["a"].metadata == {"v": 2}
+
+def test_list_ids_by_prefix(tmp_path):
+    namespace = SegmentNamespace(str(tmp_path / "ns"), 2)
+    namespace.upsert([("laptop-2", [1.0, 0.0], None), ("laptop-1", [1.0, 0.0], None), ("bus-1", [0.0, 1.0], None)])
+
+    assert namespace.list_ids("laptop-") == ["laptop-1", "laptop-2"]
+    assert namespace.list_ids(None) == ["bus-1", "laptop-1", "laptop-2"]
+
+def test_compaction_merges_segments_and_drops_dead_rows(tmp_path):
+    directory = str(tmp_path / "ns")
+    namespace = SegmentNamespace(directory, 2, max_segments=100, max_dead_ratio=1.0)
+    for i in range(6):
+        namespace.upsert([(str(i), [float(i), 1.0], {"i": i})])
+    namespace.upsert([("0", [5.0, 1.0], {"i": "replaced"})])
+    namespace.delete(["1"])
+
+    namespace.compact()
+
+    assert len(namespace.manifest["segments"]) == 1
+    assert namespace.manifest["segments"][0]["rows"] == 5
+    assert len([name for name in os.listdir(directory) if name.endswith(".vectors")]) == 1
+    assert namespace.fetch(["0"])["0"].metadata == {"i": "replaced"}
+
+    reopened = SegmentNamespace(directory, 2)
+    assert reopened.count == 5
+    assert sorted(match.id for match in reopened.query([1.0, 0.2], 10, False, False)) == ["0", "2", "3", "4", "5"]
+
+def test_too_many_segments_triggers_compaction(tmp_path):
+    namespace = SegmentNamespace(str(tmp_path / "ns"), 2, max_segments=4)
+    for i in range(10):
+        namespace.upsert([(str(i), [1.0, float(i)], None)])
+
+    assert len(namespace.manifest["segments"]) <= 4
+    assert namespace.count == 10
+    assert sorted(namespace.list_ids(None)) == sorted(str(i) for i in range(10))
+
+def test_partial_compaction_keeps_ids_on_their_vectors(tmp_path):
+    # the smallest segments (3 then 2) are merged, which is not ascending id order, and the big one stays
+    namespace = SegmentNamespace(str(tmp_path / "ns"), 2, max_segments=2)
+    namespace.upsert([("a", [1.0, 0.0], None), ("b", [1.0, 0.1], None), ("c", [1.0, 0.2], None)] +
+                     [(f"z{i}", [1.0, -0.1], None) for i in range(7)])
+    namespace.upsert([("x", [0.0, 1.0], None), ("x2", [0.1, 1.0], None)])
+    namespace.upsert([("y", [-1.0, 0.0], None)])
+
+    assert len(namespace.manifest["segments"]) == 2
+    vectors = namespace.fetch(["a", "c", "x", "x2", "y"])
+    assert vectors["x"].values == [0.0, 1.0]
+    assert vectors["c"].values == pytest.approx([1.0, 0.2])
+    assert vectors["y"].values == [-1.0, 0.0]
+    assert namespace.query([-1.0, 0.0], 1, False, False)[0].id == "y"
+
+def test_compaction_copies_each_row_a_logarithmic_number_of_times(tmp_path, mocker):
+    namespace = SegmentNamespace(str(tmp_path / "ns"), 2, max_segments=8)
+    compact = namespace.compact
+    copied = []
+    def counting_compact(segment_ids=None):
+        rows = {segment["id"]: segment["rows"] for segment in namespace.manifest["segments"]}
+        copied.append(sum(rows[segment_id] for segment_id in segment_ids or rows))
+        compact(segment_ids)
+    mocker.patch.object(namespace, "compact", side_effect=counting_compact)
+
+    # 200 row upserts, the seed default
+    for start in range(0, 40000, 200):
+        namespace.upsert([(str(i), [1.0, float(i)], None) for i in range(start, start + 200)])
+
+    assert namespace.count == 40000
+    assert len(namespace.manifest["segments"]) <= 8
+    # merging the smallest half of the segments copied every row about 6 times here, more as the namespace grows
+    assert sum(copied) <= 4 * 40000
+
+def test_float16_segments(tmp_path):
+    namespace = SegmentNamespace(str(tmp_path / "ns"), 2, dtype="float16")
+    namespace.upsert([("a", [0.1, 0.9], None)])
+
+    matches = namespace.query([0.1, 0.9], 1, True, False)
+
+    assert namespace.segments[1][0].dtype == np.float16
+    assert matches[0].score == pytest.approx(1.0, abs=1e-3)
+
+def test_reopen_with_other_dimension_fails(tmp_path):
+    directory = str(tmp_path / "ns")
+    SegmentNamespace(directory, 2).upsert([("a", [1.0, 0.0], None)])
+
+    with pytest.raises(ValueError):
+        SegmentNamespace(directory, 3)
+
+def test_local_store_persists_indexes(tmp_path):
+    store = LocalVectorStore(str(tmp_path))
+    store.create_index("test-index", 2)
+    store.get_index("test-index").upsert(vectors=[("a", [1.0, 0.0], {"text": "a"})], namespace="laptop prices/2024")
+
+    reopened = LocalVectorStore(str(tmp_path))
+    index = reopened.get_index("test-index")
+
+    assert reopened.describe_index("test-index").dimension == 2
+    assert index.describe_index_stats()["namespaces"] == {"laptop prices/2024": {"vector_count": 1}}
+    assert index.query(namespace="laptop prices/2024", vector=[1.0, 0.0], top_k=1, include_metadata=True).matches[0].metadata == {"text": "a"}
+
+    index.delete(delete_all=True, namespace="laptop prices/2024")
+    assert LocalVectorStore(str(tmp_path)).get_index("test-index").describe_index_stats()["namespaces"] == {}